@@ -1,19 +1,46 @@
 
-from typing import TypeVar, List
+from __future__ import annotations
+
+import importlib
+from typing import TypeVar, List, TYPE_CHECKING
 from enum import Enum
 
-from .components.PaginatedDatatable import PaginatedDataTable
-from .components.LazyPaginatedDatatable import LazyPaginatedDataTable
-from .components.BasicDataTable import BasicDataTable
-from .components._DataTable import ColumnSpec
-from .components.Form import ItemSpec, Form
+if TYPE_CHECKING:
+    from .components._DataTable import ColumnSpec, ToggleFilterSpec
+    from .components.Form import ItemSpec
 
 T = TypeVar('T')
 
+# names exported by this module and the module defining them. They are imported on first use, so that importing the
+# factory doesn't load flet, the tables or numpy, e.g. for a screen showing only a Form
+_LAZY_EXPORTS = {
+    'PaginatedDataTable': '.components.PaginatedDatatable',
+    'LazyPaginatedDataTable': '.components.LazyPaginatedDatatable',
+    'BasicDataTable': '.components.BasicDataTable',
+    'VirtualDataTable': '.components.VirtualDataTable',
+    'ColumnSpec': '.components._DataTable',
+    'ToggleFilterSpec': '.components._DataTable',
+    'ColumnarDataset': '.utils.ColumnarDataset',
+    'ItemSpec': '.components.Form',
+    'Form': '.components.Form',
+}
+
+def __getattr__(name: str):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __package__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY_EXPORTS))
+
 class TableType(Enum): 
     PAGINATED = "Paginated" 
     LAZY_PAGINATED = "LazyPaginated" 
     BASIC = "Basic"
+    VIRTUAL = "Virtual"
 
 class CustomComponentFactory():
 
@@ -25,22 +52,51 @@ class CustomComponentFactory():
             on_select_changed_callback = None,
             lazy_callback=None,
             rows_per_page=10,
-            count=None):
+            count=None,
+            visible_rows_only=False,
+            page_cache_size=0,
+            page_cache_ttl=None,
+            prefetch_pages=0,
+            prefetch_in_one_call=False,
+            row_height=None,
+            overscan=None,
+            filters: list[ToggleFilterSpec] = None,
+            sortable=True,
+            filter_mode='AND',
+            searchable=False,
+            pagination='offset',
+            max_rows=None,
+            auto_follow=False):
 
         """ Create a data table of the specified type. 
         
             Args: 
                 type (TableType): The type of the data table. 
                 columns (List[ColumnSpec]): The columns specifications. 
-                data (List[T]): The data to be displayed. 
+                data (List[T]): The data to be displayed, a list of records or columnar data (a NumPy structured array, a dict of column arrays or a ColumnarDataset) read a page at a time. 
                 on_select_changed_callback (Callable, optional): Callback for selection change. 
-                lazy_callback (Callable, optional): Callback for lazy loading. 
-                rows_per_page (int, optional): Number of rows per page. Defaults to 10. 
+                lazy_callback (Callable, optional): Callback for lazy loading, called with (skip, limit) and the sort and filters keyword arguments if it accepts them. May be an async def in asyncio mode. 
+                rows_per_page (int, optional): Number of rows per page, or of rows in the viewport of virtual tables. Defaults to 10. 
                 count (int, optional): Total number of items. Defaults to None. 
+                visible_rows_only (bool, optional): Paginated tables only, build rows just for the displayed page. Defaults to False. 
+                page_cache_size (int, optional): Lazy tables only, number of fetched pages kept in cache. Defaults to 0 (no cache). 
+                page_cache_ttl (float, optional): Lazy tables only, seconds a cached page stays valid. Defaults to None (no expiration). 
+                prefetch_pages (int, optional): Lazy tables only, pages around the current one fetched in background. Defaults to 0. 
+                prefetch_in_one_call (bool, optional): Lazy tables only, fetch consecutive prefetched pages with one callback call. Defaults to False. 
+                row_height (int, optional): Virtual tables only, fixed height of the rows in pixels. Defaults to 40. 
+                overscan (int, optional): Virtual tables only, rows kept built before and after the viewport. Defaults to 10. 
+                filters (List[ToggleFilterSpec], optional): Filters toggled by the user, evaluated on the records or passed to lazy_callback by lazy tables. Defaults to None. 
+                filter_mode (str, optional): Paginated and basic tables only, AND or OR to combine the active filters. Defaults to 'AND'. 
+                searchable (bool, optional): Paginated and basic tables only, show a search box over the column values. Defaults to False. 
+                pagination (str, optional): Lazy tables only, 'offset' to call lazy_callback with (skip, limit) or 'cursor' for keyset pagination with (cursor, limit, direction). Defaults to 'offset'. 
+                sortable (bool, optional): Paginated tables only, sort the rows by clicking the column headers. Defaults to True. 
+                max_rows (int, optional): Paginated, basic and virtual tables, number of rows kept when rows are added with append_rows, the oldest are evicted. Defaults to None (no limit). 
+                auto_follow (bool, optional): Paginated and virtual tables only, show the newest rows when rows are appended while the last ones are displayed. Defaults to False. 
                 
             Returns: 
-                Union[PaginatedDataTable, LazyPaginatedDataTable, BasicDataTable]: An instance of the requested data table type. """
+                Union[PaginatedDataTable, LazyPaginatedDataTable, BasicDataTable, VirtualDataTable]: An instance of the requested data table type. """
 
+        # only the module of the requested table is imported
         common_args = { 
             'columns': columns, 
             'data': data, 
@@ -48,26 +104,60 @@ class CustomComponentFactory():
         }
 
         if type == TableType.PAGINATED:
+            from .components.PaginatedDatatable import PaginatedDataTable
             return PaginatedDataTable(
                 **common_args,
-                rows_per_page=rows_per_page
+                rows_per_page=rows_per_page,
+                visible_rows_only=visible_rows_only,
+                sortable=sortable,
+                filters=filters,
+                filter_mode=filter_mode,
+                searchable=searchable,
+                max_rows=max_rows,
+                auto_follow=auto_follow
             )
 
         elif type == TableType.LAZY_PAGINATED:
+            from .components.LazyPaginatedDatatable import LazyPaginatedDataTable
             return LazyPaginatedDataTable(
                 **common_args,
                 lazy_callback=lazy_callback,
                 rows_per_page=rows_per_page,
-                count=count
+                count=count,
+                page_cache_size=page_cache_size,
+                page_cache_ttl=page_cache_ttl,
+                prefetch_pages=prefetch_pages,
+                prefetch_in_one_call=prefetch_in_one_call,
+                filters=filters,
+                pagination=pagination
             )
 
         elif type == TableType.BASIC:
+            from .components.BasicDataTable import BasicDataTable
             return BasicDataTable(
-                **common_args
+                **common_args,
+                filters=filters,
+                filter_mode=filter_mode,
+                searchable=searchable,
+                max_rows=max_rows
+            )
+
+        elif type == TableType.VIRTUAL:
+            from .components.VirtualDataTable import VirtualDataTable
+            return VirtualDataTable(
+                **common_args,
+                row_height=row_height if row_height is not None else VirtualDataTable.DEFAULT_ROW_HEIGHT,
+                viewport_rows=rows_per_page,
+                overscan=overscan if overscan is not None else VirtualDataTable.DEFAULT_OVERSCAN,
+                max_rows=max_rows,
+                auto_follow=auto_follow
             )
         else:
             raise ValueError(f"Unknown table type: {type}")
 
     @staticmethod
     def create_form(items: list[ItemSpec]):
+        """ Create a form with the layout of the items. A form can be built once and show other records with
+            its bind method, which patches the values in place instead of building new controls. """
+        from .components.Form import Form
         return Form(items)
\ No newline at end of file
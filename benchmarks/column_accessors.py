@@ -0,0 +1,93 @@
+"""Per-row extraction cost of the ColumnSpec values, legacy unpack_obj walk vs compiled accessors.
+
+Run with: python benchmarks/column_accessors.py [--size 100000]
+"""
+import sys
+import os
+import importlib
+import argparse
+import time
+from dataclasses import dataclass
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(ROOT))
+
+_datatable = importlib.import_module(f"{os.path.basename(ROOT)}.components._DataTable")
+ColumnSpec = _datatable.ColumnSpec
+compile_row_accessor = _datatable.compile_row_accessor
+_DataTable = _datatable._DataTable
+
+@dataclass
+class Trade:
+    symbol: str
+    quantity: int
+    price: float
+    side: str
+
+class Client:
+    def __init__(self, name, country):
+        self.name = name
+        self.country = country
+
+class Order:
+    def __init__(self, idx):
+        self.order_id = idx
+        self.client = Client(f"client {idx}", "IT")
+        self.trade = Trade(f"SYM{idx % 50}", idx, idx * 1.5, "BUY")
+
+def legacy_extract(columns, record):
+    """The extraction done by generate_datarows before the accessors were compiled"""
+    obj = _DataTable.unpack_obj(record)
+    values = []
+    for c in columns:
+        if c.original_field_name != '':
+            try:
+                if "." in c.original_field_name:
+                    _field = c.original_field_name.split(".")
+                    values.append(obj[_field[0]][_field[1]])
+                else:
+                    values.append(obj[c.original_field_name])
+            except Exception:
+                values.append('')
+        else:
+            values.append('')
+    return values
+
+def run(name, columns, data):
+    start = time.perf_counter()
+    for record in data:
+        legacy_extract(columns, record)
+    legacy = time.perf_counter() - start
+
+    row_accessor = compile_row_accessor(columns)
+    start = time.perf_counter()
+    for record in data:
+        row_accessor(record)
+    compiled = time.perf_counter() - start
+
+    n = len(data)
+    print(f"{name:<12} legacy {legacy * 1e6 / n:8.3f} us/row   compiled {compiled * 1e6 / n:8.3f} us/row   speedup x{legacy / compiled:5.1f}")
+
+def main(num_rows):
+    print(f"extracting values from {num_rows} rows")
+
+    run(
+        "dict",
+        [ColumnSpec("SYMBOL", "symbol"), ColumnSpec("QTY", "quantity"), ColumnSpec("PRICE", "price"), ColumnSpec("SIDE", "side")],
+        [{"symbol": f"SYM{i % 50}", "quantity": i, "price": i * 1.5, "side": "BUY"} for i in range(num_rows)]
+    )
+    run(
+        "dataclass",
+        [ColumnSpec("SYMBOL", "symbol"), ColumnSpec("QTY", "quantity"), ColumnSpec("PRICE", "price"), ColumnSpec("SIDE", "side")],
+        [Trade(f"SYM{i % 50}", i, i * 1.5, "BUY") for i in range(num_rows)]
+    )
+    run(
+        "nested",
+        [ColumnSpec("ID", "order_id"), ColumnSpec("CLIENT", "client.name"), ColumnSpec("SYMBOL", "trade.symbol"), ColumnSpec("QTY", "trade.quantity")],
+        [Order(i) for i in range(num_rows)]
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares the per-row extraction of the legacy unpack_obj walk and of the compiled accessors")
+    parser.add_argument("--size", type=int, default=100_000, help="number of rows, defaults to 100000")
+    main(parser.parse_args().size)
@@ -0,0 +1,73 @@
+"""Headless flet page for the benchmarks, recording every update sent to the client and its serialized size.
+
+    page = FakePage()
+    page.add(table)
+    ...
+    page.connection.updates, page.connection.bytes
+"""
+import json
+from itertools import count
+
+import flet as ft
+from flet_core.connection import Connection
+from flet_core.protocol import (
+    Actions,
+    Command,
+    CommandEncoder,
+    Message,
+    PageCommandRequestPayload,
+    PageCommandResponsePayload,
+    PageCommandsBatchRequestPayload,
+    PageCommandsBatchResponsePayload,
+)
+
+class FakeConnection(Connection):
+    """
+    Connection answering the page like the flet server does, without a client.
+
+    Every batch of commands is encoded as the message sent over the websocket and only its size is kept. Added
+    controls get fresh ids, one result line per add command, so the page mounts them as it would on a server.
+    """
+
+    def __init__(self, page_name: str = "bench"):
+        super().__init__()
+        self.page_name = page_name
+        self.ids = count(1)
+        self.reset()
+
+    def reset(self):
+        """Clears the recorded updates"""
+        # (number of commands, bytes) of each update
+        self.calls = []
+
+    @property
+    def updates(self) -> int:
+        return len(self.calls)
+
+    @property
+    def commands(self) -> int:
+        return sum(commands for commands, _ in self.calls)
+
+    @property
+    def bytes(self) -> int:
+        return sum(size for _, size in self.calls)
+
+    def record(self, payload, commands: int):
+        message = Message("", Actions.PAGE_COMMANDS_BATCH_FROM_HOST, payload)
+        self.calls.append((commands, len(json.dumps(message, cls=CommandEncoder, separators=(",", ":")).encode())))
+
+    def send_commands(self, session_id: str, commands: list[Command]):
+        self.record(PageCommandsBatchRequestPayload(self.page_name, session_id, commands), len(commands))
+        # an add command holds one command per added control, the ids are returned in the same order
+        results = [" ".join(f"_{next(self.ids)}" for _ in command.commands) for command in commands if command.name == "add"]
+        return PageCommandsBatchResponsePayload(results=results, error="")
+
+    def send_command(self, session_id: str, command: Command):
+        self.record(PageCommandRequestPayload(self.page_name, session_id, command), 1)
+        return PageCommandResponsePayload(result="", error="")
+
+class FakePage(ft.Page):
+    """Page of a FakeConnection, which is its connection property"""
+
+    def __init__(self, session_id: str = "bench"):
+        super().__init__(FakeConnection(), session_id)
@@ -0,0 +1,80 @@
+"""Import time of the package, from the -X importtime report of fresh interpreters, checked against a budget.
+
+Run with: python benchmarks/import_time.py [--module CustomComponentFactory] [--budget-ms 50] [--runs 5] [--top 10]
+
+Each run imports the module in a new interpreter, so nothing is cached but the bytecode. The cost is the cumulative
+import time of the module, dependencies included, the fastest of the runs. The exit status is 1 over the budget.
+"""
+import sys
+import os
+import argparse
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PACKAGE = os.path.basename(ROOT)
+
+DEFAULT_MODULE = "CustomComponentFactory"
+# the factory must not load flet, the tables or numpy before they are used
+DEFAULT_BUDGET_MS = 50
+
+def parse_importtime(report: str, module: str) -> list[tuple[str, int, int]]:
+    """Returns the (name, self us, cumulative us) of module and of the modules it imported, from an -X importtime
+    report. The modules imported by the interpreter at startup are left out"""
+    lines = []
+    for line in report.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # the header line
+            continue
+        name = fields[2].rstrip()
+        # nested imports are indented by two spaces per level, after the separator space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        lines.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+
+    # the report is in post-order, the modules imported by module are the deeper lines right before it
+    end = max(idx for idx, (name, _, _, depth) in enumerate(lines) if name == module and depth == 0)
+    start = end
+    while start > 0 and lines[start - 1][3] > 0:
+        start -= 1
+    return [(name, own, cumulative) for name, own, cumulative, _ in lines[start:end + 1]]
+
+def measure(module: str) -> list[tuple[str, int, int]]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(ROOT), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+    return parse_importtime(result.stderr, module)
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Checks the import time of the package against a budget")
+    parser.add_argument("--module", default=DEFAULT_MODULE, help=f"module of the package to import, defaults to {DEFAULT_MODULE}")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help=f"maximum import time, defaults to {DEFAULT_BUDGET_MS} ms")
+    parser.add_argument("--runs", type=int, default=5, help="interpreters started, the fastest is kept")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules listed by their own import time")
+    args = parser.parse_args(argv)
+
+    module = f"{PACKAGE}.{args.module}"
+    # the first run also writes the bytecode of the package
+    measure(module)
+    runs = [measure(module) for _ in range(args.runs)]
+    fastest = min(runs, key=lambda modules: next(cumulative for name, _, cumulative in modules if name == module))
+    total_ms = next(cumulative for name, _, cumulative in fastest if name == module) / 1000
+    package_ms = sum(own for name, own, _ in fastest if name == PACKAGE or name.startswith(f"{PACKAGE}.")) / 1000
+
+    print(f"import {module}: {total_ms:.1f} ms, {package_ms:.1f} ms in the package itself, {len(fastest)} modules")
+    for name, own, _ in sorted(fastest, key=lambda m: -m[1])[:args.top]:
+        print(f"  {own / 1000:8.1f} ms  {name}")
+
+    if total_ms > args.budget_ms:
+        print(f"over budget: {total_ms:.1f} ms > {args.budget_ms:g} ms")
+        return 1
+    print(f"within budget of {args.budget_ms:g} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""Controls and serialized payload of a page of rows, legacy layout (hidden cells and row_uuid cell) vs projected rows.
+
+Run with: python benchmarks/row_payload.py [rows_per_page] [hidden_columns]
+"""
+import sys
+import os
+import importlib
+import json
+
+import flet as ft
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(ROOT))
+
+_datatable = importlib.import_module(f"{os.path.basename(ROOT)}.components._DataTable")
+ColumnSpec = _datatable.ColumnSpec
+_DataTable = _datatable._DataTable
+compile_row_accessor = _datatable.compile_row_accessor
+
+def legacy_datarows(columns, data, row_ids):
+    """The rows built by generate_datarows before hidden columns were projected out"""
+    row_accessor = compile_row_accessor(columns)
+    rows = []
+    for record, row_id in zip(data, row_ids):
+        cells = [ft.DataCell(ft.Text(value, visible=c.visible), visible=c.visible) for c, value in zip(columns, row_accessor(record))]
+        cells.append(ft.DataCell(ft.Text(row_id), visible=False))
+        rows.append(ft.DataRow(cells=cells, selected=False))
+    return rows
+
+def measure(rows):
+    """Returns the number of controls and the bytes of the commands adding them to a page"""
+    commands = [command for row in rows for command in row._build_add_commands()]
+    payload = json.dumps([{'i': c.indent, 'n': c.name, 'v': c.values, 'a': c.attrs} for c in commands])
+    return len(commands), len(payload.encode())
+
+def main(rows_per_page, hidden):
+    visible = 6
+    columns = [ColumnSpec(f"COL{i}", f"col{i}") for i in range(visible)]
+    columns += [ColumnSpec(f"HIDDEN{i}", f"hidden{i}", visible=False) for i in range(hidden)]
+    data = [
+        {**{f"col{i}": f"value {n}-{i}" for i in range(visible)}, **{f"hidden{i}": n * i for i in range(hidden)}}
+        for n in range(rows_per_page)
+    ]
+    table = _DataTable(columns, data)
+
+    legacy_controls, legacy_bytes = measure(legacy_datarows(columns, data, table.row_ids))
+    controls, payload = measure(table.get_rows())
+
+    print(f"{rows_per_page} rows per page, {visible} visible and {hidden} hidden columns")
+    print(f"legacy     {legacy_controls:6d} controls {legacy_bytes:9d} bytes")
+    print(f"projected  {controls:6d} controls {payload:9d} bytes   ({100 * (1 - payload / legacy_bytes):.0f}% less payload)")
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 50,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 8,
+    )
@@ -0,0 +1,304 @@
+"""Benchmark suite of the tables and forms on a headless page, with the time, the updates sent and their payload.
+
+Each scenario runs on a fresh PaginatedDataTable mounted on a FakePage (see fake_page.py), at each size. Updates are
+flushed synchronously after each operation, so every update a scenario causes is counted and sized.
+generate_datarows, form and form_bind build a control per row or item, at 1M they take minutes: leave them out
+with --scenarios.
+
+Run with: python benchmarks/suite.py [--sizes 1000,100000,1000000] [--scenarios redraw,...] [--out results.json]
+    [--compare baseline.json] [--threshold time_s=0.25 --threshold bytes=0]
+
+With --compare, a metric regresses when it grows by more than its threshold (a ratio) over the baseline, and the
+exit status is 1 if anything regressed, so two commits can be compared with:
+
+    git checkout A && python benchmarks/suite.py --out a.json
+    git checkout B && python benchmarks/suite.py --compare a.json
+"""
+import sys
+import os
+import importlib
+import argparse
+import gc
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.dirname(ROOT))
+
+from fake_page import FakePage
+
+PACKAGE = os.path.basename(ROOT)
+_datatable = importlib.import_module(f"{PACKAGE}.components._DataTable")
+ColumnSpec = _datatable.ColumnSpec
+_DataTable = _datatable._DataTable
+PaginatedDataTable = importlib.import_module(f"{PACKAGE}.components.PaginatedDatatable").PaginatedDataTable
+_form = importlib.import_module(f"{PACKAGE}.components.Form")
+Form = _form.Form
+ItemSpec = _form.ItemSpec
+ValueSpec = _form.ValueSpec
+UpdateScheduler = importlib.import_module(f"{PACKAGE}.utils.UpdateScheduler").UpdateScheduler
+ExpirationScheduler = importlib.import_module(f"{PACKAGE}.utils.ExpirationScheduler").ExpirationScheduler
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+ROWS_PER_PAGE = 50
+# rows built per generate_datarows call, they are dropped after each call so that 1M rows fit in memory
+BUILD_CHUNK = 10_000
+PAGE_CLICKS = 20
+EXPIRATION_TICKS = 30
+REMOVALS = 20
+FORM_BINDS = 5
+
+# a metric regresses when it grows by more than this ratio
+DEFAULT_THRESHOLDS = {'time_s': 0.25, 'updates': 0, 'commands': 0, 'bytes': 0.05}
+# smaller differences are noise
+MIN_DELTA = {'time_s': 0.005}
+
+COLUMNS = [
+    ColumnSpec("ID", "id"),
+    ColumnSpec("SYMBOL", "symbol"),
+    ColumnSpec("QUANTITY", "quantity"),
+    ColumnSpec("PRICE", "price"),
+    ColumnSpec("SIDE", "side"),
+    ColumnSpec("EXPIRES", "expires"),
+    ColumnSpec("TIME LEFT", "time_left"),
+    ColumnSpec("TRADER", "trader", visible=False),
+    ColumnSpec("DESK", "desk", visible=False),
+]
+
+class ManualUpdateScheduler(UpdateScheduler):
+    """Update scheduler without a thread, flushed only by flush_now, so each measure gets all of its updates and only them"""
+
+    def _queue(self, dirty: dict):
+        with self.state:
+            self.dirty.update(dirty)
+            self.marked += len(dirty)
+
+def make_records(size: int, start: float, version: int = 0) -> list[dict]:
+    """Records expiring in an hour or so, except one in a hundred expiring in the middle of the expiration ticks"""
+    return [
+        {
+            'id': n,
+            'symbol': f"SYM{n % 500}",
+            'quantity': (n * 7 + version) % 100_000,
+            'price': round(10 + (n % 1000) * 0.25 + version, 2),
+            'side': "BUY" if n % 2 else "SELL",
+            'expires': datetime.fromtimestamp(start + (EXPIRATION_TICKS // 2 if n % 100 == 0 else 3600 + n % 3600)).isoformat(),
+            'time_left': '',
+            'trader': f"trader {n % 40}",
+            'desk': f"desk {n % 7}",
+        }
+        for n in range(size)
+    ]
+
+def mount_table(data: list[dict]) -> tuple[FakePage, PaginatedDataTable]:
+    page = FakePage()
+    table = PaginatedDataTable(COLUMNS, data, rows_per_page=ROWS_PER_PAGE, visible_rows_only=True)
+    page.add(table)
+    UpdateScheduler.shared().flush_now()
+    return page, table
+
+def measure(page: FakePage, action, ops: int = 1) -> dict:
+    """Runs action and sends the updates it caused, returning the time taken and what reached the page"""
+    page.connection.reset()
+    start = time.perf_counter()
+    action()
+    UpdateScheduler.shared().flush_now()
+    elapsed = time.perf_counter() - start
+    return {
+        'time_s': elapsed,
+        'ops': ops,
+        'updates': page.connection.updates,
+        'commands': page.connection.commands,
+        'bytes': page.connection.bytes,
+    }
+
+def bench_generate_datarows(size: int, data: list[dict], start: float) -> dict:
+    table = _DataTable(COLUMNS, data, build_rows=False)
+    page = FakePage()
+
+    def build():
+        for pos in range(0, size, BUILD_CHUNK):
+            table.generate_datarows(COLUMNS, table.dataset[pos:pos + BUILD_CHUNK], None, table.row_ids[pos:pos + BUILD_CHUNK])
+
+    return measure(page, build, size)
+
+def bench_redraw(size: int, data: list[dict], start: float) -> dict:
+    page, table = mount_table(data)
+    new_data = make_records(size, start, version=1)
+    return measure(page, lambda: table.redraw(new_data))
+
+def bench_page_navigation(size: int, data: list[dict], start: float) -> dict:
+    page, table = mount_table(data)
+
+    def navigate():
+        for _ in range(PAGE_CLICKS):
+            table.next_page(None)
+            UpdateScheduler.shared().flush_now()
+
+    return measure(page, navigate, PAGE_CLICKS)
+
+def bench_format_column(size: int, data: list[dict], start: float) -> dict:
+    page, table = mount_table(data)
+
+    def format_quantities():
+        table.format_column("QUANTITY", "COMMAS")
+        # format_column leaves the update to the caller, as an app showing the formatted cells does
+        table.request_update()
+
+    return measure(page, format_quantities)
+
+def bench_watch_expiration(size: int, data: list[dict], start: float) -> dict:
+    page, table = mount_table(data)
+    table.update_row_expiration("EXPIRES", "TIME LEFT")
+    # ticks are driven by the benchmark, with one second between them, instead of the scheduler thread
+    ExpirationScheduler.shared().unwatch(table)
+    UpdateScheduler.shared().flush_now()
+
+    def tick():
+        for second in range(1, EXPIRATION_TICKS + 1):
+            table.watch_expiration("EXPIRES", "TIME LEFT", now=start + second)
+            UpdateScheduler.shared().flush_now()
+
+    return measure(page, tick, EXPIRATION_TICKS)
+
+def bench_remove_row(size: int, data: list[dict], start: float) -> dict:
+    page, table = mount_table(list(data))
+
+    def remove():
+        for _ in range(REMOVALS):
+            table.remove_row(table.get_visible_rows()[0])
+            UpdateScheduler.shared().flush_now()
+
+    return measure(page, remove, REMOVALS)
+
+def bench_form(size: int, data: list[dict], start: float) -> dict:
+    items = [
+        ItemSpec(f"field {n}", ValueSpec(f"value {n}") if n % 2 else f"value {n}")
+        for n in range(size)
+    ]
+    page = FakePage()
+    return measure(page, lambda: page.add(Form(items)), size)
+
+def bench_form_bind(size: int, data: list[dict], start: float) -> dict:
+    items = [
+        ItemSpec(f"field {n}", ValueSpec(f"value {n}") if n % 2 else f"value {n}")
+        for n in range(size)
+    ]
+    page = FakePage()
+    form = Form(items)
+    page.add(form)
+    # the records of the next selections, a tenth of their values differ from the displayed ones
+    records = [
+        {f"field {n}": f"value {n}" if n % 10 != selection else f"value {n} of {selection}" for n in range(size)}
+        for selection in range(1, FORM_BINDS + 1)
+    ]
+
+    def bind():
+        for record in records:
+            form.bind(record)
+            UpdateScheduler.shared().flush_now()
+
+    return measure(page, bind, FORM_BINDS)
+
+SCENARIOS = {
+    'generate_datarows': bench_generate_datarows,
+    'redraw': bench_redraw,
+    'page_navigation': bench_page_navigation,
+    'format_column': bench_format_column,
+    'watch_expiration': bench_watch_expiration,
+    'remove_row': bench_remove_row,
+    'form': bench_form,
+    'form_bind': bench_form_bind,
+}
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(sizes: list[int], scenarios: list[str], repeat: int) -> dict:
+    UpdateScheduler._instance = ManualUpdateScheduler()
+    results = {}
+    for size in sizes:
+        start = time.time()
+        data = make_records(size, start)
+        for name in scenarios:
+            runs = []
+            for _ in range(repeat):
+                runs.append(SCENARIOS[name](size, data, start))
+                gc.collect()
+            # the fastest run, the others were slowed down by something else
+            result = min(runs, key=lambda r: r['time_s'])
+            results[f"{name}@{size}"] = result
+            print(f"{name:18s} {size:>9d}  {result['time_s']:9.3f} s  {result['updates']:5d} updates  {result['commands']:7d} commands  {result['bytes']:10d} bytes")
+        del data
+        gc.collect()
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'results': results,
+    }
+
+def compare(baseline: dict, current: dict, thresholds: dict) -> list[str]:
+    """Returns the metrics of current grown by more than their threshold over baseline"""
+    regressions = []
+    for key, metrics in current['results'].items():
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        for metric, threshold in thresholds.items():
+            if metric not in metrics or metric not in previous:
+                continue
+            old, new = previous[metric], metrics[metric]
+            if new > old * (1 + threshold) and new - old > MIN_DELTA.get(metric, 0):
+                regressions.append(f"{key} {metric}: {old:g} -> {new:g} ({'+inf' if not old else f'{100 * (new / old - 1):+.0f}%'}, threshold {100 * threshold:g}%)")
+    return regressions
+
+def parse_threshold(value: str) -> tuple[str, float]:
+    metric, _, ratio = value.partition('=')
+    if metric not in DEFAULT_THRESHOLDS:
+        raise argparse.ArgumentTypeError(f"unknown metric {metric}, expected one of {list(DEFAULT_THRESHOLDS)}")
+    try:
+        return metric, float(ratio)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid ratio for {metric}: {ratio!r}")
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the tables and forms on a headless page")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="comma separated numbers of rows")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"comma separated, among {', '.join(SCENARIOS)}")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of each scenario, the fastest is kept")
+    parser.add_argument("--out", help="file the results are written to as JSON")
+    parser.add_argument("--compare", help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=parse_threshold, action='append', default=[], metavar="METRIC=RATIO",
+                        help=f"allowed growth of a metric over the baseline, defaults to {DEFAULT_THRESHOLDS}")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenarios.split(",")
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios {unknown}")
+
+    current = run([int(size) for size in args.sizes.split(",")], scenarios, args.repeat)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, {**DEFAULT_THRESHOLDS, **dict(args.threshold)})
+        print(f"compared with {baseline.get('commit')}: {len(regressions)} regressions")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
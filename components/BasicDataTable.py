@@ -3,7 +3,7 @@
 import flet as ft
 from typing import TypeVar, List
 
-from ._DataTable import _DataTable, ColumnSpec
+from ._DataTable import _DataTable, ColumnSpec, ToggleFilterSpec
 
 T = TypeVar('T')
 
@@ -13,15 +13,38 @@ class BasicDataTable(_DataTable, ft.UserControl):
             columns: list[ColumnSpec],
             data: list[T],
             on_select_changed_callback = None,
+            filters: list[ToggleFilterSpec] = None,
+            filter_mode: str = 'AND',
+            searchable: bool = False,
+            max_rows: int = None,
     ):
-        _DataTable.__init__(self, columns, data, on_select_changed_callback)
+        _DataTable.__init__(self, columns, data, on_select_changed_callback, filters=filters, filter_mode=filter_mode, searchable=searchable, max_rows=max_rows)
+        self.apply_filters()
         ft.UserControl.__init__(self)
 
+    def apply_filters(self):
+        """Hides the rows of the records not passing the active filters or the search, the rows are kept and shown
+        again when the filters or the search change"""
+        mask = self.get_view_mask()
+        for pos, row in enumerate(self.datatable.rows):
+            visible = mask is None or bool(mask[pos])
+            if row.visible != visible:
+                row.visible = visible
+        # action buttons are only built and evaluated for the rows shown
+        self.render_actions([row for row in self.datatable.rows if row.visible])
+
+    def on_view_changed(self):
+        with self.expiration_lock:
+            self.apply_filters()
+            self.request_update()
+
     def build(self):
         return ft.Row(
                     controls=[
                             ft.Column(
                                 [   
+                                    self.v_search,
+                                    self.v_filters,
                                     ft.Row(
                                         controls=[self.datatable],
                                     )
@@ -32,29 +55,29 @@ class BasicDataTable(_DataTable, ft.UserControl):
                     expand=True
         )
 
-    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None):
+    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None, key=None):
 
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.pause()
+        # the expiration scheduler must not work on the table while its dataset changes
+        with self.expiration_lock:
+            stats = None
+            if key is not None:
+                stats = self.diff_dataset(dataset, key)
+            else:
+                self.load_dataset(dataset)
+                self.datatable.rows = []
 
-        self.dataset = dataset
-        self.datatable.rows = []
+                self.datatable.rows = self.generate_datarows(self.column_spec, self.dataset, self.on_select_changed_callback, self.row_ids)
+            self.apply_filters()
+            self.num_rows = len(self.datatable.rows)
 
-        self.datatable.rows = self.generate_datarows(self.column_spec, dataset, self.on_select_changed_callback)
-        self.num_rows = len(self.datatable.rows)
+            self.request_update()
 
-        self.update()
+        return stats
 
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.resume()
+    def on_rows_removed(self, removed: int):
+        self.num_rows = len(self.dataset)
+        self.request_update()
 
-    def _execute_row_format(self, row_number, color, column_name=None):
-        if not column_name:
-            self.datatable.rows[row_number].color = ft.colors.with_opacity(0.3, color)
-        else:
-            cells = self.datatable.rows[row_number].cells
-            idx = 0
-            for cell in cells:
-                if self.column_spec[idx].name == column_name:
-                    cell.color = color
-                    self.datatable.rows[row_number].cells[idx] = cell
\ No newline at end of file
+    def on_rows_appended(self, appended: int, evicted: int):
+        self.apply_filters()
+        self.num_rows = len(self.dataset)
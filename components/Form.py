@@ -2,8 +2,11 @@
 
 
 import flet as ft
+from collections.abc import Mapping
 from typing import Any
 
+from ..utils.UpdateScheduler import UpdateScheduler
+
 class ValueSpec():
     def __init__(self, value, width=None, disabled: bool = False) -> None:
         self.value = value
@@ -18,6 +21,9 @@ class ItemSpec():
         self.visible = visible
 
 class Form(ft.UserControl):
+
+    DEFAULT_FIELD_WIDTH = 200
+
     def __init__(self, items: list[ItemSpec]) -> None:
 
         form_entries = ft.Column([])
@@ -40,7 +46,7 @@ class Form(ft.UserControl):
                         ] 
                         if item.value.width else
                         [
-                            ft.TextField(label=item.key, value=item.value.value, disabled=item.value.disabled, visible=item.visible, width=200, border=ft.InputBorder.OUTLINE)
+                            ft.TextField(label=item.key, value=item.value.value, disabled=item.value.disabled, visible=item.visible, width=self.DEFAULT_FIELD_WIDTH, border=ft.InputBorder.OUTLINE)
                         ],
                         alignment=ft.MainAxisAlignment.CENTER
                     )
@@ -58,28 +64,123 @@ class Form(ft.UserControl):
         self.form_entries = form_entries
         self.items = items
 
+        # key -> positions of its items, built once so that lookups don't scan the items
+        self.key_index = {}
+        for idx, item in enumerate(items):
+            self.key_index.setdefault(item.key, []).append(idx)
+
         ft.UserControl.__init__(self)
+
+    def get_value_control(self, idx: int) -> ft.Control:
+        """Returns the control showing the value of the item at idx: its Text, or its TextField for a ValueSpec"""
+        row = self.form_entries.controls[idx]
+        return row.controls[0] if isinstance(self.items[idx].value, ValueSpec) else row.controls[1]
     
-    def get_value_by_key(self, key: str) -> ft.Control:
-        for idx, item in enumerate(self.items):
-            if item.key == key:
-                return self.form_entries.controls[idx].controls[0].value
+    def get_value_by_key(self, key: str) -> any:
+        idx = self.get_control_index_by_key(key)
+        if idx is not None:
+            return self.get_value_control(idx).value
     
     def update_value_by_key(self, key: str, value: any):
-        for idx, item in enumerate(self.items):
-            if item.key == key and not isinstance(item.value, ValueSpec):
+        for idx in self.key_index.get(key, ()):
+            if not isinstance(self.items[idx].value, ValueSpec):
                 self.form_entries.controls[idx].controls[1].value = value
-                self.update()
+                # values changed one after the other are sent with a single update
+                UpdateScheduler.shared().mark_dirty(self)
+
+    def update_values(self, values: dict[str, any]) -> int:
+        """
+        Sets the values of several items at once, TextFields included, and sends a single update with only the
+        controls whose value changed (see patch_item). Keys without an item are ignored. Returns the number of
+        controls changed
+        """
+        changed = {}
+        for key, value in values.items():
+            for idx in self.key_index.get(key, ()):
+                for control in self.patch_item(idx, value):
+                    changed[id(control)] = control
+        if changed:
+            UpdateScheduler.shared().mark_dirty(*changed.values())
+        return len(changed)
+
+    def patch_item(self, idx: int, value: any) -> list[ft.Control]:
+        """
+        Sets the value of the item at idx if it differs from the displayed one. A ValueSpec also sets the disabled
+        flag and the width of a TextField, an ItemSpec the visibility, only when they differ. The kind of the item
+        never changes, a Text stays a Text. Returns the controls changed
+        """
+        changed = []
+        row = self.form_entries.controls[idx]
+        visible = None
+        if isinstance(value, ItemSpec):
+            visible, value = value.visible, value.value
+
+        if isinstance(self.items[idx].value, ValueSpec):
+            field = row.controls[0]
+            if isinstance(value, ValueSpec):
+                width = value.width or self.DEFAULT_FIELD_WIDTH
+                if field.disabled != value.disabled or field.width != width:
+                    field.disabled = value.disabled
+                    field.width = width
+                    changed.append(field)
+                value = value.value
+            if visible is not None and field.visible != visible:
+                field.visible = visible
+                changed.append(field)
+            # an empty TextField stands for None, the value given to the constructor may not be a str yet
+            text = "" if value is None else f"{value}"
+            if ("" if field.value is None else f"{field.value}") != text:
+                field.value = text
+                changed.append(field)
+            return changed
+
+        label, text_control = row.controls
+        if isinstance(value, ValueSpec):
+            value = value.value
+        if visible is not None and label.visible != visible:
+            label.visible = visible
+            changed.append(label)
+        text = f"{value}"
+        if text_control.value != text:
+            text_control.value = text
+            changed.append(text_control)
+        return changed
+
+    def bind(self, record: any) -> int:
+        """
+        Shows the values of another record in place, the controls are built once with the form and reused, e.g. for
+        the details of the selected row of a table:
+
+            form = CustomComponentFactory.create_form(items)
+            ...
+            form.bind(selected_record)
+
+        record: a dict of key -> value, an object with an attribute per key, or a list of ItemSpec with the layout of
+        the form. Values may be given as ValueSpec (or ItemSpec) to change the disabled flag and width (or the
+        visibility) of an item, which otherwise stay as they are. Keys missing from record keep their value.
+        Only the controls that changed are sent, with a single update. Returns the number of controls changed
+        """
+        if isinstance(record, Mapping):
+            values = record
+        elif isinstance(record, (list, tuple)):
+            values = {item.key: item for item in record}
+        else:
+            values = {key: getattr(record, key) for key in self.key_index if hasattr(record, key)}
+        return self.update_values(values)
+
+    def get_values(self) -> dict[str, any]:
+        """Returns the value of every key, the first item's one for a key given to several items"""
+        return {key: self.get_value_control(positions[0]).value for key, positions in self.key_index.items()}
     
     def get_control_index_by_key(self, key: str):
-        for idx, item in enumerate(self.items):
-            if item.key == key:
-                return idx
+        positions = self.key_index.get(key)
+        if positions:
+            return positions[0]
     
     def display_error_message(self, msg: str):
         self.form_entries.controls[-1].controls[0].value = msg
         self.form_entries.controls[-1].controls[0].visible = True
-        self.update()
+        UpdateScheduler.shared().mark_dirty(self)
 
     def build(self):
         return self.form_entries
\ No newline at end of file
@@ -1,18 +1,36 @@
 
 
 import flet as ft
-from typing import TypeVar, List
+from typing import TypeVar, List, Optional
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Lock
+import asyncio
 import inspect
 
-from ._DataTable import _DataTable, ColumnSpec
+from ._DataTable import _DataTable, ColumnSpec, ToggleFilterSpec
+from ..utils.ColumnarDataset import ColumnarDataset
+from ..utils.PageCache import PageCache
 import time
+import logging
 
 T = TypeVar('T')
+logger = logging.getLogger(__name__)
 
 class LazyPaginatedDataTable(_DataTable, ft.UserControl):
 
     DEFAULT_ROW_PER_PAGE = 5
 
+    # offset: lazy_callback(skip, limit), cursor: lazy_callback(cursor, limit, direction)
+    PAGINATION_MODES = ('offset', 'cursor')
+
+    # seconds an async page request waits for further navigations before it is loaded
+    DEBOUNCE_SECONDS = 0.15
+
+    # shared by all the lazy tables to prefetch pages in background
+    PREFETCH_WORKERS = 4
+    _prefetch_executor = None
+    _prefetch_executor_lock = Lock()
+
     def __init__(
             self,
             columns: list[ColumnSpec],
@@ -20,7 +38,13 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
             on_select_changed_callback = None,
             lazy_callback = None,
             rows_per_page: int = DEFAULT_ROW_PER_PAGE,
-            count = None
+            count = None,
+            page_cache_size: int = 0,
+            page_cache_ttl: float = None,
+            prefetch_pages: int = 0,
+            prefetch_in_one_call: bool = False,
+            filters: list[ToggleFilterSpec] = None,
+            pagination: str = 'offset'
     ):
         """
         A customized user control which returns a paginated data table. It offers the possibility to organize data
@@ -28,8 +52,26 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
 
         :parameter datatable: a DataTable object to be used
         :parameter rows_per_page: the number of rows to be shown per page
+        :parameter page_cache_size: number of pages returned by lazy_callback kept in an LRU cache, 0 disables the cache
+        :parameter page_cache_ttl: seconds after which a cached page is fetched again, None to keep it until evicted
+        :parameter prefetch_pages: number of pages before and after the current one fetched in background after each navigation (requires the cache)
+        :parameter prefetch_in_one_call: fetch consecutive prefetched pages with a single lazy_callback call
+        :parameter lazy_callback: function(skip, limit) returning the records of a page, it may be an async def when the
+            app runs in asyncio mode: page loads then don't block the session, quick navigations are coalesced into a
+            single load of the last requested page and loads of pages already left are cancelled.
+            If it also accepts sort and/or filters keyword arguments, sorting and filtering are done by the data
+            source: sort receives (field name, ascending) of the column sorted from the header, or None, and filters
+            the names of the active filters. It may then return (records, total count) so the number of pages follows
+            the filters
+        :parameter filters: filters shown as toggles above the table, their names are passed to lazy_callback
+        :parameter pagination: offset to fetch the pages by (skip, limit), or cursor for keyset pagination, where
+            deep pages don't cost more than the first ones: lazy_callback(cursor, limit, direction) returns
+            (records, prev_cursor, next_cursor), optionally followed by the total count. direction is 'next' to
+            fetch the rows after cursor, 'prev' for the rows before it, in display order; a None cursor starts from
+            the first row, or the last one with 'prev'. prev_cursor and next_cursor are the keys of the first and
+            last records of the page, None when there are no rows before or after it
         """
-        _DataTable.__init__(self, columns, data, on_select_changed_callback)
+        _DataTable.__init__(self, columns, data, on_select_changed_callback, filters=filters)
 
         # self.dt = datatable
         self.rows_per_page = rows_per_page
@@ -87,6 +129,9 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
         # will display the number of rows in the table
         self.v_count = ft.Text(weight=ft.FontWeight.BOLD)
 
+        # shown in the footer while an async page load is pending
+        self.v_loading = ft.ProgressRing(width=16, height=16, stroke_width=2, visible=False)
+
         self.pdt = ft.DataTable(
             columns=self.datatable.columns,
             rows=self.build_rows(),
@@ -106,19 +151,68 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
             sort_ascending=self.datatable.sort_ascending
         )
 
+        self.render_actions(self.pdt.rows)
+
         self.table_ft_column =  ft.Column(
             controls=[ft.Row([self.pdt])], scroll=ft.ScrollMode.AUTO
         )
 
+        if pagination not in self.PAGINATION_MODES:
+            raise ValueError(f"pagination must be one of {self.PAGINATION_MODES}")
+        self.pagination = pagination
+
         if lazy_callback:
-            sig = inspect.signature(lazy_callback)
-            if str(sig) != "(skip: int, limit: int)":
+            params = list(inspect.signature(lazy_callback).parameters)
+            if pagination == 'offset' and params[:2] != ['skip', 'limit']:
                 raise ValueError("Function signature must be (skip: int, limit: int)")
+            if pagination == 'cursor' and params[:3] != ['cursor', 'limit', 'direction']:
+                raise ValueError("Function signature must be (cursor, limit: int, direction: str)")
 
         self.lazy_callback = lazy_callback
+        self.is_async_callback = inspect.iscoroutinefunction(lazy_callback)
+        # query arguments the data source accepts besides skip and limit
+        self.query_args = []
+        if lazy_callback:
+            parameters = inspect.signature(lazy_callback).parameters
+            accepts_kwargs = any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters.values())
+            self.query_args = [name for name in ('sort', 'filters') if name in parameters or accepts_kwargs]
+
+        # (field name, ascending) of the column the data source sorts by, None for its default order
+        self.sort = None
+        # query state -> total count returned by the data source for it
+        self.query_counts = {}
+        # (query state, page) -> ((cursor, limit, direction) the page was fetched with, prev_cursor, next_cursor)
+        self.cursor_checkpoints = {}
+        # guards query_counts and cursor_checkpoints, written by the prefetch threads
+        self.cursor_lock = Lock()
+
+        if 'sort' in self.query_args:
+            for idx, column in zip(self.displayed_columns, self.datatable.columns):
+                column.on_sort = lambda e, idx=idx: self.set_sort(idx, e.ascending)
+            self.pdt.sort_column_index = None
+
+        # filters are applied by the data source
+        self.v_filters.visible = bool(self.filters) and 'filters' in self.query_args
+
+        # page targeted by the navigations while an async load is pending, None when no load is pending
+        self.pending_page = None
+        self.page_load_task = None
+        # tasks started on the event loop, kept until they are done so that their errors are logged
+        self.tasks = set()
         self.skip = 0
         self.limit = self.rows_per_page
 
+        self.page_cache = PageCache(page_cache_size, page_cache_ttl)
+        self.prefetch_pages = prefetch_pages
+        # pages are fetched from the cursors of their neighbours, one at a time
+        self.prefetch_in_one_call = prefetch_in_one_call and pagination == 'offset'
+        # page key -> Future of the prefetch fetching it
+        self.prefetch_futures = {}
+        self.prefetch_lock = Lock()
+        # bumped by invalidate_cache, the pages and cursors fetched for an older generation are dropped
+        self.cache_generation = 0
+        self.page_cache.put(self.get_page_key(self.current_page), list(self.dataset))
+
         ft.UserControl.__init__(self)
 
     def set_rows_per_page(self, new_row_per_page: str):
@@ -127,30 +221,385 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
     def set_page(self, page: [str, int, None] = None, delta: int = 0):
         pass
 
+    def get_target_page(self) -> int:
+        """Page the navigation buttons move from: the page being loaded if any, else the current page"""
+        return self.pending_page if self.pending_page is not None else self.current_page
+
     def next_page(self, e: ft.ControlEvent):
         """sets the current page to the next page"""
-        if self.current_page < self.num_pages:
-            
-            skip = self.current_page  * self.rows_per_page
-            res = self.lazy_callback(skip, self.rows_per_page)
-            
-            self.redraw_on_next_prev(res, self.current_page + 1)
+        if self.get_target_page() < self.num_pages:
+            self.goto_page(self.get_target_page() + 1)
 
     def prev_page(self, e: ft.ControlEvent):
         """set the current page to the previous page"""
+        if (self.get_target_page() - 1) > 0:
+            self.goto_page(self.get_target_page() - 1)
+
+    def goto_page(self, page: int):
+        """Displays the given page, taking it from the page cache when possible, then prefetches its neighbours"""
+        loop = self.get_running_loop()
+        if self.is_async_callback and loop is not None:
+            self.request_page(page, loop)
+            return
+
+        res = self.fetch_page(page)
+        # the dataset is modified in place on removals, so the cached page is copied
+        self.redraw_on_next_prev(list(res), page)
+        self.prefetch_around(page)
+
+    @staticmethod
+    def get_running_loop():
+        """Returns the event loop of the session when the app runs in asyncio mode, None otherwise"""
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def request_page(self, page: int, loop: asyncio.AbstractEventLoop):
+        """
+        Asks for a page without blocking the event loop. The load starts after DEBOUNCE_SECONDS, a new request in
+        the meantime replaces it, and a load still running when another page is requested is cancelled.
+        """
+        self.cancel_page_load()
+
+        res = self.page_cache.get(self.get_page_key(page))
+        if res is not None:
+            self.redraw_on_next_prev(list(res), page, update=False)
+            self.set_loading(None)
+            self.create_task(loop, self.send_update_async())
+            self.prefetch_around(page)
+            return
+
+        self.set_loading(page)
+        self.page_load_task = self.create_task(loop, self.load_page_async(page))
+        self.create_task(loop, self.send_update_async())
+
+    def create_task(self, loop: asyncio.AbstractEventLoop, coro) -> asyncio.Task:
+        """Runs coro on the event loop, keeping a reference to the task until it is done and logging its error"""
+        task = loop.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.on_task_done)
+        return task
+
+    def on_task_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Error in task of table %s: %s", self.table_uuid, task.exception())
+
+    def cancel_page_load(self):
+        if self.page_load_task is not None and not self.page_load_task.done():
+            self.page_load_task.cancel()
+        self.page_load_task = None
+
+    def set_loading(self, page):
+        """Shows the loading state in the footer while page is pending, hides it when page is None"""
+        self.pending_page = page
+        self.v_loading.visible = page is not None
+        self.v_current_page.value = f"{self.current_page if page is None else page}/{self.num_pages}"
+
+    async def load_page_async(self, page: int):
+        try:
+            await asyncio.sleep(self.DEBOUNCE_SECONDS)
+            res = await self.fetch_page_async(page)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Error loading page %s of table %s: %s", page, self.table_uuid, e)
+            self.set_loading(None)
+            await self.send_update_async()
+            return
+
+        self.page_load_task = None
+        self.redraw_on_next_prev(list(res), page, update=False)
+        self.set_loading(None)
+        try:
+            await self.send_update_async()
+        finally:
+            self.prefetch_around(page)
+
+    async def fetch_page_async(self, page: int) -> list:
+        """Async counterpart of fetch_page, awaiting lazy_callback"""
+        key = self.get_page_key(page)
+        generation = self.cache_generation
+        res = self.page_cache.get(key)
+        if res is not None:
+            return res
+
+        with self.prefetch_lock:
+            future = self.prefetch_futures.get(key)
+        if future is not None:
+            # cancelling this load must not cancel the prefetch, whose pages are still worth caching
+            await asyncio.shield(asyncio.wrap_future(future) if isinstance(future, Future) else future)
+            res = self.page_cache.get(key)
+            if res is not None:
+                return res
+
+        for p in self.get_cursor_path(page):
+            # cached pages may have no checkpoint yet, like the first page given to the constructor
+            p_key = self.get_page_key(p)
+            self.cache_page(p_key, await self.call_lazy_callback_async(p_key, generation), generation)
+
+        res = await self.call_lazy_callback_async(key, generation)
+        self.cache_page(key, res, generation)
+        return res
+
+    def call_lazy_callback(self, key: tuple, generation: int = None) -> list:
+        """Calls lazy_callback for a page key outside of an event loop, running it to completion if it is an async def.
+        generation is the cache generation the call was requested in, defaults to the current one"""
+        generation = self.cache_generation if generation is None else generation
+        args = self.get_source_args(key)
+        start = time.perf_counter()
+        res = self.lazy_callback(*args, **self.get_query_args(key[2]))
+        if self.is_async_callback:
+            res = asyncio.run(res)
+        if self.metrics:
+            self.metrics.observe('lazy_callback', time.perf_counter() - start)
+        return self.unpack_result(res, key, args, generation)
+
+    async def call_lazy_callback_async(self, key: tuple, generation: int = None) -> list:
+        generation = self.cache_generation if generation is None else generation
+        args = self.get_source_args(key)
+        start = time.perf_counter()
+        res = await self.lazy_callback(*args, **self.get_query_args(key[2]))
+        if self.metrics:
+            self.metrics.observe('lazy_callback', time.perf_counter() - start)
+        return self.unpack_result(res, key, args, generation)
+
+    def get_source_args(self, key: tuple) -> tuple:
+        """Returns the positional arguments of lazy_callback for a page key"""
+        skip, limit, query_state = key
+        if self.pagination == 'offset':
+            return (skip, limit)
+        page = skip // self.rows_per_page + 1
+        request = self.get_cursor_request(page, query_state)
+        if request is None:
+            raise LookupError(f"No cursor leads to page {page}")
+        return request
+
+    def get_cursor_request(self, page: int, query_state: tuple) -> Optional[tuple]:
+        """
+        Returns the (cursor, limit, direction) fetching a page: the one it was fetched with before, if any, else the
+        cursor of a neighbouring page. The first and the last pages are fetched from the ends of the data source.
+        Returns None when no known cursor leads to the page.
+        """
+        with self.cursor_lock:
+            checkpoint = self.cursor_checkpoints.get((query_state, page))
+            previous = self.cursor_checkpoints.get((query_state, page - 1))
+            following = self.cursor_checkpoints.get((query_state, page + 1))
+        if checkpoint is not None:
+            return checkpoint[0]
+        if page == 1:
+            return (None, self.rows_per_page, 'next')
+        if page == self.num_pages:
+            # the last page holds the remainder of the rows, so the pages before it keep their boundaries
+            return (None, self.num_rows - (page - 1) * self.rows_per_page, 'prev')
+        if previous is not None and previous[2] is not None:
+            return (previous[2], self.rows_per_page, 'next')
+        if following is not None and following[1] is not None:
+            return (following[1], self.rows_per_page, 'prev')
+        return None
+
+    def get_cursor_path(self, page: int) -> list[int]:
+        """Returns the pages to fetch, in order, before a page no known cursor leads to. Empty in offset mode"""
+        query_state = self.get_query_state()
+        if self.pagination == 'offset' or self.get_cursor_request(page, query_state) is not None:
+            return []
+        # walks from the closest page whose cursor is known, or from an end of the data source
+        with self.cursor_lock:
+            known = {p for state, p in self.cursor_checkpoints if state == query_state}
+        below = max((p for p in known if p < page), default=0)
+        above = min((p for p in known if page < p <= self.num_pages), default=self.num_pages + 1)
+        if page - below <= above - page:
+            return list(range(below + 1, page))
+        return list(range(above - 1, page, -1))
+
+    def get_query_state(self) -> tuple:
+        """State of the query sent to lazy_callback besides skip and limit, it is part of the page cache keys"""
+        return (self.sort, tuple(f.name for f in self.filters if f.active))
+
+    def get_query_args(self, query_state: tuple) -> dict:
+        """Returns the keyword arguments of lazy_callback for a query state, limited to those it accepts"""
+        sort, filters = query_state
+        args = {'sort': sort, 'filters': list(filters)}
+        return {name: args[name] for name in self.query_args}
+
+    def set_sort(self, column_index: int, ascending: bool):
+        """Sorts the data source by the given column and displays the first page"""
+        column = self.column_spec[column_index]
+        self.sort = (column.original_field_name or column.name, ascending)
+        self.pdt.sort_column_index = self.cell_positions.get(column_index)
+        self.pdt.sort_ascending = ascending
+        self.on_view_changed()
+
+    def clear_sort(self):
+        self.sort = None
+        self.pdt.sort_column_index = None
+        self.on_view_changed()
+
+    def on_view_changed(self):
+        # pages of the previous query are not needed anymore
+        self.invalidate_cache(query_changed=True)
+        self.goto_page(1)
+
+    def unpack_result(self, res, key: tuple, args: tuple = None, generation: int = None) -> list:
+        """Returns the records of a lazy_callback result, keeping the total count when the result is (records, count).
+        In cursor mode the cursors of the page are kept as a checkpoint. Counts and cursors of a result requested
+        before the cache was invalidated (an older generation) are not kept"""
+        if self.pagination == 'cursor':
+            records, prev_cursor, next_cursor, *total = res
+            with self.cursor_lock:
+                # invalidate_cache bumps the generation holding the lock, a stale result can't put its cursors back
+                if generation is None or generation == self.cache_generation:
+                    self.cursor_checkpoints[(key[2], key[0] // self.rows_per_page + 1)] = (args, prev_cursor, next_cursor)
+                    if total:
+                        self.query_counts[key[2]] = total[0]
+            return ColumnarDataset.wrap(records)
+        if isinstance(res, tuple) and len(res) == 2 and isinstance(res[1], int):
+            res, total = res
+            with self.cursor_lock:
+                if generation is None or generation == self.cache_generation:
+                    self.query_counts[key[2]] = total
+        # columnar pages are wrapped, so the copies made by the callers hold dict records instead of numpy items
+        return ColumnarDataset.wrap(res)
+
+    def update_count(self):
+        """Sets the number of rows to the total count returned by the data source for the current query, if any"""
+        with self.cursor_lock:
+            self.num_rows = self.query_counts.get(self.get_query_state(), self.num_rows)
+        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
+        self.num_pages = p_int + (1 if p_add else 0)
 
-        if (self.current_page - 1) > 0:
-        
-            if (self.current_page - 1) == 1:
-                skip = 0
-            # elif self.current_page == self.num_pages:
-            #     num_rows = len(self.dataset)
-            #     skip = (self.current_page - 1)  * (self.rows_per_page - num_rows)
+    def get_page_key(self, page: int) -> tuple:
+        return ((page - 1) * self.rows_per_page, self.rows_per_page, self.get_query_state())
+
+    def fetch_page(self, page: int) -> list:
+        """Returns the records of a page from the cache, from a running prefetch or from lazy_callback"""
+        key = self.get_page_key(page)
+        generation = self.cache_generation
+        res = self.page_cache.get(key)
+        if res is not None:
+            return res
+
+        with self.prefetch_lock:
+            future = self.prefetch_futures.get(key)
+        if future is not None:
+            # the page is being prefetched, waiting for it is cheaper than fetching it again
+            future.result()
+            res = self.page_cache.get(key)
+            if res is not None:
+                return res
+
+        for p in self.get_cursor_path(page):
+            # cached pages may have no checkpoint yet, like the first page given to the constructor
+            p_key = self.get_page_key(p)
+            self.cache_page(p_key, self.call_lazy_callback(p_key, generation), generation)
+
+        res = self.call_lazy_callback(key, generation)
+        self.cache_page(key, res, generation)
+        return res
+
+    def cache_page(self, key: tuple, page: list, generation: int, prefetched: bool = False):
+        """Puts a page in the cache, unless it was requested before the cache was last invalidated"""
+        with self.prefetch_lock:
+            if generation == self.cache_generation:
+                self.page_cache.put(key, page, prefetched=prefetched)
+
+    def prefetch_around(self, page: int):
+        """Fetches in background the prefetch_pages pages before and after page which are not cached yet"""
+        if self.prefetch_pages <= 0 or self.page_cache.max_pages <= 0:
+            return
+
+        pages = []
+        for distance in range(1, self.prefetch_pages + 1):
+            for p in (page + distance, page - distance):
+                if 1 <= p <= self.num_pages and self.get_page_key(p) not in self.page_cache:
+                    # in cursor mode only the pages a known cursor leads to can be fetched
+                    if self.pagination == 'offset' or self.get_cursor_request(p, self.get_query_state()) is not None:
+                        pages.append(p)
+
+        with self.prefetch_lock:
+            keys = [(p, self.get_page_key(p)) for p in pages]
+            keys = [(p, key) for p, key in keys if key not in self.prefetch_futures]
+            if not keys:
+                return
+
+            if self.prefetch_in_one_call:
+                # consecutive pages are fetched together
+                batches = []
+                for p, key in sorted(keys):
+                    if batches and batches[-1][-1][0] == p - 1:
+                        batches[-1].append((p, key))
+                    else:
+                        batches.append([(p, key)])
             else:
-                skip = (self.current_page - 2)  * self.rows_per_page
-
-            res = self.lazy_callback(skip, self.rows_per_page)
-            self.redraw_on_next_prev(res, self.current_page - 1)
+                batches = [[(p, key)] for p, key in keys]
+
+            loop = self.get_running_loop() if self.is_async_callback else None
+            for batch in batches:
+                batch_keys = [key for _, key in batch]
+                if loop is not None:
+                    # async callbacks are prefetched as tasks of the session event loop
+                    future = loop.create_task(self._prefetch_async(batch_keys, self.cache_generation))
+                else:
+                    future = self.get_prefetch_executor().submit(self._prefetch, batch_keys, self.cache_generation)
+                for key in batch_keys:
+                    self.prefetch_futures[key] = future
+
+    def _prefetch(self, keys: list[tuple], generation: int):
+        try:
+            skip, limit, query_state = keys[0]
+            self._cache_prefetched(keys, self.call_lazy_callback((skip, limit * len(keys), query_state), generation), generation)
+        except Exception as e:
+            logger.error("Error prefetching pages of table %s: %s", self.table_uuid, e)
+        finally:
+            self._prefetch_done(keys, generation)
+
+    async def _prefetch_async(self, keys: list[tuple], generation: int):
+        try:
+            skip, limit, query_state = keys[0]
+            self._cache_prefetched(keys, await self.call_lazy_callback_async((skip, limit * len(keys), query_state), generation), generation)
+        except Exception as e:
+            logger.error("Error prefetching pages of table %s: %s", self.table_uuid, e)
+        finally:
+            self._prefetch_done(keys, generation)
+
+    def _cache_prefetched(self, keys: list[tuple], res: list, generation: int):
+        limit = keys[0][1]
+        for idx, key in enumerate(keys):
+            self.cache_page(key, res[idx * limit:(idx + 1) * limit], generation, prefetched=True)
+
+    def _prefetch_done(self, keys: list[tuple], generation: int):
+        with self.prefetch_lock:
+            # the futures of an older generation were already dropped, newer prefetches of the same keys are kept
+            if generation != self.cache_generation:
+                return
+            for key in keys:
+                self.prefetch_futures.pop(key, None)
+
+    @classmethod
+    def get_prefetch_executor(cls) -> ThreadPoolExecutor:
+        with cls._prefetch_executor_lock:
+            if cls._prefetch_executor is None:
+                cls._prefetch_executor = ThreadPoolExecutor(max_workers=cls.PREFETCH_WORKERS, thread_name_prefix="lazy_prefetch")
+            return cls._prefetch_executor
+
+    def invalidate_cache(self, query_changed: bool = False):
+        """Drops the cached pages, the next navigations fetch them again from lazy_callback. Prefetches still running
+        are not waited for, the pages they return are dropped
+
+        query_changed: the sort or the filters have changed, no cursor is kept since the current page is of the previous query
+        """
+        # page boundaries may have moved, only the cursors of the current page still lead to its neighbours
+        current = None if query_changed else (self.get_query_state(), self.current_page)
+        with self.prefetch_lock, self.cursor_lock:
+            self.cache_generation += 1
+            self.prefetch_futures = {}
+            self.page_cache.invalidate()
+            self.cursor_checkpoints = {k: v for k, v in self.cursor_checkpoints.items() if k == current}
+
+    def cache_stats(self) -> dict:
+        """Returns the size and the hit, miss, eviction and prefetch counters of the page cache"""
+        return self.page_cache.stats()
 
     def build_rows(self) -> list:
         """
@@ -177,21 +626,19 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
             return 300
     
     def goto_first_page(self, e: ft.ControlEvent):
-        if self.current_page > 1:
-            res = self.lazy_callback(0, self.rows_per_page)
-            self.redraw_on_next_prev(res, 1)
+        if self.get_target_page() > 1:
+            self.goto_page(1)
 
     def goto_last_page(self, e: ft.ControlEvent):
-        if self.current_page < self.num_pages:
-            skip = (self.num_pages - 1) * self.rows_per_page
-            res = self.lazy_callback(skip, self.rows_per_page)
-            self.redraw_on_next_prev(res, self.num_pages)
+        if self.get_target_page() < self.num_pages:
+            self.goto_page(self.num_pages)
 
     def build(self): 
         return ft.Row(
             controls=[
                 ft.Column(
                         [   
+                            self.v_filters,
                             self.table_ft_column,
                             ft.Row(
                                 [
@@ -221,7 +668,8 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
                                                 on_click=self.goto_last_page,
                                                 tooltip="Last Page",
                                                 icon_color=ft.colors.WHITE
-                                            )
+                                            ),
+                                            self.v_loading
                                         ]
                                     ),
                                     self.v_count,
@@ -238,7 +686,7 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
     def on_double_tap_page_changer(self, e):
         pass
 
-    def refresh_data(self):
+    def refresh_data(self, update: bool = True):
         self.pdt.rows = self.datatable.rows
 
         # display the total number of rows in the table.
@@ -250,103 +698,91 @@ class LazyPaginatedDataTable(_DataTable, ft.UserControl):
         self.current_page_changer_field.visible = False
         self.v_current_page.visible = True
 
-        if len(self.formatted_columns) > 0:
-            for elem in self.formatted_columns:
-                self.format_column(elem['column_name_to_format'], elem['_format'], elem['column_name_values'], elem['callback'])
+        # rows of the new page show their time left right away instead of at the next scheduler tick
+        self.fill_countdowns(self.pdt.rows)
+        # action buttons are only built and evaluated for the displayed rows
+        self.render_actions(self.pdt.rows)
 
         # update the control so the above changes are rendered in the UI
-        self.update()
+        if update:
+            self.request_update()
 
     def did_mount(self):
         self.refresh_data()
 
-    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None):
+    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None, key=None):
         
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.pause()
-
         if count == None:
             raise Exception("count must be specified with LazyPaginatedDatatable")
-        
-        self.num_rows = count
 
-        self.datatable.rows = []
-        self.pdt.rows = []
-        self.dataset = []
+        # the expiration scheduler must not work on the table while its dataset changes
+        with self.expiration_lock:
+            # a pending page load would overwrite the new dataset
+            self.cancel_page_load()
+            self.set_loading(None)
+            self.num_rows = count
+
+            stats = None
+            if key is not None:
+                # the page being displayed is refreshed in place
+                stats = self.diff_dataset(dataset, key)
+            else:
+                self.datatable.rows = []
+                self.pdt.rows = []
 
-        self.dataset = dataset
+                self.load_dataset(dataset)
 
-        self.datatable.rows = self.generate_datarows(self.column_spec, dataset, self.on_select_changed_callback)
+                self.datatable.rows = self.generate_datarows(self.column_spec, self.dataset, self.on_select_changed_callback, self.row_ids)
 
-        self.current_page = 1
+                self.current_page = 1
 
-        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
-        self.num_pages = p_int + (1 if p_add else 0)
+            p_int, p_add = divmod(self.num_rows, self.rows_per_page)
+            self.num_pages = p_int + (1 if p_add else 0)
 
-        self.refresh_data()
+            # the data source changed, cached pages may be stale
+            self.invalidate_cache()
+            self.page_cache.put(self.get_page_key(self.current_page), list(self.dataset))
+
+            self.refresh_data()
 
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.resume()
+        return stats
 
-    def redraw_on_next_prev(self, dataset: list[T], current_page):
+    def redraw_on_next_prev(self, dataset: list[T], current_page, update: bool = True):
         
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.pause()
+        # the expiration scheduler must not work on the table while its dataset changes
+        with self.expiration_lock:
+            self.datatable.rows = []
+            self.pdt.rows = []
 
-        self.datatable.rows = []
-        self.pdt.rows = []
-        self.dataset = []
+            self.load_dataset(dataset)
+
+            self.datatable.rows = self.generate_datarows(self.column_spec, self.dataset, self.on_select_changed_callback, self.row_ids)
 
-        self.dataset = dataset
+            self.update_count()
 
-        self.datatable.rows = self.generate_datarows(self.column_spec, self.dataset, self.on_select_changed_callback)
+            if self.current_page <= self.num_pages:
+                self.current_page = current_page
 
-        if self.current_page <= self.num_pages:
-            self.current_page = current_page
+            self.refresh_data(update)
 
+    def on_rows_removed(self, removed: int):
+        # records shift across the pages of the data source
+        self.invalidate_cache()
+        self.pdt.rows = []
+        # only the current page is held locally, the removed rows are subtracted from the total count
+        self.num_rows = max(0, self.num_rows - removed)
+        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
+        self.num_pages = p_int + (1 if p_add else 0)
         self.refresh_data()
 
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.resume()
-
-    def _execute_row_highlight(self, row_number):
-        c = self.datatable.rows[row_number].color
-        self.datatable.rows[row_number].color = "#a6a6a6"
-        self.update()
-        time.sleep(.14)
-        self.datatable.rows[row_number].color = "#b3b3b3"
-        self.update()
-        time.sleep(.18)
-        self.datatable.rows[row_number].color = "#bfbfbf"
-        self.update()
-        time.sleep(.08)
-        self.datatable.rows[row_number].color = c
-        self.update()
-
-    def _execute_row_format(self, row_number, color, column_name=None):
-        if not column_name:
-            self.datatable.rows[row_number].color = ft.colors.with_opacity(0.3, color)
-        else:
-            cells = self.datatable.rows[row_number].cells
-            idx = 0
-            for cell in cells:
-                 if self.column_spec[idx].name == column_name:
-                    cell.color = color
-                    self.datatable.rows[row_number].cells[idx] = cell
-
-        self.update()
-    
-    def remove_row(self, row: ft.DataRow):
-        for row_num, _row in enumerate(self.datatable.rows):
-            if _row == row:
-                self.datatable.rows.remove(row)
-                self.dataset.pop(row_num)
-                self.pdt.rows = []
-                self.num_rows = len(self.datatable.rows)
-                p_int, p_add = divmod(self.num_rows, self.rows_per_page)
-                self.num_pages = p_int + (1 if p_add else 0)
-                self.refresh_data()
-                break
-    
-    def watch_expiration(self, column_to_check: str, column_to_update: str, callback: any = None):
-        pass
\ No newline at end of file
+    def append_rows(self, records: list[T]):
+        """
+        Not supported: the records live in the data source and the table only holds the current page. Add them to
+        the data source, then call redraw.
+
+        :raise TypeError
+        """
+        raise TypeError("LazyPaginatedDatatable doesn't support append_rows, add the records to the data source and call redraw")
+
+    def get_visible_rows(self) -> list[ft.DataRow]:
+        return self.pdt.rows
@@ -2,16 +2,18 @@
 
 import flet as ft
 from typing import TypeVar, List
+from collections import OrderedDict
 
-from ._DataTable import _DataTable, ColumnSpec
+from ._DataTable import _DataTable, ColumnSpec, ToggleFilterSpec
+from ..utils.ColumnarDataset import ColumnarDataset
 import time
-import datetime
 
 T = TypeVar('T')
 
 class PaginatedDataTable(_DataTable, ft.UserControl):
 
     DEFAULT_ROW_PER_PAGE = 5
+    DEFAULT_PAGE_CACHE_SIZE = 5
 
     def __init__(
             self,
@@ -19,6 +21,14 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
             data: List[T],
             on_select_changed_callback = None,
             rows_per_page: int = DEFAULT_ROW_PER_PAGE,
+            visible_rows_only: bool = False,
+            page_cache_size: int = DEFAULT_PAGE_CACHE_SIZE,
+            sortable: bool = True,
+            filters: list[ToggleFilterSpec] = None,
+            filter_mode: str = 'AND',
+            searchable: bool = False,
+            max_rows: int = None,
+            auto_follow: bool = False,
     ):
         """
         A customized user control which returns a paginated data table. It offers the possibility to organize data
@@ -26,8 +36,24 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
 
         :parameter datatable: a DataTable object to be used
         :parameter rows_per_page: the number of rows to be shown per page
+        :parameter visible_rows_only: keep the raw records and build DataRows only for the page being displayed,
+            always the case for columnar data (a NumPy structured array or a dict of column arrays)
+        :parameter page_cache_size: number of recently viewed pages whose DataRows are kept when visible_rows_only is set
+        :parameter sortable: sort the rows by clicking the column headers
+        :parameter filters: filters shown as toggles above the table, pages only hold the records passing them
+        :parameter filter_mode: AND to display the records passing all the active filters, OR for any of them
+        :parameter searchable: show a search box, pages only hold the records matching it
+        :parameter max_rows: number of rows kept when rows are added with append_rows, the oldest ones are evicted
+        :parameter auto_follow: move to the last page when rows are appended while it is displayed
         """
-        _DataTable.__init__(self, columns, data, on_select_changed_callback)
+        self.auto_follow = auto_follow
+        # columnar data is read a page at a time, the records of the other pages are never built
+        self.visible_rows_only = visible_rows_only or ColumnarDataset.accepts(data)
+        self.page_cache_size = page_cache_size
+        # LRU of the built rows by row id, holding up to page_cache_size pages
+        self.row_cache = OrderedDict()
+
+        _DataTable.__init__(self, columns, data, on_select_changed_callback, build_rows=not self.visible_rows_only, filters=filters, filter_mode=filter_mode, searchable=searchable, max_rows=max_rows)
 
         # self.dt = datatable
         self.rows_per_page = rows_per_page
@@ -36,9 +62,9 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
         # self.num_rows = len(datatable.rows)
         self.current_page = 1
 
-        # Calculating the number of pages.
-        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
-        self.num_pages = p_int + (1 if p_add else 0)
+        # positions of the dataset in display order, None for the dataset order
+        self.view = None
+        self.update_view()
 
         # will display the current page number
         self.v_current_page = ft.Text(
@@ -101,6 +127,14 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
             sort_ascending=self.datatable.sort_ascending
         )
 
+        if sortable:
+            for idx, column in zip(self.displayed_columns, self.datatable.columns):
+                if not self.column_spec[idx].custom_actions:
+                    column.on_sort = lambda e, idx=idx: self.sort_by_column(idx, e.ascending)
+            self.pdt.sort_column_index = None
+
+        self.render_actions(self.pdt.rows)
+
         self.table_ft_column =  ft.Column(
             controls=[ft.Row([self.pdt])], scroll=ft.ScrollMode.AUTO
         )
@@ -126,12 +160,13 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
             self.rows_per_page = self.DEFAULT_ROW_PER_PAGE
         self.v_num_of_row_changer_field.value = str(self.rows_per_page)
 
-        # Calculating the number of pages.
-        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
-        self.num_pages = p_int + (1 if p_add else 0)
+        with self.expiration_lock:
+            # Calculating the number of pages.
+            self.update_num_pages()
 
-        self.set_page(page=1)
-        self.refresh_data()
+            # a single refresh for the new page size and the first page
+            self.current_page = 1
+            self.refresh_data()
 
     def set_page(self, page: [str, int, None] = None, delta: int = 0):
         """
@@ -143,16 +178,18 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
         :return: The current page number.
         :raise ValueError
         """
-        if page is not None:
-            try:
-                self.current_page = int(page) if 1 <= int(page) <= self.num_pages else 1
-            except ValueError:
-                self.current_page = 1
-        elif delta:
-            self.current_page += delta
-        else:
-            return
-        self.refresh_data()
+        # appended rows are flushed from the EffectsScheduler thread, the page is computed against a stable dataset
+        with self.expiration_lock:
+            if page is not None:
+                try:
+                    self.current_page = int(page) if 1 <= int(page) <= self.num_pages else 1
+                except ValueError:
+                    self.current_page = 1
+            elif delta:
+                self.current_page = max(1, min(self.current_page + delta, self.num_pages))
+            else:
+                return
+            self.refresh_data()
 
     def next_page(self, e: ft.ControlEvent):
         """sets the current page to the next page"""
@@ -174,10 +211,38 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
 
     def build_rows(self) -> list:
         """
-        Returns a slice of indexes, using the start and end values returned by the paginate() function
+        Returns a slice of indexes, using the start and end values returned by the paginate() function.
+        When visible_rows_only is set, the rows of the current page are built from the raw records (or taken
+        from the page cache) and become the rows returned by get_rows().
         :return: The rows of data that are being displayed on the page.
         """
-        return self.datatable.rows[slice(*self.paginate())]
+        with self.expiration_lock:
+            i1, i2 = self.paginate()
+            if self.view is None:
+                if not self.visible_rows_only:
+                    return self.datatable.rows[i1:i2]
+                positions = range(i1, min(i2, len(self.dataset)))
+            else:
+                positions = self.view[i1:i2]
+
+            if not self.visible_rows_only:
+                return [self.datatable.rows[pos] for pos in positions]
+
+            row_ids = [self.row_ids[pos] for pos in positions]
+            missing = [pos for pos in positions if self.row_ids[pos] not in self.row_cache]
+            if missing:
+                built = self.generate_datarows(self.column_spec, self.take_records(missing), self.on_select_changed_callback, [self.row_ids[pos] for pos in missing])
+                self.row_cache.update(zip((self.row_ids[pos] for pos in missing), built))
+
+            rows = []
+            for row_id in row_ids:
+                self.row_cache.move_to_end(row_id)
+                rows.append(self.row_cache[row_id])
+            while len(self.row_cache) > max(1, self.page_cache_size) * self.rows_per_page:
+                self.row_cache.popitem(last=False)
+
+            self.datatable.rows = rows
+            return rows
 
     def paginate(self) -> tuple[int, int]:
         """
@@ -191,6 +256,26 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
 
         return i1, i2
 
+    def update_num_pages(self):
+        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
+        self.num_pages = p_int + (1 if p_add else 0)
+        self.current_page = max(1, min(self.current_page, self.num_pages))
+
+    def update_view(self):
+        """Recomputes the displayed positions of the dataset and the pagination over them"""
+        self.view = self.get_view()
+        self.num_rows = len(self.view) if self.view is not None else len(self.dataset)
+        self.update_num_pages()
+
+    def on_view_changed(self):
+        with self.expiration_lock:
+            # the table only has the columns that are displayed
+            self.pdt.sort_column_index = self.cell_positions.get(self.sort_spec[0][0]) if self.sort_spec else None
+            self.pdt.sort_ascending = self.sort_spec[0][1] if self.sort_spec else False
+            self.current_page = 1
+            self.update_view()
+            self.refresh_data()
+
     def get_height(self):
         while True:
             time.sleep(5)
@@ -201,6 +286,8 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
             controls=[
                 ft.Column(
                         [   
+                            self.v_search,
+                            self.v_filters,
                             self.table_ft_column,
                             ft.Row(
                                 [
@@ -257,156 +344,84 @@ class PaginatedDataTable(_DataTable, ft.UserControl):
         self.current_page_changer_field.value = str(self.current_page)
         self.v_current_page.visible = not self.v_current_page.visible
         self.current_page_changer_field.visible = not self.current_page_changer_field.visible
-        self.update()
-
-    def refresh_data(self):
-        # Setting the rows of the paginated datatable to the rows returned by the `build_rows()` function.
-        self.pdt.rows = self.build_rows()
-        # display the total number of rows in the table.
-        self.v_count.value = f"Total Rows: {self.num_rows}"
-        # the current page number versus the total number of pages.
-        self.v_current_page.value = f"{self.current_page}/{self.num_pages}"
-
-        # update the visibility of controls in the gesture detector
-        self.current_page_changer_field.visible = False
-        self.v_current_page.visible = True
-
-        if len(self.formatted_columns) > 0:
-            for elem in self.formatted_columns:
-                self.format_column(elem['column_name_to_format'], elem['_format'], elem['column_name_values'], elem['callback'])
+        self.request_update()
+
+    def refresh_data(self, update: bool = True):
+        # appended rows are flushed from the EffectsScheduler thread, they must not change the dataset while the page is built
+        with self.expiration_lock:
+            # Setting the rows of the paginated datatable to the rows returned by the `build_rows()` function.
+            self.pdt.rows = self.build_rows()
+            # display the total number of rows in the table.
+            self.v_count.value = f"Total Rows: {self.num_rows}"
+            # the current page number versus the total number of pages.
+            self.v_current_page.value = f"{self.current_page}/{self.num_pages}"
+
+            # update the visibility of controls in the gesture detector
+            self.current_page_changer_field.visible = False
+            self.v_current_page.visible = True
+
+            # rows of the new page show their time left right away instead of at the next scheduler tick
+            self.fill_countdowns(self.pdt.rows)
+            # action buttons are only built and evaluated for the displayed rows
+            self.render_actions(self.pdt.rows)
 
         # update the control so the above changes are rendered in the UI
-        self.update()
+        if update:
+            self.request_update()
 
     def did_mount(self):
         self.refresh_data()
 
-    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None):
+    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None, key=None):
         
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.pause()
-
-        self.datatable.rows = []
-        self.pdt.rows = []
-
-        self.dataset = dataset
-
-        self.datatable.rows = self.generate_datarows(self.column_spec, dataset, self.on_select_changed_callback)
+        # the expiration scheduler must not work on the table while its dataset changes
+        with self.expiration_lock:
+            stats = None
+            if key is not None:
+                # rows are reused, so the user stays on the same page
+                stats = self.diff_dataset(dataset, key)
+            else:
+                self.datatable.rows = []
+                self.pdt.rows = []
 
-        self.num_rows = len(self.datatable.rows)
+                self.load_dataset(dataset)
 
-        p_int, p_add = divmod(self.num_rows, self.rows_per_page)
-        self.num_pages = p_int + (1 if p_add else 0)
+                if self.visible_rows_only:
+                    self.row_cache.clear()
+                else:
+                    self.datatable.rows = self.generate_datarows(self.column_spec, self.dataset, self.on_select_changed_callback, self.row_ids)
 
-        self.current_page = 1
+                self.current_page = 1
 
-        self.refresh_data()
+            # the sort is kept, the new records are sorted by it
+            self.update_view()
 
-        if self.expiration_watcher_started:
-            self.expiration_update_thread.resume()
-
-    def _execute_row_highlight(self, row_number):
-        c = self.datatable.rows[row_number].color
-        self.datatable.rows[row_number].color = "#a6a6a6"
-        self.update()
-        time.sleep(.14)
-        self.datatable.rows[row_number].color = "#b3b3b3"
-        self.update()
-        time.sleep(.18)
-        self.datatable.rows[row_number].color = "#bfbfbf"
-        self.update()
-        time.sleep(.08)
-        self.datatable.rows[row_number].color = c
-        self.update()
-
-    def _execute_row_format(self, row_number, color, column_name=None):
-        if not column_name:
-            self.datatable.rows[row_number].color = ft.colors.with_opacity(0.3, color)
-        else:
-            cells = self.datatable.rows[row_number].cells
-            idx = 0
-            for cell in cells:
-                 if self.column_spec[idx].name == column_name:
-                    cell.color = color
-                    self.datatable.rows[row_number].cells[idx] = cell
-
-        self.update()
-    
-    def remove_row(self, row: ft.DataRow):
-        for row_num, _row in enumerate(self.datatable.rows):
-            if _row == row:
-                self.datatable.rows.remove(row)
-                self.dataset.pop(row_num)
-                self.pdt.rows = []
-                self.num_rows = len(self.datatable.rows)
-                p_int, p_add = divmod(self.num_rows, self.rows_per_page)
-                self.num_pages = p_int + (1 if p_add else 0)
-                self.refresh_data()
-                break
+            self.refresh_data()
 
-    def watch_expiration(self, column_to_check: str, column_to_update: str, callback: any = None):
+        return stats
 
-        # converts datetimes to seconds left - must be executed each time the method is called again
+    def get_built_row(self, pos: int) -> ft.DataRow:
+        if self.visible_rows_only and self.row_ids[pos] in self.row_cache:
+            return self.row_cache[self.row_ids[pos]]
+        return super().get_built_row(pos)
 
-        def convert(seconds):
-            min, sec = divmod(seconds, 60)
-            hour, min = divmod(min, 60)
+    def get_reusable_rows(self) -> dict:
+        if self.visible_rows_only:
+            return self.row_cache
+        return super().get_reusable_rows()
 
-            return '%02d:%02d:%02d' % (hour, min, sec)
+    def on_rows_removed(self, removed: int):
+        self.pdt.rows = []
+        self.update_view()
+        self.refresh_data()
 
-        for row in self.pdt.rows:
-            # idx = 0
-            for idx, cell in enumerate(row.cells):
-                try:
-                    if self.column_spec[idx].name == column_to_check:
-                        expiration = cell.content.value
-                        if expiration:
-                            diff = datetime.datetime.fromisoformat(str(expiration)).timestamp() - datetime.datetime.now().timestamp()
-                            time_left = int(diff)
-                            formatted_time_left = convert(time_left)
-                            if time_left < 0:
-                                if callback:
-                                    callback(row)
-                                else:
-                                    formatted_time_left = convert(0)
-                            for _idx, cell in enumerate(row.cells):
-                                if self.column_spec[_idx].name == column_to_update:
-                                    # row.cells[_idx].content.value = time_left
-                                    row.cells[_idx].content.value = formatted_time_left
-                                    break
-                            break
-                except:
-                    pass
-        self.expiration_watcher_started = True
-        self.update()
+    def on_rows_appended(self, appended: int, evicted: int):
+        # the last page is followed only if the user was looking at it
+        following = self.auto_follow and self.current_page >= self.num_pages
+        self.update_view()
+        if following:
+            self.current_page = self.num_pages
+        self.refresh_data(update=False)
 
-        try:
-            for row_num, row in enumerate(self.datatable.rows):
-                for idx, cell in enumerate(row.cells):
-                    try:
-                        if self.column_spec[idx].name == column_to_update:
-
-                            for _idx, cell in enumerate(row.cells):
-                                if self.column_spec[_idx].name == column_to_check:
-                                    expiration = cell.content.value
-                                    if expiration:
-                                        diff = datetime.datetime.fromisoformat(str(expiration)).timestamp() - datetime.datetime.now().timestamp()
-                                        time_left = int(diff)
-                                        formatted_time_left = convert(time_left)
-
-                                        if time_left < 1:
-                                            if callback:
-                                                callback(row)
-                                            else:
-                                                row.cells[idx].content.value = convert(0)
-                                        else:
-                                            row.cells[idx].content.value = formatted_time_left
-                                        break
-                                    break
-                    except:
-                        pass
-
-            self.update()
-        except Exception as e:
-            print(f"Error updating expiration: {e}")
-        time.sleep(.2)
+    def get_visible_rows(self) -> list[ft.DataRow]:
+        return self.pdt.rows
@@ -0,0 +1,225 @@
+
+
+import flet as ft
+from typing import TypeVar, List
+from collections import OrderedDict
+
+from ._DataTable import _DataTable, ColumnSpec, compile_row_accessor
+
+T = TypeVar('T')
+
+class VirtualDataTable(_DataTable, ft.UserControl):
+
+    DEFAULT_ROW_HEIGHT = 40
+    DEFAULT_VIEWPORT_ROWS = 20
+    DEFAULT_OVERSCAN = 10
+
+    def __init__(
+            self,
+            columns: list[ColumnSpec],
+            data: List[T],
+            on_select_changed_callback = None,
+            row_height: int = DEFAULT_ROW_HEIGHT,
+            viewport_rows: int = DEFAULT_VIEWPORT_ROWS,
+            overscan: int = DEFAULT_OVERSCAN,
+            max_rows: int = None,
+            auto_follow: bool = False,
+    ):
+        """
+        A customized user control which returns a continuously scrolling data table. Rows have a fixed height and only
+        the rows in the viewport are displayed, so memory and update size don't depend on the size of the dataset.
+        DataRows are kept for the records within overscan rows of the viewport, the rows leaving that window are
+        recycled for the records entering it.
+
+        :parameter row_height: the height of every row, in pixels
+        :parameter viewport_rows: the number of rows displayed at once
+        :parameter overscan: the number of rows before and after the viewport whose DataRows are kept built
+        :parameter max_rows: number of rows kept when rows are added with append_rows, the oldest ones are evicted
+        :parameter auto_follow: keep the newest rows in the viewport when rows are appended while it shows the last ones
+        """
+        self.row_height = row_height
+        self.auto_follow = auto_follow
+        self.viewport_rows = viewport_rows
+        self.overscan = overscan
+
+        # index in the dataset of the first displayed record and scroll position in pixels
+        self.first_row = 0
+        self.scroll_offset = 0
+        # row id -> DataRow of the records within the overscan window, and DataRows free to be recycled
+        self.window = OrderedDict()
+        self.free_rows = []
+
+        _DataTable.__init__(self, columns, data, on_select_changed_callback, build_rows=False, max_rows=max_rows)
+
+        self.row_accessor = compile_row_accessor(columns)
+
+        self.datatable.data_row_min_height = row_height
+        self.datatable.data_row_max_height = row_height
+
+        # wheel and drag scroll the records through the rows of the table, whose header stays in place
+        self.gd = ft.GestureDetector(
+            content=ft.Row([self.datatable]),
+            on_scroll=self.on_scroll,
+            on_vertical_drag_update=self.on_vertical_drag_update,
+            drag_interval=10,
+        )
+
+        # scrollbar to jump anywhere in the dataset
+        self.v_position = ft.Slider(
+            min=0,
+            max=max(1, self.max_first_row()),
+            value=0,
+            on_change=lambda e: self.scroll_to(int(e.control.value)),
+            expand=True
+        )
+
+        # will display the range of rows being displayed
+        self.v_count = ft.Text(weight=ft.FontWeight.BOLD)
+
+        self.render_window()
+
+        ft.UserControl.__init__(self)
+
+    def max_first_row(self) -> int:
+        return max(0, self.num_rows - self.viewport_rows)
+
+    def on_scroll(self, e: ft.ScrollEvent):
+        self.scroll_by(e.scroll_delta_y or 0)
+
+    def on_vertical_drag_update(self, e: ft.DragUpdateEvent):
+        # dragging up moves the records up, as with a scrolled list
+        self.scroll_by(-e.delta_y)
+
+    def scroll_by(self, pixels: float):
+        """Moves the viewport by the given number of pixels, redrawing the table only when the first displayed row changes"""
+        # appended rows are flushed from the EffectsScheduler thread, the viewport moves against a stable dataset
+        with self.expiration_lock:
+            self.scroll_offset = max(0, min(self.scroll_offset + pixels, self.max_first_row() * self.row_height))
+            first_row = int(self.scroll_offset // self.row_height)
+            if first_row != self.first_row:
+                self.first_row = first_row
+                self.refresh_data()
+
+    def scroll_to(self, row: int):
+        """Displays the records starting from the given index of the dataset"""
+        with self.expiration_lock:
+            self.scroll_by(max(0, row) * self.row_height - self.scroll_offset)
+
+    def render_window(self):
+        """
+        Sets the rows of the table to the records in the viewport. DataRows of the records that left the overscan
+        window are recycled for the records entering it, new DataRows are built only when there is none to recycle.
+        """
+        with self.expiration_lock:
+            self.first_row = max(0, min(self.first_row, self.max_first_row()))
+            start = max(0, self.first_row - self.overscan)
+            end = min(self.num_rows, self.first_row + self.viewport_rows + self.overscan)
+
+            in_window = set(self.row_ids[start:end])
+            for row_id in [row_id for row_id in self.window if row_id not in in_window]:
+                self.free_rows.append(self.window.pop(row_id))
+
+            missing = [pos for pos in range(start, end) if self.row_ids[pos] not in self.window]
+            recycled = min(len(missing), len(self.free_rows))
+            for pos in missing[:recycled]:
+                row = self.free_rows.pop()
+                self.bind_row(row, pos)
+                self.window[self.row_ids[pos]] = row
+            if missing[recycled:]:
+                positions = missing[recycled:]
+                built = self.generate_datarows(self.column_spec, self.take_records(positions), self.on_select_changed_callback, [self.row_ids[pos] for pos in positions])
+                self.window.update(zip((self.row_ids[pos] for pos in positions), built))
+
+            self.datatable.rows = [self.window[row_id] for row_id in self.row_ids[self.first_row:self.first_row + self.viewport_rows]]
+
+            # rows entering the viewport show their time left right away instead of at the next scheduler tick
+            self.fill_countdowns(self.datatable.rows)
+            self.render_actions(self.datatable.rows)
+
+            self.v_position.max = max(1, self.max_first_row())
+            self.v_position.value = self.first_row
+            last_row = self.first_row + len(self.datatable.rows)
+            self.v_count.value = f"Rows {self.first_row + 1 if last_row else 0}-{last_row} of {self.num_rows}"
+
+    def bind_row(self, row: ft.DataRow, pos: int):
+        """Makes a recycled DataRow display the record at the given position of the dataset"""
+        previous = self.row_formats.get(self.parse_row_id(row.data))
+        row_id = self.row_ids[pos]
+        row.data = self.format_row_id(row_id)
+        row.selected = False
+        # the action buttons are bound to the new record by render_actions
+        self.patch_row(row, self.dataset[pos], self.row_accessor)
+        if previous or row_id in self.row_formats:
+            self.apply_row_format(row, self.row_formats.get(row_id, {}), previous)
+
+    def build(self):
+        return ft.Row(
+            controls=[
+                ft.Column(
+                        [
+                            self.gd,
+                            ft.Row(
+                                [
+                                    self.v_position,
+                                    self.v_count,
+                                ],
+                                alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+                            ),
+                        ],
+                        expand=True
+                    )
+                ],
+            expand=True
+        )
+
+    def refresh_data(self, update: bool = True):
+        self.render_window()
+
+        # update the control so the above changes are rendered in the UI
+        if update:
+            self.request_update()
+
+    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None, key=None):
+
+        # the expiration scheduler must not work on the table while its dataset changes
+        with self.expiration_lock:
+            stats = None
+            if key is not None:
+                # rows of the records kept are patched in place, the user stays at the same position
+                stats = self.diff_dataset(dataset, key)
+            else:
+                self.load_dataset(dataset)
+                self.free_rows.extend(self.window.values())
+                self.window.clear()
+                self.first_row = 0
+                self.scroll_offset = 0
+
+            self.num_rows = len(self.dataset)
+            self.scroll_offset = min(self.scroll_offset, self.max_first_row() * self.row_height)
+
+            self.refresh_data()
+
+        return stats
+
+    def get_built_row(self, pos: int) -> ft.DataRow:
+        if self.row_ids[pos] in self.window:
+            return self.window[self.row_ids[pos]]
+        return super().get_built_row(pos)
+
+    def get_reusable_rows(self) -> dict:
+        return self.window
+
+    def on_rows_removed(self, removed: int):
+        self.num_rows = len(self.dataset)
+        self.scroll_offset = min(self.scroll_offset, self.max_first_row() * self.row_height)
+        self.refresh_data()
+
+    def on_rows_appended(self, appended: int, evicted: int):
+        following = self.auto_follow and self.first_row >= self.max_first_row()
+        # the viewport keeps showing the same records while the oldest ones are evicted
+        self.first_row = max(0, self.first_row - evicted)
+        self.num_rows = len(self.dataset)
+        if following:
+            self.first_row = self.max_first_row()
+        self.scroll_offset = self.first_row * self.row_height
+        self.refresh_data(update=False)
@@ -1,17 +1,30 @@
 
 
 import flet as ft
-import pyperclip as pc
 from uuid import uuid4
+from array import array
 from dataclasses import dataclass
-from typing import Optional, TypeVar, Generic, List
-from threading import Thread
-import queue
-from datetime import datetime
+from typing import Optional, TypeVar, Generic, List, Mapping
+from threading import Lock, RLock, Timer
+from itertools import count, islice, compress, groupby
+from operator import itemgetter, attrgetter
+from bisect import bisect_left, insort
+import time
+import logging
+import weakref
+from datetime import datetime, date
+from decimal import Decimal
 
-from ..utils.PauseableThread import PauseableThread
+from ..utils.ExpirationScheduler import ExpirationScheduler
+from ..utils.EffectsScheduler import EffectsScheduler
+from ..utils.UpdateScheduler import UpdateScheduler
+from ..utils.SearchIndex import SearchIndex
+from ..utils.ColumnarDataset import ColumnarDataset
+from ..utils.OffsetList import OffsetList
+from ..utils.TableMetrics import TableMetrics
 
 T = TypeVar('T')
+logger = logging.getLogger(__name__)
 
 @dataclass
 class CustomAction():
@@ -22,58 +35,406 @@ class CustomAction():
     visible_callback: any = None
     color: Optional[str] = ft.colors.BLUE
 
+_MISSING = object()
+
+class ActionTarget(str):
+    """The row id set as data of an action button. It also names the action, so a single handler per table routes
+    the clicks while the action callbacks keep reading the row id from e.control.data"""
+
+    def __new__(cls, row_id: str, column_idx: int, action_idx: int):
+        target = super().__new__(cls, row_id)
+        target.column_idx = column_idx
+        target.action_idx = action_idx
+        return target
+
+def compile_accessor(original_field_name: str, default: any = ''):
+    """Compiles a field name into a function extracting its value from a record.
+
+    original_field_name: a dict key or attribute name, or a dotted path of any depth (e.g. 'order.client.name')
+    default: value returned when any step of the path is missing
+    """
+    if original_field_name == '':
+        return lambda record: default
+
+    parts = tuple(original_field_name.split("."))
+
+    def accessor(record):
+        obj = record
+        for part in parts:
+            if obj.__class__ is dict:
+                obj = obj.get(part, _MISSING)
+            else:
+                value = getattr(obj, part, _MISSING)
+                if value is _MISSING and isinstance(obj, Mapping):
+                    value = obj.get(part, _MISSING)
+                obj = value
+            if obj is _MISSING:
+                return default
+        return obj
+
+    return accessor
+
+def compile_row_accessor(columns: list):
+    """Compiles the columns into a function returning the list of values of a record, one per column.
+
+    Values are fetched in a single itemgetter/attrgetter call chosen by the record class; records for which
+    that fails (missing fields, mixed dicts and objects along a path) go through the per-column accessors.
+    Columns without original_field_name or with custom actions get their default.
+    """
+    accessors = [c.accessor for c in columns]
+
+    def slow_path(record):
+        return [accessor(record) for accessor in accessors]
+
+    fetched = [idx for idx, c in enumerate(columns) if c.original_field_name != '' and not c.custom_actions]
+    if not fetched:
+        return slow_path
+
+    names = [columns[idx].original_field_name for idx in fetched]
+    dict_getter = itemgetter(*names) if all("." not in name for name in names) else None
+    attr_getter = attrgetter(*names)
+    template = [c.default for c in columns]
+    single = len(fetched) == 1
+    complete = len(fetched) == len(columns)
+    getters = {}
+
+    def row_accessor(record):
+        getter = getters.get(record.__class__, _MISSING)
+        if getter is _MISSING:
+            getter = getters[record.__class__] = dict_getter if isinstance(record, Mapping) else attr_getter
+        if getter is None:
+            return slow_path(record)
+        try:
+            values = getter(record)
+        except (KeyError, AttributeError, TypeError):
+            return slow_path(record)
+        if single:
+            values = (values,)
+        if complete:
+            return list(values)
+        row = template.copy()
+        for idx, value in zip(fetched, values):
+            row[idx] = value
+        return row
+
+    return row_accessor
+
 class ColumnSpec():
 
-    def __init__(self, name: str, original_field_name: str = '', visible=True, custom_actions: list[CustomAction] = None) -> None:
+    def __init__(self, name: str, original_field_name: str = '', visible=True, custom_actions: list[CustomAction] = None, default: any = '') -> None:
         self.name = name
         self.original_field_name = original_field_name
         self.visible = visible
         self.custom_actions = custom_actions
+        self.default = default
+        self._accessor = None
+        self._accessor_key = None
+
+    @property
+    def accessor(self):
+        """The compiled accessor of original_field_name, compiled again only if the field name or default change"""
+        key = (self.original_field_name, self.default)
+        if self._accessor is None or self._accessor_key != key:
+            self._accessor = compile_accessor(self.original_field_name, self.default)
+            self._accessor_key = key
+        return self._accessor
+
+    def get_value(self, record: any):
+        """Returns the value of this column for a raw record, or default if it can't be resolved"""
+        return self.accessor(record)
 
 class ToggleFilterSpec():
-    def __init__(self, name: str, callback) -> None:
+    def __init__(self, name: str, callback = None, active: bool = False) -> None:
+        """
+        A filter the user can toggle on and off.
+
+        :param name: the label of the filter, lazy tables pass it to the data source when the filter is active
+        :param callback: function receiving a record and returning whether it passes the filter
+        :param active: whether the filter is initially on
+        """
         self.name = name
         self.callback = callback
+        self.active = active
+
+def _format_date(value):
+    # converts from YYYYMMDD to YYYY-MM-DD
+    original_date = str(value)
+    return f"{original_date[:4]}-{original_date[4:6]}-{original_date[6:]}"
+
+FORMATS = {
+    "COMMAS": lambda value: "{:,}".format(int(value)),
+    "FIX_DATE": _format_date,
+    # converts from YYYYMMDD-HH:MM:SS to datetime
+    "FIX_DATETIME": lambda value: datetime.strptime(str(value), '%Y%m%d-%H:%M:%S'),
+}
+
+class ColumnFormat():
+    """A format registered through format_column, with the column indexes already resolved.
+
+    Values are always formatted from the raw value of the record, never from the text of the cell, so applying
+    a format again leaves the cell unchanged. Results are memoized by raw value.
+    """
+
+    MEMO_SIZE = 4096
+
+    def __init__(self, column_name_to_format: str, _format: str, column_name_values: str, callback: any, column_idx: int, values_idx: int) -> None:
+        self.column_name_to_format = column_name_to_format
+        self._format = _format
+        self.column_name_values = column_name_values
+        self.callback = callback
+        self.column_idx = column_idx
+        self.values_idx = values_idx
+        self.format_function = FORMATS.get(_format)
+        self.memo = {}
+
+    def format_value(self, value):
+        try:
+            return self.memo[value]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable values are not memoized
+            return self.format_function(value)
+
+        formatted = self.format_function(value)
+        if len(self.memo) >= self.MEMO_SIZE:
+            self.memo.clear()
+        self.memo[value] = formatted
+        return formatted
+
+    def apply(self, values: list):
+        """Formats the value of column_idx in a list of raw row values"""
+        try:
+            values[self.column_idx] = self.format_value(values[self.values_idx])
+        except Exception as e:
+            logger.error("Error formatting column %s: %s", self.column_name_to_format, e)
+
+    def apply_column(self, columns: list[list]):
+        """Formats the values of column_idx in a list of raw column values, one pass over the whole column"""
+        try:
+            columns[self.column_idx] = list(map(self.format_value, columns[self.values_idx]))
+        except Exception as e:
+            logger.error("Error formatting column %s: %s", self.column_name_to_format, e)
+
+def format_time_left(seconds: int) -> str:
+    min, sec = divmod(seconds, 60)
+    hour, min = divmod(min, 60)
+
+    return '%02d:%02d:%02d' % (hour, min, sec)
+
+# sort keys of missing values, which sort last in both directions
+MISSING_SORT_KEY = (3, 0)
+_MISSING_SORT_KEY_DESCENDING = (-1, 0)
+
+def sort_key(value) -> tuple:
+    """Returns a typed sort key for a raw value: numbers (also in strings) sort before dates and datetimes (also ISO
+    strings), which sort before the other strings, compared case insensitively"""
+    if value is None or value == '':
+        return MISSING_SORT_KEY
+    if isinstance(value, (int, float, Decimal)):
+        return (0, value) if value == value else MISSING_SORT_KEY
+    if isinstance(value, datetime):
+        return (1, value.timestamp())
+    if isinstance(value, date):
+        return (1, datetime(value.year, value.month, value.day).timestamp())
+    if isinstance(value, str):
+        try:
+            number = float(value)
+            if number == number:
+                return (0, number)
+            return MISSING_SORT_KEY
+        except ValueError:
+            pass
+        try:
+            return (1, datetime.fromisoformat(value).timestamp())
+        except ValueError:
+            return (2, value.casefold())
+    return (2, str(value).casefold())
+
+class _Descending():
+    """Sort key compared in reverse, so that a descending order has an increasing rank"""
+    __slots__ = ('key',)
+
+    def __init__(self, key) -> None:
+        self.key = key
+
+    def __eq__(self, other) -> bool:
+        return self.key == other.key
+
+    def __lt__(self, other) -> bool:
+        return other.key < self.key
+
+def remap_positions(order: list[int], removed: list[int]) -> list[int]:
+    """Drops the removed positions (sorted) from an ordering of dataset positions, shifting the following ones down"""
+    removed_set = set(removed)
+    return [pos - bisect_left(removed, pos) for pos in order if pos not in removed_set]
+
+def bisect_ranked(order: list[int], rank, target, lo: int = 0) -> int:
+    """Returns the index of the first entry of order (sorted by rank) ranked after target, as bisect_right"""
+    hi = len(order)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if target < rank(order[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+def merge_ranked(order: list[int], entries: list[int], rank):
+    """Inserts entries into order in place, both sorted by rank. Each entry is found by bisection, and inserting
+    only shifts the pointers after it, which is cheaper than sorting or copying the list for a few entries"""
+    indexes = []
+    lo = 0
+    for entry in entries:
+        lo = bisect_ranked(order, rank, rank(entry), lo)
+        indexes.append(lo)
+    # from the end so the indexes before stay valid, the entries going to the same index are inserted together
+    groups = [(idx, [entry for _, entry in group]) for idx, group in groupby(zip(indexes, entries), key=itemgetter(0))]
+    for idx, group in reversed(groups):
+        order[idx:idx] = group
+
+def drop_ranked(order: list[int], entries: list[int], rank):
+    """Removes entries from order in place, order being sorted by rank and holding all of them"""
+    indexes = sorted(bisect_ranked(order, rank, rank(entry)) - 1 for entry in entries)
+    # runs of consecutive indexes (e.g. the oldest of equal records) are deleted together, from the end
+    stop = None
+    for idx in reversed(indexes):
+        if stop is not None and idx == start - 1:
+            start = idx
+            continue
+        if stop is not None:
+            del order[start:stop]
+        start, stop = idx, idx + 1
+    if stop is not None:
+        del order[start:stop]
+
+class ShiftedPositions():
+    """Read-only sequence of positions stored with an offset, which is subtracted from the positions read"""
+
+    def __init__(self, positions: list[int], base: int) -> None:
+        self.positions = positions
+        self.base = base
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [pos - self.base for pos in self.positions[key]]
+        return self.positions[key] - self.base
+
+    def __iter__(self):
+        return (pos - self.base for pos in self.positions)
 
 class _DataTable(Generic[T]):
 
     dataset: List[T] = []
     formatted_columns = []
 
+    # removals tracked by the row index before it gets rebuilt
+    MAX_PENDING_REMOVALS = 4096
+    # rows appended or evicted at once, as a fraction of the rows, up to which they are merged into (or dropped
+    # from) the sort permutation one by one instead of going over all of it
+    MERGED_FRACTION = 8
+
+    # (delay, color) frames of highlight_row, the row gets its color back after HIGHLIGHT_DURATION
+    HIGHLIGHT_FRAMES = [(0, "#a6a6a6"), (.14, "#b3b3b3"), (.32, "#bfbfbf")]
+    HIGHLIGHT_DURATION = .4
+
+    # columns a header click keeps sorting by, the clicked one first
+    MAX_SORT_COLUMNS = 3
+
+    # how the masks of the active filters are combined
+    FILTER_MODES = ('AND', 'OR')
+
+    # seconds the search box waits for further keystrokes before searching
+    SEARCH_DEBOUNCE = 0.25
+
+    # minimum seconds between two flushes of the rows appended with append_rows
+    APPEND_FLUSH_INTERVAL = 0.1
+
     def __init__(self, columns: list[ColumnSpec],
             data: list[T],
-            on_select_changed_callback = None) -> None:
+            on_select_changed_callback = None,
+            build_rows: bool = True,
+            filters: list[ToggleFilterSpec] = None,
+            filter_mode: str = 'AND',
+            searchable: bool = False,
+            max_rows: int = None) -> None:
         
         self.formatted_columns = []
-        
-        self.dataset = data
+
+        # counters and timings, None until enable_metrics is called
+        self.metrics = None
 
         self.table_uuid = str(uuid4())
+        self.row_id_counter = count()
+
+        self.expiration_watcher_started = False
+        self.expiration_watcher_column_to_check = None
+        self.expiration_watcher_column_to_update = None
+        self.expiration_callback = None
+        # row id -> epoch of expiration, parsed once per record
+        self.expiration_deadlines = {}
+        # ids of the rows expired without a callback, their countdown shows 00:00:00 whenever they are built
+        self.expired_rows = set()
+        self.expiration_parse_memo = {}
+        # held while the dataset changes and while the expiration scheduler works on the table
+        self.expiration_lock = RLock()
+        # held by the UpdateScheduler while it sends the table, the rows are not changed while they are serialized
+        self.update_lock = self.expiration_lock
+
+        # ((column index, ascending), ...) the rows are displayed by, empty for the dataset order
+        self.sort_spec = ()
+        # column index -> typed sort keys of the records and sort spec -> permutation of the dataset positions
+        self.sort_keys = {}
+        self.sort_permutations = {}
+        # rows evicted since the permutations were computed: they hold the dataset positions plus this base, so an
+        # eviction doesn't shift all the positions
+        self.permutation_base = 0
+
+        if filter_mode not in self.FILTER_MODES:
+            raise ValueError(f"filter_mode must be one of {self.FILTER_MODES}")
+        self.filters = filters or []
+        self.filter_mode = filter_mode
+        # filter name -> bytearray with a 1 for each record passing the filter
+        self.filter_masks = {}
+        self.v_filters = self.generate_filter_chips()
+
+        # built on the first search, then kept in sync with the dataset
+        self.search_index = None
+        self.search_query = ''
+        self.search_prefix = False
+        # ids of the rows matching search_query, None when there is no query
+        self.search_matches = None
+        self.search_stats = {}
+        self.search_timer = None
+        self.v_search = self.generate_search_bar(searchable)
+
+        # DataRow -> row id its action buttons were last evaluated for, dropped when the row is patched
+        self.action_records = weakref.WeakKeyDictionary()
+
+        # rows appended from any thread wait in append_buffer until the next flush
+        self.max_rows = max_rows
+        self.append_buffer = []
+        self.append_lock = Lock()
+        self.append_flush_pending = False
+        self.last_append_flush = 0
+
+        self.load_dataset(data)
         
         datacolumns = self.generate_datacolumns(columns)
         
-        datarows = self.generate_datarows(columns, self.dataset, on_select_changed_callback)
+        # when build_rows is False the subclass is in charge of building the DataRows it needs on demand
+        self.all_rows_built = build_rows
+        datarows = self.generate_datarows(columns, self.dataset, on_select_changed_callback, self.row_ids) if build_rows else []
         
         self.datatable = self.generate_datatable(datacolumns, datarows)
 
-        self.num_rows = len(self.datatable.rows)
+        self.num_rows = len(self.dataset)
 
         self.on_select_changed_callback = on_select_changed_callback
         self.column_spec = columns
-        self.expiration_watcher_started = False
-        self.expiration_watcher_column_to_check = None
-        self.expiration_watcher_column_to_update = None
-
-        self.q = queue.Queue()
-        Thread(target=self.background_worker, daemon=True).start()
-
-    def background_worker(self):
-        print(f"starting background worker for table {self.table_uuid}")
-        while True:
-            item = self.q.get()
-            item.start()
-            item.join()
-            self.q.task_done()
     
     def generate_datatable(self, columns: list[ft.DataColumn], rows: list[ft.DataRow]):
         return ft.DataTable(
@@ -96,127 +457,1114 @@ class _DataTable(Generic[T]):
         )
 
     def generate_datacolumns(self, columns: list[ColumnSpec]) -> list[ft.DataColumn]:
-        _columns = [ft.DataColumn(ft.Text(c.name), visible=c.visible) for c in columns]
-        _columns.append(ft.DataColumn(ft.Text("row_uuid"), visible=False))
-        return _columns
+        """Returns the DataColumns of the visible columns only. Hidden columns are not part of the control tree, their
+        values are read from the records (see get_cell_value)"""
+        # indexes in columns of the displayed columns, and index in columns -> index of its cell in the rows
+        self.displayed_columns = [idx for idx, c in enumerate(columns) if c.visible]
+        self.cell_positions = {idx: pos for pos, idx in enumerate(self.displayed_columns)}
+        self.action_columns = [idx for idx in self.displayed_columns if columns[idx].custom_actions]
+        return [ft.DataColumn(ft.Text(columns[idx].name)) for idx in self.displayed_columns]
     
-    def generate_datarows(self, columns: list[ColumnSpec], data: list[any], on_select_changed_callback = None) -> list[ft.DataRow]:
-        
-        def unpack_obj(obj):
-            if not hasattr(obj, '__dict__'):
-                return obj
-            result = {}
-            for key, val in vars(obj).items():
-                if hasattr(val, '__dict__'):
-                    result[key] = unpack_obj(val)
-                else:
-                    result[key] = val
-            return result
+    def generate_datarows(self, columns: list[ColumnSpec], data: list[any], on_select_changed_callback = None, row_ids: list[int] = None) -> list[ft.DataRow]:
         
         datarows = []
 
-        for idx, d in enumerate(data):
-            # obj = d.__dict__
-            obj = unpack_obj(d)
+        countdown_idx = self.get_column_index(self.expiration_watcher_column_to_update) if self.expiration_watcher_started else None
+        now = time.time()
+        callback_formats = [f for f in self.formatted_columns if f.callback]
 
-            row_id = str(uuid4()) # unique row identifier
+        for idx, values in enumerate(self.get_row_values(columns, data)):
+            row_id = row_ids[idx] if row_ids else None
+            if countdown_idx is not None and row_id is not None:
+                countdown = self.get_countdown(row_id, now)
+                if countdown is not None:
+                    values[countdown_idx] = countdown
 
             datacells = []
-            for c in columns:
+            for column_idx in self.displayed_columns:
+                c = columns[column_idx]
                 if c.custom_actions:
-                    # all actions belonging to the same ColumnSpec will use the same callback; there is probably an error in this loop
-
-                    buttons = [
-                        ft.OutlinedButton(
-                            action.display_name, 
-                            on_click=lambda e: action.callback(e), 
-                            data=row_id, 
-                            disabled=action.disabled_callback(obj) if action.disabled_callback else False,
-                            visible=action.visible_callback(obj) if action.visible_callback else True,
-                            style=ft.ButtonStyle(color=action.color),
-                            scale=0.7
-                        )
-                        if not action.icon
-                        else ft.IconButton(
-                            icon=action.icon, 
-                            icon_color=action.color, 
-                            on_click=lambda e: action.callback(e), 
-                            data=row_id, 
-                            disabled=action.disabled_callback(obj) if action.disabled_callback else False,
-                            visible=action.visible_callback(obj) if action.visible_callback else True,
-                            scale=0.7
-                        )
-
-                        for action in c.custom_actions 
-                    ]
-                    datacells.append(ft.DataCell(ft.Row(controls=buttons, spacing=0), visible=c.visible))     
+                    # buttons are added by render_actions once the row is displayed
+                    datacells.append(ft.DataCell(ft.Row(controls=[], spacing=0)))
                 else:
-                    if c.original_field_name != '':
-                        try:
-                            if "." in c.original_field_name:
-                                _field = c.original_field_name.split(".")
-                                target = obj[_field[0]][_field[1]]
-                            else:
-                                target = obj[c.original_field_name]
-                            datacells.append(ft.DataCell(ft.Text(target, visible=c.visible), visible=c.visible))
-                        except Exception as e:
-                            datacells.append(ft.DataCell(ft.Text('', visible=c.visible), visible=c.visible))
-                    else:     
-                        datacells.append(ft.DataCell(ft.Text('', visible=c.visible), visible=c.visible))
-
-            datacells.append(ft.DataCell(ft.Text(row_id), visible=False))
+                    datacells.append(ft.DataCell(ft.Text(values[column_idx])))
 
+            # the row id stays on the server, DataRow.data is not sent to the client
             datarow = ft.DataRow(
                     cells=datacells,
                     selected=False,
                     on_long_press=self.copy_to_clipboard,
+                    data=self.format_row_id(row_id) if row_id is not None else str(uuid4()),
                 )
 
             if on_select_changed_callback:
-                datarow.on_select_changed = lambda e: on_select_changed_callback(e)
+                datarow.on_select_changed = on_select_changed_callback
+
+            for f in callback_formats:
+                self.apply_callback_format(f, datarow)
+
+            if self.row_formats and row_id in self.row_formats:
+                self.apply_row_format(datarow, self.row_formats[row_id])
 
             datarows.append(datarow)
+
+        if self.metrics:
+            self.metrics.count('rows_built', len(datarows))
+            # the row, then a cell and its content per displayed column
+            self.metrics.count('controls_built', len(datarows) * (1 + 2 * len(self.displayed_columns)))
         
         return datarows
 
+    def generate_action_button(self, action: CustomAction) -> ft.Control:
+        """Returns the button of an action, all the buttons of the table share on_action_click"""
+        if not action.icon:
+            return ft.OutlinedButton(
+                action.display_name,
+                on_click=self.on_action_click,
+                style=ft.ButtonStyle(color=action.color),
+                scale=0.7
+            )
+        return ft.IconButton(
+            icon=action.icon,
+            icon_color=action.color,
+            on_click=self.on_action_click,
+            scale=0.7
+        )
+
+    def on_action_click(self, e: ft.ControlEvent):
+        target = e.control.data
+        try:
+            action = self.column_spec[target.column_idx].custom_actions[target.action_idx]
+        except (AttributeError, IndexError, TypeError):
+            logger.warning("Unknown action of table %s: %s", self.table_uuid, target)
+            return
+        action.callback(e)
+
+    def render_actions(self, rows: list[ft.DataRow]):
+        """Builds the action buttons of the rows about to be displayed and evaluates their disabled and visible
+        predicates. Predicates are evaluated again only once the row is patched by a keyed redraw (the record may
+        have been changed in place) or shows another record"""
+        if not self.action_columns:
+            return
+        # predicates receive the unpacked record, so it is only computed when some action has one
+        unpack = any(
+            action.disabled_callback or action.visible_callback
+            for idx in self.action_columns
+            for action in self.column_spec[idx].custom_actions
+        )
+        for row in rows:
+            row_id = self.get_row_id(row)
+            if self.action_records.get(row) == row_id:
+                continue
+            record = self.get_record_by_uuid(row_id)
+            if record is None:
+                continue
+
+            obj = self.unpack_obj(record) if unpack else None
+            for column_idx in self.action_columns:
+                actions = self.column_spec[column_idx].custom_actions
+                buttons = self.get_cell(row, column_idx).content.controls
+                if not buttons:
+                    buttons.extend(self.generate_action_button(action) for action in actions)
+                for action_idx, (button, action) in enumerate(zip(buttons, actions)):
+                    button.data = ActionTarget(row_id, column_idx, action_idx)
+                    button.disabled = action.disabled_callback(obj) if action.disabled_callback else False
+                    button.visible = action.visible_callback(obj) if action.visible_callback else True
+            self.action_records[row] = row_id
+
+    def get_row_values(self, columns: list[ColumnSpec], records: list[T]) -> list[list]:
+        """Returns the formatted values of each record, one per column. The values of columnar datasets are read and
+        formatted a column at a time, without building the records"""
+        value_formats = [f for f in self.formatted_columns if f.format_function and not f.callback]
+        if isinstance(records, ColumnarDataset):
+            values = [
+                records.column_values(c.original_field_name) if c.original_field_name and not c.custom_actions else None
+                for c in columns
+            ]
+            values = [column if column is not None else [c.default] * len(records) for c, column in zip(columns, values)]
+            start = time.perf_counter()
+            for f in value_formats:
+                f.apply_column(values)
+            if self.metrics and value_formats:
+                self.metrics.observe('format', time.perf_counter() - start)
+            return [list(row) for row in zip(*values)]
+
+        # accessors are compiled once per ColumnSpec and reused across redraws
+        row_accessor = compile_row_accessor(columns)
+        rows = list(map(row_accessor, records))
+        if value_formats:
+            start = time.perf_counter()
+            for values in rows:
+                for f in value_formats:
+                    f.apply(values)
+            if self.metrics:
+                self.metrics.observe('format', time.perf_counter() - start)
+        return rows
+
+    def get_column_values(self, column_idx: int, records: list[T] = None) -> list:
+        """Returns the raw values of a column for the given records, or for the whole dataset"""
+        records = self.dataset if records is None else records
+        column = self.column_spec[column_idx]
+        if isinstance(records, ColumnarDataset):
+            values = records.column_values(column.original_field_name) if column.original_field_name else None
+            return values if values is not None else [column.default] * len(records)
+        return list(map(column.accessor, records))
+
+    def take_records(self, positions, dataset: list[T] = None) -> list[T]:
+        """Returns the records at the given positions of the dataset; columnar datasets return views instead of
+        building the records"""
+        dataset = self.dataset if dataset is None else dataset
+        if isinstance(dataset, ColumnarDataset):
+            return dataset.take(positions)
+        return [dataset[pos] for pos in positions]
+
+    @staticmethod
+    def unpack_obj(obj):
+        """Recursively converts an object (and its nested objects) into a dict, other values are returned as they are"""
+        if not hasattr(obj, '__dict__'):
+            return obj
+        result = {}
+        for key, val in vars(obj).items():
+            if hasattr(val, '__dict__'):
+                result[key] = _DataTable.unpack_obj(val)
+            else:
+                result[key] = val
+        return result
+
+    def generate_row_ids(self, count: int) -> array:
+        """Returns count unique row identifiers, as the sequence numbers of a per-table counter (calling uuid4 for
+        every record is too slow on large datasets). They are kept as an array of integers, the string ids of
+        DataRow.data are only formatted for the rows that are built, see format_row_id"""
+        return array('q', islice(self.row_id_counter, count))
+
+    def format_row_id(self, row_id: int) -> str:
+        """Returns the string id of a row, as set in DataRow.data and passed to the callbacks"""
+        return f"{self.table_uuid}-{row_id}"
+
+    def parse_row_id(self, row_id) -> Optional[int]:
+        """Returns the sequence number of a row id of this table, given as formatted by format_row_id or as the
+        number itself, None if it isn't one"""
+        if isinstance(row_id, int):
+            return row_id
+        prefix, _, seq = str(row_id).rpartition('-')
+        if prefix != self.table_uuid or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def load_dataset(self, dataset: list[T]):
+        """Replaces the dataset, assigning a new id to each record and resetting the row index. Columnar data
+        (structured arrays and dicts of arrays) is kept as columns, see ColumnarDataset"""
+        dataset = ColumnarDataset.wrap(dataset)
+        self.dataset = dataset
+        self.row_ids = self.generate_row_ids(len(dataset))
+        # row id -> position in the dataset at the time the index was built (None until the first lookup).
+        # Removed positions are kept sorted so the current position is found by subtracting the number of
+        # removals before it, instead of shifting the whole index on every removal. The oldest rows evicted by
+        # max_rows are counted by _removed_below, all the positions below it being removed
+        self._row_positions = None
+        self._removed_positions = []
+        self._removed_below = 0
+        # row id -> {column index, None for the whole row: color} set by format_row on rows built on demand, which
+        # get their format back whenever they are built
+        self.row_formats = {}
+        self.invalidate_view_cache()
+        self.invalidate_search_index()
+        if self.expiration_watcher_started:
+            self.schedule_expirations()
+
+    def _index_rows(self):
+        self._row_positions = {row_id: pos for pos, row_id in enumerate(self.row_ids)}
+        self._removed_positions = []
+        self._removed_below = 0
+
+    def get_row_id(self, row: ft.DataRow) -> str:
+        """Returns the row id of a DataRow, held in row.data. Rows have no row_uuid cell: callbacks get the id here
+        instead of from row.cells[-1]"""
+        return row.data
+
+    def get_cell(self, row: ft.DataRow, column: int | str) -> Optional[ft.DataCell]:
+        """Returns the cell of a column, given by its index in the ColumnSpecs or its name, in a DataRow. None if the
+        column is hidden or unknown"""
+        column_idx = self.get_column_index(column) if isinstance(column, str) else column
+        pos = self.cell_positions.get(column_idx)
+        return row.cells[pos] if pos is not None else None
+
+    def warn_positional_callback(self, callback_name: str):
+        """Warns that a callback receiving DataRows can't index row.cells by ColumnSpec position, because a hidden column
+        comes before a visible one and shifts the cells (see get_cell and get_cell_value)"""
+        if self.displayed_columns != list(range(len(self.displayed_columns))):
+            logger.warning("Table %s has hidden columns before visible ones: the %s callback must read the cells with "
+                           "get_cell(row, column_name) or get_cell_value(row, column_name) and the row id with "
+                           "get_row_id(row), row.cells is not indexed by the position of the ColumnSpec",
+                           self.table_uuid, callback_name)
+
+    def get_cell_value(self, row: ft.DataRow, column: int | str):
+        """Returns the value a column, given by its index in the ColumnSpecs or its name, shows for a DataRow. Values of
+        hidden columns are formatted from the record. None if the column is unknown"""
+        column_idx = self.get_column_index(column) if isinstance(column, str) else column
+        if column_idx is None:
+            return None
+        cell = self.get_cell(row, column_idx)
+        if cell is not None and isinstance(cell.content, ft.Text):
+            return cell.content.value
+        record = self.get_record_by_uuid(self.get_row_id(row))
+        if record is None:
+            return None
+        return self.get_row_values(self.column_spec, [record])[0][column_idx]
+
+    def get_row_position(self, uuid: str) -> Optional[int]:
+        """Returns the position in the dataset of the record with the given row id, None if there is no such record"""
+        row_id = self.parse_row_id(uuid)
+        if row_id is None:
+            return None
+        if self._row_positions is None:
+            self._index_rows()
+        pos = self._row_positions.get(row_id)
+        if pos is None or not (self._removed_positions or self._removed_below):
+            return pos
+        return pos - self._removed_below - bisect_left(self._removed_positions, pos)
+
+    def get_record_by_uuid(self, uuid: str) -> Optional[T]:
+        pos = self.get_row_position(uuid)
+        return self.dataset[pos] if pos is not None else None
+
     def get_row_by_uuid(self, uuid: str) -> ft.DataRow:
-        for row in self.datatable.rows:
-            if row.cells[-1].content.value == uuid:
-                return row
-            
+        pos = self.get_row_position(uuid)
+        if pos is not None:
+            return self.get_built_row(pos)
+
+    def get_built_row(self, pos: int) -> ft.DataRow:
+        """Returns the DataRow of the record at the given position of the dataset, building it if needed"""
+        if self.all_rows_built:
+            return self.datatable.rows[pos]
+        return self.generate_datarows(self.column_spec, self.take_records([pos]), self.on_select_changed_callback, [self.row_ids[pos]])[0]
+
     def remove_row_by_uuid(self, uuid: str):
-        row = self.get_row_by_uuid(uuid)
-        self.remove_row(row)
+        self.remove_rows_by_uuid([uuid])
+
+    def remove_rows_by_uuid(self, uuids: list[str]):
+        """Removes all the rows with the given ids, refreshing the table only once"""
+        with self.expiration_lock:
+            positions = [pos for pos in (self.get_row_position(uuid) for uuid in uuids) if pos is not None]
+            removed = self.delete_positions(positions)
+            if removed:
+                self.on_rows_removed(removed)
+
+    def delete_positions(self, positions: list[int]) -> int:
+        """Removes the records (and their DataRows when all rows are built) at the given positions of the dataset,
+        keeping the row index in sync. The dataset list is modified in place. Returns the number of removed records"""
+        positions = sorted(set(positions))
+        if not positions:
+            return 0
+
+        for pos in positions:
+            self.expiration_deadlines.pop(self.row_ids[pos], None)
+            self.expired_rows.discard(self.row_ids[pos])
+            self.row_formats.pop(self.row_ids[pos], None)
+
+        self.remove_from_view_cache(positions)
+
+        if self._row_positions is not None:
+            if len(self._removed_positions) + len(positions) > self.MAX_PENDING_REMOVALS:
+                # the index is rebuilt on the next lookup
+                self._row_positions = None
+            else:
+                for pos in positions:
+                    insort(self._removed_positions, self._row_positions.pop(self.row_ids[pos]))
+
+        if len(positions) == 1:
+            pos = positions[0]
+            del self.dataset[pos]
+            del self.row_ids[pos]
+            if self.all_rows_built:
+                del self.datatable.rows[pos]
+        else:
+            # a single pass over the dataset instead of one list shift per removed row
+            keep = [True] * len(self.row_ids)
+            for pos in positions:
+                keep[pos] = False
+            if isinstance(self.dataset, ColumnarDataset):
+                self.dataset.compress(keep)
+            else:
+                self.dataset[:] = compress(self.dataset, keep)
+            self.row_ids = array('q', compress(self.row_ids, keep))
+            if self.all_rows_built:
+                self.datatable.rows = list(compress(self.datatable.rows, keep))
+
+        return len(positions)
+
+    def on_rows_removed(self, removed: int):
+        """Called once after one or more rows have been removed, to refresh counters and redraw the table"""
+        pass
+
+    def append_rows(self, records: list[T]):
+        """
+        Appends records at the end of the table. It is safe to call from any thread: records are buffered and added
+        to the table by the shared EffectsScheduler at most once every APPEND_FLUSH_INTERVAL seconds, with a single
+        update. When max_rows is set the oldest rows are evicted.
+        """
+        with self.append_lock:
+            self.append_buffer.extend(records)
+            if self.append_flush_pending:
+                return
+            self.append_flush_pending = True
+            delay = max(0, self.last_append_flush + self.APPEND_FLUSH_INTERVAL - time.monotonic())
+        EffectsScheduler.shared().schedule(self, self.flush_appended_rows, delay)
+
+    def flush_appended_rows(self):
+        """Adds the buffered records to the table, without updating it"""
+        # the lock may be held for a while by another thread (e.g. a redraw), so the flush is retried at the next
+        # frame instead of holding back the frames of the other tables
+        if not self.expiration_lock.acquire(blocking=False):
+            EffectsScheduler.shared().schedule(self, self.flush_appended_rows, EffectsScheduler.FRAME_INTERVAL)
+            return
+        try:
+            with self.append_lock:
+                records, self.append_buffer = self.append_buffer, []
+                self.append_flush_pending = False
+                self.last_append_flush = time.monotonic()
+            if not records:
+                return
+            if self.max_rows is not None:
+                # records that would be evicted right away are not built
+                records = records[-self.max_rows:]
+            appended = self.insert_records(records)
+            evicted = 0
+            if self.max_rows is not None and len(self.dataset) > self.max_rows:
+                evicted = self.evict_oldest(len(self.dataset) - self.max_rows)
+            self.on_rows_appended(appended, evicted)
+        finally:
+            self.expiration_lock.release()
+
+    def insert_records(self, records: list[T]) -> int:
+        """Adds records at the end of the dataset, keeping the row index and the caches in sync"""
+        start = len(self.dataset)
+        row_ids = self.generate_row_ids(len(records))
+        self.dataset.extend(records)
+        self.row_ids.extend(row_ids)
+        if self._row_positions is not None:
+            # appended rows follow all the removed ones
+            base = start + self._removed_below + len(self._removed_positions)
+            for offset, row_id in enumerate(row_ids):
+                self._row_positions[row_id] = base + offset
+        if self.all_rows_built:
+            self.datatable.rows.extend(self.generate_datarows(self.column_spec, records, self.on_select_changed_callback, row_ids))
+        self.append_to_view_cache(start)
+        if self.expiration_watcher_started:
+            self.schedule_row_expirations(row_ids, records)
+        return len(records)
+
+    def evict_oldest(self, count: int) -> int:
+        """Removes the first count records of the dataset. Only the removed prefix is touched: the row index moves
+        its lower bound instead of tracking each removed position, and the dataset, row ids and rows are kept in
+        OffsetLists, which move their start index instead of shifting the rows kept"""
+        evicted_ids = self.row_ids[:count]
+        for row_id in evicted_ids:
+            self.expiration_deadlines.pop(row_id, None)
+            self.expired_rows.discard(row_id)
+            self.row_formats.pop(row_id, None)
+        if self._row_positions is not None:
+            self._removed_below = self._row_positions[evicted_ids[-1]] + 1
+            for row_id in evicted_ids:
+                del self._row_positions[row_id]
+            del self._removed_positions[:bisect_left(self._removed_positions, self._removed_below)]
+        self.evict_from_view_cache(count)
+        if not isinstance(self.dataset, ColumnarDataset):
+            # columnar datasets already keep a view of the records after the prefix
+            self.dataset = OffsetList.wrap(self.dataset)
+        del self.dataset[:count]
+        self.row_ids = OffsetList.wrap(self.row_ids)
+        del self.row_ids[:count]
+        if self.all_rows_built:
+            self.datatable.rows = OffsetList.wrap(self.datatable.rows)
+            del self.datatable.rows[:count]
+        return count
+
+    def on_rows_appended(self, appended: int, evicted: int):
+        """Called from the EffectsScheduler after appended rows are flushed, to refresh counters and views. The
+        scheduler updates the table afterwards"""
+        pass
+
+    def compile_key(self, key) -> any:
+        """Returns a function computing the key of a record. key can be a function, the name of a ColumnSpec or a field name"""
+        if callable(key):
+            return key
+        column = next((c for c in self.column_spec if c.name == key), None)
+        return column.accessor if column else compile_accessor(key, None)
+
+    def get_reusable_rows(self) -> dict:
+        """Returns the DataRows that are already built, by row id"""
+        if self.all_rows_built:
+            return dict(zip(self.row_ids, self.datatable.rows))
+        return {}
+
+    def patch_row(self, row: ft.DataRow, record: T, row_accessor) -> int:
+        """Updates the cells of an existing DataRow to show a new version of its record, touching only the values
+        that changed. Returns the number of cells updated"""
+        changed = 0
+        values = row_accessor(record)
+        # the predicates of the actions are evaluated again by render_actions when the row is displayed, even when no
+        # cell changed, since they may depend on fields that are not displayed
+        self.action_records.pop(row, None)
+        for f in self.formatted_columns:
+            if f.format_function and not f.callback:
+                f.apply(values)
+        # the countdown column shows the time left instead of the raw value
+        if self.expiration_watcher_started:
+            countdown_idx = self.get_column_index(self.expiration_watcher_column_to_update)
+            countdown = self.get_countdown(self.get_row_id(row))
+            if countdown_idx is not None and countdown is not None:
+                values[countdown_idx] = countdown
+        # cells replaced by a format callback are rebuilt below when anything else in the row changes
+        callback_columns = {f.column_idx for f in self.formatted_columns if f.callback}
+        for idx, cell in zip(self.displayed_columns, row.cells):
+            if idx in callback_columns:
+                continue
+            c = self.column_spec[idx]
+            value = values[idx]
+            if c.custom_actions:
+                continue
+            old = cell.content.value
+            # NaN is unequal to itself, a cell still showing NaN is not changed
+            if not (old == value or (old != old and value != value)):
+                cell.content.value = value
+                changed += 1
+        if changed:
+            for f in self.formatted_columns:
+                if f.callback:
+                    self.apply_callback_format(f, row)
+        return changed
+
+    def diff_dataset(self, dataset: list[T], key) -> dict:
+        """Replaces the dataset matching the new records against the current ones by key: rows of matching records
+        are kept (with the same row id) and only their changed cells are patched, the others are removed or built.
+
+        key: a function returning the key of a record, the name of a ColumnSpec or a field name
+        Returns the number of rows inserted, removed and updated and of the cells updated
+        """
+        dataset = ColumnarDataset.wrap(dataset)
+        key_fn = self.compile_key(key)
+        row_accessor = compile_row_accessor(self.column_spec)
+
+        old_positions = {}
+        for pos, record in enumerate(self.dataset):
+            old_positions.setdefault(key_fn(record), pos)
+
+        built_rows = self.get_reusable_rows()
+        stats = {'rows_inserted': 0, 'rows_removed': 0, 'rows_updated': 0, 'cells_updated': 0}
+
+        row_ids = []
+        rows = []
+        inserted = []
+        sources = []
+        for pos, record in enumerate(dataset):
+            old_pos = old_positions.pop(key_fn(record), None)
+            sources.append(old_pos)
+            if old_pos is None:
+                inserted.append(pos)
+                row_ids.append(None)
+                rows.append(None)
+                continue
+            row_id = self.row_ids[old_pos]
+            row = built_rows.get(row_id)
+            if row is not None:
+                changed = self.patch_row(row, record, row_accessor)
+                if changed:
+                    stats['rows_updated'] += 1
+                    stats['cells_updated'] += changed
+            row_ids.append(row_id)
+            rows.append(row)
+
+        stats['rows_inserted'] = len(inserted)
+        stats['rows_removed'] = len(old_positions)
+
+        new_ids = self.generate_row_ids(len(inserted))
+        for pos, row_id in zip(inserted, new_ids):
+            row_ids[pos] = row_id
+
+        if self.all_rows_built and inserted:
+            new_rows = self.generate_datarows(self.column_spec, self.take_records(inserted, dataset), self.on_select_changed_callback, new_ids)
+            for pos, row in zip(inserted, new_rows):
+                rows[pos] = row
+
+        old_dataset = self.dataset
+        old_row_ids = self.row_ids
+        self.dataset = dataset
+        self.row_ids = array('q', row_ids)
+        self._row_positions = None
+        self._removed_positions = []
+        self._removed_below = 0
+        self.carry_over_view_cache(old_dataset, old_row_ids, sources)
+        if self.row_formats:
+            kept = set(self.row_ids)
+            self.row_formats = {row_id: formats for row_id, formats in self.row_formats.items() if row_id in kept}
+        if self.all_rows_built:
+            self.datatable.rows = rows
+        if self.expiration_watcher_started:
+            self.schedule_expirations()
+
+        return stats
+
+    def invalidate_view_cache(self):
+        """Drops the sort keys, permutations and filter masks computed for the current dataset"""
+        self.sort_keys = {}
+        self.sort_permutations = {}
+        self.permutation_base = 0
+        self.filter_masks = {}
+
+    def remove_from_view_cache(self, positions: list[int]):
+        """Keeps the sort and filter caches in sync with the removal of the given (sorted) positions of the dataset"""
+        removed = set(positions)
+        for idx, keys in self.sort_keys.items():
+            self.sort_keys[idx] = [key for pos, key in enumerate(keys) if pos not in removed]
+        for name, mask in self.filter_masks.items():
+            self.filter_masks[name] = bytearray(keep for pos, keep in enumerate(mask) if pos not in removed)
+        if self.search_index is not None:
+            for pos in positions:
+                self.search_index.remove(self.row_ids[pos])
+                if self.search_matches is not None:
+                    self.search_matches.discard(self.row_ids[pos])
+        # only the permutation being displayed is worth remapping
+        current = self.sort_permutations.get(self.sort_spec)
+        if current is not None:
+            current = remap_positions(current, [pos + self.permutation_base for pos in positions])
+        self.sort_permutations = {self.sort_spec: current} if current is not None else {}
+
+    def get_sort_keys(self, column_idx: int) -> list[tuple]:
+        """Returns the typed sort keys of a column, computed once from the raw values of the records"""
+        keys = self.sort_keys.get(column_idx)
+        if keys is None:
+            keys = self.sort_keys[column_idx] = list(map(sort_key, self.get_column_values(column_idx)))
+        return keys
+
+    def get_sort_permutation(self, sort_spec: tuple) -> list[int]:
+        """Returns the positions of the dataset ordered by sort_spec, plus permutation_base. Each sort is stable, so
+        the records keep the order of the next columns of sort_spec, then of the dataset, when the previous ones are
+        equal"""
+        permutation = self.sort_permutations.get(sort_spec)
+        if permutation is None and self.permutation_base:
+            # the new permutation starts from the current positions, the others are dropped rather than shifted
+            self.sort_permutations = {}
+            self.permutation_base = 0
+        if permutation is None and isinstance(self.dataset, ColumnarDataset):
+            # numeric columns are sorted by numpy, without computing the sort keys
+            permutation = self.dataset.argsort([(self.column_spec[idx].original_field_name, ascending) for idx, ascending in sort_spec])
+            if permutation is not None:
+                self.sort_permutations[sort_spec] = permutation
+        if permutation is None:
+            permutation = list(range(len(self.dataset)))
+            for column_idx, ascending in reversed(sort_spec):
+                self.sort_positions(permutation, column_idx, ascending)
+            self.sort_permutations[sort_spec] = permutation
+        return permutation
+
+    def sort_positions(self, positions: list[int], column_idx: int, ascending: bool):
+        """Sorts in place a list of dataset positions by the sort keys of a column, missing values last"""
+        keys = self.get_sort_keys(column_idx)
+        if isinstance(keys, OffsetList):
+            # the sort reads the key of every position, from the list itself rather than through the offset
+            keys = self.sort_keys[column_idx] = keys.as_list()
+        if ascending:
+            positions.sort(key=keys.__getitem__)
+        else:
+            positions.sort(key=lambda pos: _MISSING_SORT_KEY_DESCENDING if keys[pos] is MISSING_SORT_KEY else keys[pos], reverse=True)
+
+    def get_rank(self, sort_spec: tuple):
+        """Returns the function ranking the entries of the permutation of sort_spec (positions plus permutation_base)
+        in their order: by the sort keys of the columns, then by position, as the stable sorts leave equal records"""
+        base = self.permutation_base
+        columns = [(self.get_sort_keys(column_idx), ascending) for column_idx, ascending in sort_spec]
+
+        def rank(pos: int) -> tuple:
+            ranked = []
+            for keys, ascending in columns:
+                key = keys[pos - base]
+                ranked.append(key if ascending else _Descending(_MISSING_SORT_KEY_DESCENDING if key is MISSING_SORT_KEY else key))
+            ranked.append(pos)
+            return tuple(ranked)
+
+        return rank
+
+    def append_to_view_cache(self, start: int):
+        """Extends the sort and filter caches with the records appended from position start of the dataset"""
+        records = self.dataset[start:]
+        for idx, keys in self.sort_keys.items():
+            keys.extend(map(sort_key, self.get_column_values(idx, records)))
+        filters = {f.name: f for f in self.filters}
+        for name, mask in self.filter_masks.items():
+            mask.extend(self.evaluate_filter(filters[name], record) for record in records)
+        if self.search_index is not None:
+            for row_id, text in zip(self.row_ids[start:], self.get_search_texts(records)):
+                self.search_index.add(row_id, text)
+            self.search_matches = None
+
+        current = self.sort_permutations.get(self.sort_spec)
+        self.sort_permutations = {}
+        appended = range(start + self.permutation_base, len(self.dataset) + self.permutation_base)
+        if current is not None and len(appended) <= len(current) // self.MERGED_FRACTION:
+            # the permutation is already sorted, the new positions are merged into it. Larger appends sort it again
+            rank = self.get_rank(self.sort_spec)
+            merge_ranked(current, sorted(appended, key=rank), rank)
+            self.sort_permutations[self.sort_spec] = current
+
+    def evict_from_view_cache(self, count: int):
+        """Drops the first count records of the dataset from the sort, filter and search caches"""
+        if self.search_index is not None:
+            for row_id in self.row_ids[:count]:
+                self.search_index.remove(row_id)
+                if self.search_matches is not None:
+                    self.search_matches.discard(row_id)
+        current = self.sort_permutations.get(self.sort_spec)
+        if current is not None:
+            # the positions kept are not shifted, the base of the permutation moves instead
+            evicted = range(self.permutation_base, self.permutation_base + count)
+            if count <= len(current) // self.MERGED_FRACTION:
+                drop_ranked(current, evicted, self.get_rank(self.sort_spec))
+            else:
+                current = [pos for pos in current if pos >= evicted.stop]
+            self.permutation_base += count
+        self.sort_permutations = {self.sort_spec: current} if current is not None else {}
+
+        for idx, keys in self.sort_keys.items():
+            keys = self.sort_keys[idx] = OffsetList.wrap(keys)
+            del keys[:count]
+        for mask in self.filter_masks.values():
+            # bytearrays move their start over a deleted prefix as well
+            del mask[:count]
+
+    def carry_over_view_cache(self, old_dataset: list[T], old_row_ids: list[int], sources: list[Optional[int]]):
+        """Moves the sort keys, filter masks and search index entries of the records kept unchanged by a diff to their
+        new positions, only the new and changed records are evaluated again. sources holds the old position of each
+        new record, or None"""
+        unchanged = [
+            old_pos if old_pos is not None and record == old_dataset[old_pos] else None
+            for record, old_pos in zip(self.dataset, sources)
+        ]
+        if self.search_index is not None:
+            for row_id in set(old_row_ids).difference(self.row_ids):
+                self.search_index.remove(row_id)
+            changed = [pos for pos, old_pos in enumerate(unchanged) if old_pos is None]
+            for pos, text in zip(changed, self.get_search_texts([self.dataset[pos] for pos in changed])):
+                self.search_index.add(self.row_ids[pos], text)
+            self.search_matches = None
+        for idx, keys in self.sort_keys.items():
+            accessor = self.column_spec[idx].accessor
+            self.sort_keys[idx] = [
+                keys[old_pos] if old_pos is not None else sort_key(accessor(record))
+                for record, old_pos in zip(self.dataset, unchanged)
+            ]
+        filters = {f.name: f for f in self.filters}
+        for name, mask in self.filter_masks.items():
+            self.filter_masks[name] = bytearray(
+                mask[old_pos] if old_pos is not None else self.evaluate_filter(filters[name], record)
+                for record, old_pos in zip(self.dataset, unchanged)
+            )
+        self.sort_permutations = {}
+
+    @staticmethod
+    def evaluate_filter(f: ToggleFilterSpec, record: T) -> int:
+        try:
+            return 1 if f.callback(record) else 0
+        except Exception as e:
+            logger.error("Error in filter %s: %s", f.name, e)
+            return 0
+
+    def get_filter_mask(self) -> Optional[bytes]:
+        """Returns the combination of the masks of the active filters, with a 1 for each record to display, or None
+        when no filter is active. Each predicate runs once per record, toggling filters only combines the cached masks"""
+        active = [f for f in self.filters if f.active and f.callback]
+        if not active:
+            return None
+        masks = []
+        for f in active:
+            mask = self.filter_masks.get(f.name)
+            if mask is None:
+                mask = self.filter_masks[f.name] = bytearray(self.evaluate_filter(f, record) for record in self.dataset)
+            masks.append(mask)
+
+        # masks hold a 0 or 1 per byte, so they are combined bytewise as big integers
+        combined = int.from_bytes(masks[0], 'little')
+        for mask in masks[1:]:
+            if self.filter_mode == 'AND':
+                combined &= int.from_bytes(mask, 'little')
+            else:
+                combined |= int.from_bytes(mask, 'little')
+        return combined.to_bytes(len(self.dataset), 'little')
+
+    def get_view_mask(self) -> Optional[bytes]:
+        """Returns the mask of the records passing both the active filters and the search, None when all pass"""
+        mask = self.get_filter_mask()
+        matches = self.get_search_matches()
+        if matches is None:
+            return mask
+        search_mask = bytes(1 if row_id in matches else 0 for row_id in self.row_ids)
+        if mask is None:
+            return search_mask
+        return (int.from_bytes(mask, 'little') & int.from_bytes(search_mask, 'little')).to_bytes(len(self.dataset), 'little')
+
+    def get_view(self) -> Optional[list[int]]:
+        """Returns the positions of the dataset in the order they are displayed, None when it is the dataset order"""
+        order = self.get_sort_permutation(self.sort_spec) if self.sort_spec else None
+        base = self.permutation_base
+        mask = self.get_view_mask()
+        if mask is None:
+            # the permutation holds the positions plus its base, they are shifted only when they are read
+            return ShiftedPositions(order, base) if order is not None and base else order
+        if order is None:
+            return list(compress(range(len(self.dataset)), mask))
+        if base:
+            return [pos - base for pos in order if mask[pos - base]]
+        return [pos for pos in order if mask[pos]]
+
+    def get_search_texts(self, records: list[T]) -> list[str]:
+        """Returns the text the search looks into for each record: the values its data columns display"""
+        searched = [idx for idx, c in enumerate(self.column_spec) if c.visible and not c.custom_actions]
+        texts = []
+        for values in self.get_row_values(self.column_spec, records):
+            texts.append('\n'.join(str(values[idx]) for idx in searched if values[idx] is not None and values[idx] != ''))
+        return texts
+
+    def invalidate_search_index(self):
+        """Drops the search index, it is built again by the next search"""
+        self.search_index = None
+        self.search_matches = None
+
+    def get_search_index(self) -> SearchIndex:
+        if self.search_index is None:
+            self.search_index = SearchIndex()
+            for row_id, text in zip(self.row_ids, self.get_search_texts(self.dataset)):
+                self.search_index.add(row_id, text)
+        return self.search_index
+
+    def get_search_matches(self) -> Optional[set[str]]:
+        """Returns the ids of the rows matching the current search, None when there is no query"""
+        if not self.search_query:
+            return None
+        if self.search_matches is None:
+            self.search_matches = self.get_search_index().search(self.search_query, self.search_prefix)
+        return self.search_matches
+
+    def search(self, query: str, prefix: bool = False) -> dict:
+        """
+        Displays only the rows containing query in the values of their columns, or with a word starting with it
+        when prefix is set. An empty query displays all the rows again.
+        Returns the query, the number of matching rows and the latency of the search in milliseconds.
+        """
+        with self.expiration_lock:
+            start = time.perf_counter()
+            self.search_query = query.strip()
+            self.search_prefix = prefix
+            self.search_matches = None
+            matches = self.get_search_matches()
+            latency = (time.perf_counter() - start) * 1000
+            self.search_stats = {
+                'query': self.search_query,
+                'matches': len(matches) if matches is not None else len(self.dataset),
+                'latency_ms': latency,
+            }
+            self.v_search.controls[1].value = f"{self.search_stats['matches']} matches in {latency:.1f} ms" if self.search_query else ""
+            self.on_view_changed()
+        return self.search_stats
+
+    def search_debounced(self, query: str):
+        """Searches once no other query came for SEARCH_DEBOUNCE seconds, so typing doesn't search at each keystroke"""
+        if self.search_timer is not None:
+            self.search_timer.cancel()
+        self.search_timer = Timer(self.SEARCH_DEBOUNCE, self._search_from_box, args=(query,))
+        self.search_timer.daemon = True
+        self.search_timer.start()
+
+    def _search_from_box(self, query: str):
+        try:
+            self.search(query)
+        except Exception as e:
+            logger.error("Error searching table %s: %s", self.table_uuid, e)
+
+    def generate_search_bar(self, searchable: bool) -> ft.Row:
+        return ft.Row(
+            controls=[
+                ft.TextField(
+                    hint_text="Search",
+                    prefix_icon=ft.icons.SEARCH,
+                    dense=True,
+                    width=250,
+                    on_change=lambda e: self.search_debounced(e.control.value)
+                ),
+                ft.Text(size=11)
+            ],
+            visible=searchable
+        )
+
+    def generate_filter_chips(self) -> ft.Row:
+        return ft.Row(
+            controls=[
+                ft.Chip(
+                    label=ft.Text(f.name),
+                    selected=f.active,
+                    on_select=lambda e, f=f: self.set_filter(f.name, e.data == "true")
+                )
+                for f in self.filters
+            ],
+            visible=bool(self.filters)
+        )
+
+    def set_filter(self, name: str, active: bool):
+        """Turns the filter with the given name on or off"""
+        for f, chip in zip(self.filters, self.v_filters.controls):
+            if f.name == name:
+                f.active = active
+                chip.selected = active
+        self.on_view_changed()
+
+    def set_filter_mode(self, filter_mode: str):
+        """Sets whether a record is displayed when it passes all the active filters (AND) or any of them (OR)"""
+        if filter_mode not in self.FILTER_MODES:
+            raise ValueError(f"filter_mode must be one of {self.FILTER_MODES}")
+        self.filter_mode = filter_mode
+        self.on_view_changed()
+
+    def sort_by(self, sort_spec: list[tuple[int, bool]]):
+        """Displays the rows sorted by a list of (column index, ascending); rows are reordered, not rebuilt"""
+        self.sort_spec = tuple((column_idx, ascending) for column_idx, ascending in sort_spec)
+        self.on_view_changed()
+
+    def sort_by_column(self, column_idx: int, ascending: bool):
+        """Sorts by a column, the columns sorted before are kept as tie breakers"""
+        sort_spec = [(column_idx, ascending)] + [(idx, asc) for idx, asc in self.sort_spec if idx != column_idx]
+        self.sort_by(sort_spec[:self.MAX_SORT_COLUMNS])
+
+    def on_view_changed(self):
+        """Called when the order of the displayed rows or the active filters change, to redraw the table"""
+        pass
 
     def get_rows(self) -> list[ft.DataRow]:
+        """Returns the DataRows that are built: all the rows in the order of the dataset, or only those displayed
+        when the rows are built on demand (visible_rows_only, VirtualDataTable). get_row_by_number returns the row
+        of any record in both cases"""
         return self.datatable.rows
     
     def get_dataset(self) -> List[T]:
         return self.dataset
 
     def copy_to_clipboard(self, event: ft.ControlEvent):
+        # pyperclip is only imported once something is copied
+        import pyperclip
         row: ft.DataRow = event.control
-        pc.copy(row.cells[0].content.value)
+        pyperclip.copy(self.get_cell_value(row, 0))
+
+    def get_column_index(self, column_name: str) -> Optional[int]:
+        for idx, c in enumerate(self.column_spec):
+            if c.name == column_name:
+                return idx
 
     def update_row_expiration(self, column_to_check: str, column_to_update: str, callback: any = None):
-        
-        self.expiration_watcher_column_to_check = column_to_check
-        self.expiration_watcher_column_to_update = column_to_update
-
-        self.expiration_update_thread = PauseableThread(
-            f"row_exp_{column_to_update}",
-            self.watch_expiration, 
-            self.expiration_watcher_column_to_check, 
-            self.expiration_watcher_column_to_update,
-            callback
+        """Shows in column_to_update the time left before the datetime of column_to_check and calls callback once it is reached.
+        Expirations of all the tables are handled by the shared ExpirationScheduler.
+
+        column_to_check: column containing datetime values
+        column_to_update: column where the time left is displayed
+        callback: function that will be called on expiration. It must accept a DataRow as argument. Rows only have cells
+            for the visible columns, read them with get_cell or get_cell_value
+        """
+        ExpirationScheduler.shared().watch(self)
+        if callback:
+            self.warn_positional_callback("expiration")
+
+        with self.expiration_lock:
+            self.expiration_watcher_column_to_check = column_to_check
+            self.expiration_watcher_column_to_update = column_to_update
+            self.expiration_callback = callback
+            self.expiration_watcher_started = True
+            self.expiration_deadlines = {}
+            self.expired_rows = set()
+            self.schedule_expirations()
+
+        self.render_countdowns()
+
+    def stop_row_expiration(self):
+        with self.expiration_lock:
+            self.expiration_watcher_started = False
+            self.expiration_deadlines = {}
+            self.expired_rows = set()
+        ExpirationScheduler.shared().unwatch(self)
+
+    def parse_expiration(self, value) -> Optional[float]:
+        """Returns the epoch of an expiration value (a datetime or an ISO string), None if it can't be parsed"""
+        try:
+            return self.expiration_parse_memo[value]
+        except (KeyError, TypeError):
+            pass
+        try:
+            deadline = datetime.fromisoformat(str(value)).timestamp()
+        except ValueError:
+            deadline = None
+        try:
+            if len(self.expiration_parse_memo) >= ColumnFormat.MEMO_SIZE:
+                self.expiration_parse_memo.clear()
+            self.expiration_parse_memo[value] = deadline
+        except TypeError:
+            pass
+        return deadline
+
+    def schedule_row_expirations(self, row_ids: list[int], records: list[T]):
+        """Parses and schedules the expiration of new records only"""
+        column_idx = self.get_column_index(self.expiration_watcher_column_to_check)
+        if column_idx is None:
+            return
+        deadlines = []
+        for row_id, value in zip(row_ids, self.get_column_values(column_idx, records)):
+            deadline = self.parse_expiration(value) if value else None
+            if deadline is not None:
+                self.expiration_deadlines[row_id] = deadline
+                deadlines.append((row_id, deadline))
+        ExpirationScheduler.shared().schedule(self, deadlines)
+
+    def schedule_expirations(self):
+        """Parses the expiration of every record and schedules the deadlines that are new or changed"""
+        column_idx = self.get_column_index(self.expiration_watcher_column_to_check)
+        if column_idx is None:
+            return
+        deadlines = {}
+        for row_id, value in zip(self.row_ids, self.get_column_values(column_idx)):
+            if value:
+                deadline = self.parse_expiration(value)
+                if deadline is not None:
+                    deadlines[row_id] = deadline
+
+        previous = self.expiration_deadlines
+        self.expiration_deadlines = deadlines
+        # expired rows are scheduled again with their deadline, which has passed unless their record changed
+        self.expired_rows = set()
+        ExpirationScheduler.shared().schedule(
+            self, [(row_id, deadline) for row_id, deadline in deadlines.items() if previous.get(row_id) != deadline]
         )
-        
-        self.expiration_update_thread.start()
-    
+
+    def get_visible_rows(self) -> list[ft.DataRow]:
+        """Returns the rows currently displayed"""
+        return self.datatable.rows
+
+    def expire_rows(self, entries: list[tuple[int, float]]):
+        """Called by the ExpirationScheduler with the (row_id, deadline) pairs that are due"""
+        start = time.perf_counter()
+        with self.expiration_lock:
+            column_idx = self.get_column_index(self.expiration_watcher_column_to_update)
+            expired = []
+            for row_id, deadline in entries:
+                # entries of removed rows or of changed expirations are stale
+                if self.expiration_deadlines.get(row_id) != deadline:
+                    continue
+                del self.expiration_deadlines[row_id]
+                if self.expiration_callback:
+                    row = self.get_row_by_uuid(row_id)
+                    if row is not None:
+                        self.expiration_callback(row)
+                elif column_idx in self.cell_positions:
+                    # kept by row id rather than written in the row, which may not be built (or only for this call),
+                    # so that the row shows it whenever it is built, see get_countdown
+                    self.expired_rows.add(row_id)
+                    expired.append(row_id)
+            if expired:
+                # the rows already built show the expiration right away, the others once they are built
+                if self.all_rows_built:
+                    rows = [self.get_row_by_uuid(row_id) for row_id in expired]
+                else:
+                    built = self.get_reusable_rows()
+                    rows = [built[row_id] for row_id in expired if row_id in built]
+                if self.fill_countdowns(rows):
+                    self.refresh_visible_rows()
+        if self.metrics:
+            self.metrics.observe('expiration_tick', time.perf_counter() - start)
+
+    def render_countdowns(self, now: float = None):
+        """Updates the time left of the rows being displayed, sending an update only if some value changed"""
+        start = time.perf_counter()
+        with self.expiration_lock:
+            if self.fill_countdowns(self.get_visible_rows(), now):
+                self.refresh_visible_rows()
+        if self.metrics:
+            self.metrics.observe('expiration_tick', time.perf_counter() - start)
+
+    def fill_countdowns(self, rows: list[ft.DataRow], now: float = None) -> bool:
+        """Sets the time left in the given rows without updating the control. Returns whether some value changed"""
+        cell_pos = self.cell_positions.get(self.get_column_index(self.expiration_watcher_column_to_update))
+        if not self.expiration_watcher_started or cell_pos is None:
+            return False
+        now = now or time.time()
+        changed = False
+        for row in rows:
+            formatted_time_left = self.get_countdown(self.get_row_id(row), now)
+            if formatted_time_left is None:
+                continue
+            cell = row.cells[cell_pos].content
+            if cell.value != formatted_time_left:
+                cell.value = formatted_time_left
+                changed = True
+        return changed
+
+    def get_countdown(self, row_id, now: float = None) -> Optional[str]:
+        """Returns the time left the countdown column shows for a row, None when the row has no expiration"""
+        row_id = self.parse_row_id(row_id)
+        if row_id in self.expired_rows:
+            return format_time_left(0)
+        deadline = self.expiration_deadlines.get(row_id)
+        if deadline is None:
+            return None
+        return format_time_left(max(0, int(deadline - (now or time.time()))))
+
+    def refresh_visible_rows(self):
+        self.request_update()
+
+    def request_update(self):
+        """Marks the table dirty, it is sent with the next flush of the shared UpdateScheduler along with the other
+        pending updates of its page"""
+        UpdateScheduler.shared().mark_dirty(self)
+
+    async def send_update_async(self):
+        """Updates the table right away on the running event loop, bypassing the UpdateScheduler. Does nothing while the
+        table is not on a page, like request_update"""
+        if self.page is None:
+            return
+        start = time.perf_counter()
+        await self.update_async()
+        if self.metrics:
+            self.metrics.record_update(time.perf_counter() - start)
+
+    def enable_metrics(self, sinks: list = None) -> TableMetrics:
+        """
+        Starts collecting the counters and timings of the table: rows and controls built, updates and their duration,
+        lazy_callback latencies, formatting and expiration tick times, and the depth of its effects queue.
+
+        sinks: objects with an emit(snapshot) method the snapshots are sent to by metrics.publish(), e.g.
+            LoggingSink or PrometheusTextSink
+        Returns the TableMetrics, also available as table.metrics, whose snapshot() returns the collected values
+        """
+        if self.metrics is None:
+            self.metrics = TableMetrics(self.table_uuid, sinks)
+            self.metrics.add_gauge('effects_queue_depth', lambda: EffectsScheduler.shared().queue_depth(self))
+        else:
+            self.metrics.sinks.extend(sinks or [])
+        return self.metrics
+
+    def disable_metrics(self):
+        self.metrics = None
+
+    def batch(self):
+        """
+        Returns a context holding back the updates of this table, and of any other table changed by the same thread,
+        until it exits, so they reach the UI together:
+
+            with table.batch():
+                table.redraw(...)
+                other_table.set_filter(...)
+        """
+        return UpdateScheduler.shared().transaction()
+
     def build(self):
         pass
     
-    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None):
+    def redraw(self, dataset: list[T], highlighted_row_number = None, count=None, key=None):
+        """Redraws the table with a new dataset. When key is given, rows are matched by key and reused (see diff_dataset)
+        and the diff stats are returned"""
         pass
 
     def format_column(self, column_name_to_format: str, _format: str, column_name_values: any=None, callback: any=None):
@@ -224,88 +1572,136 @@ class _DataTable(Generic[T]):
         
         column_name_to_format: the column to format
         _format: mnemonic name for format - COMMAS, FIX_DATE, FIX_DATETIME
-        column_name_values: the column to take values from. It can be equal to column_name_to_format itself if you wish to use the same values
+        column_name_values: the column to take values from. It can be equal to column_name_to_format itself if you wish to use the same values. Defaults to column_name_to_format
         callback: function that will apply the given format to each value according to a custom logic. The callback must accept a Datarow
+            and return the DataCell of column_name_to_format. Rows only have cells for the visible columns, read them with get_cell or get_cell_value
         """
-        # mantain a reference of the formatted columns so that on successive redraws the same formatting is applied automatically
-        for row in self.datatable.rows:
-            column_to_format_idx = 0
-            column_value = 0
-            idx = 0
-            while idx < len(self.column_spec):
-                if self.column_spec[idx].name == column_name_to_format:
-                    column_to_format_idx = idx
-                    break
-                idx += 1
-            
-            if column_name_values:
-                idx = 0
-                while idx < len(self.column_spec):
-                    if self.column_spec[idx].name == column_name_values:
-                        column_value = idx
-                        break
-                    idx += 1
+        column_names = [c.name for c in self.column_spec]
+        if column_name_to_format not in column_names:
+            logger.warning("Unknown column to format: %s", column_name_to_format)
+            return
+        column_idx = column_names.index(column_name_to_format)
+        values_idx = column_names.index(column_name_values) if column_name_values in column_names else column_idx
+
+        f = ColumnFormat(column_name_to_format, _format, column_name_values, callback, column_idx, values_idx)
+        if not f.callback and not f.format_function:
+            logger.warning("Unknown format: %s", _format)
+            return
+        if f.callback:
+            self.warn_positional_callback("format")
+
+        # mantain a reference of the formatted columns so that every row built from now on is formatted once, when it is built
+        self.formatted_columns = [d for d in self.formatted_columns if d.column_name_to_format != column_name_to_format]
+        self.formatted_columns.append(f)
+
+        # the search looks into the formatted values
+        self.invalidate_search_index()
 
+        # hidden columns have no cells, their values are formatted when read (see get_cell_value)
+        cell_pos = self.cell_positions.get(column_idx)
+        if cell_pos is None:
+            return
+
+        # rows already built are formatted from their records, so a cell formatted before is not formatted twice
+        start = time.perf_counter()
+        value_column = self.column_spec[values_idx]
+        for row_id, row in self.get_reusable_rows().items():
+            if f.callback:
+                self.apply_callback_format(f, row)
+                continue
+            record = self.get_record_by_uuid(row_id)
+            if record is None:
+                continue
             try:
-                if callback:
-                    # row.cells[column_to_format_idx].content.value = callback(row)
-                    row.cells[column_to_format_idx] = callback(row)
-                elif _format == "COMMAS":
-                    row.cells[column_to_format_idx].content.value = ("{:,}".format(int(row.cells[column_value].content.value)))
-                elif _format == "FIX_DATE":
-                    # converts from YYYYMMDD to YYYY-MM-DD
-                    
-                    original_date = str(row.cells[column_value].content.value)
-                    year = original_date[:4]
-                    month = original_date[4:6]
-                    day = original_date[6:]
-                    row.cells[column_to_format_idx].content.value = f"{year}-{month}-{day}"
-                elif _format == "FIX_DATETIME":
-                    # converts from YYYYMMDD-HH:MM:SS to datetime
-                    
-                    original_date = str(row.cells[column_value].content.value)
-                    row.cells[column_to_format_idx].content.value = datetime.strptime(original_date, '%Y%m%d-%H:%M:%S')
+                row.cells[cell_pos].content.value = f.format_value(value_column.get_value(record))
             except Exception as e:
-                print(e)
-        
-        if not self.formatted_columns or not any(d['column_name_to_format'] == column_name_to_format for d in self.formatted_columns):
-            self.formatted_columns.append({
-                'column_name_to_format': column_name_to_format,
-                '_format': _format,
-                'callback': callback,
-                'column_name_values': column_name_values
-            })
+                logger.error("Error formatting column %s of table %s: %s", column_name_to_format, self.table_uuid, e)
+        if self.metrics:
+            self.metrics.observe('format', time.perf_counter() - start)
+
+    def apply_callback_format(self, f: ColumnFormat, row: ft.DataRow):
+        cell_pos = self.cell_positions.get(f.column_idx)
+        if cell_pos is None:
+            return
+        try:
+            row.cells[cell_pos] = f.callback(row)
+        except Exception as e:
+            logger.error("Error formatting column %s of table %s: %s", f.column_name_to_format, self.table_uuid, e)
+
+    def get_row_by_number(self, row_number) -> Optional[ft.DataRow]:
+        """Returns the DataRow of the record at the given position of the dataset (negative positions count from the
+        end), whether all the rows are built or not, None if there is no such record. Rows built on demand that are
+        not displayed are built for the call"""
+        with self.expiration_lock:
+            pos = row_number + len(self.dataset) if row_number < 0 else row_number
+            if not 0 <= pos < len(self.dataset):
+                return None
+            return self.get_built_row(pos)
 
     def format_row(self, row_number, color, column_name=None):
-        """Apply a custom format to a given row"""
-        row_format_thread = Thread(
-            target=self._execute_row_format, args=(row_number, color, column_name,), daemon=True
-        )
-        self.q.put(row_format_thread)
-        self.q.join()
+        """Apply a custom format to the row of the record at the given position of the dataset (see get_row_by_number).
+        The format is applied by the shared EffectsScheduler, the call doesn't block. Rows built on demand keep their
+        format when they are built again"""
+        with self.expiration_lock:
+            row = self.get_row_by_number(row_number)
+            if row is None:
+                return
+            column_idx = self.get_column_index(column_name) if column_name else None
+            if column_name and column_idx not in self.cell_positions:
+                return
+            if not self.all_rows_built:
+                self.row_formats.setdefault(self.parse_row_id(self.get_row_id(row)), {})[column_idx] = color
+        if column_idx is None:
+            EffectsScheduler.shared().set_row_color(self, row, ft.colors.with_opacity(0.3, color))
+            return
+        cell = self.get_cell(row, column_idx)
 
-    def highlight_row(self, row_number):
-        """Highlights a given row for a short amount of time"""
-        row_highlight_thread = Thread(
-            target=self._execute_row_highlight, args=(row_number,), daemon=True
-        )
-        self.q.put(row_highlight_thread)
-        self.q.join()
+        def format_cell():
+            cell.content.color = color
 
-    def _execute_row_highlight(self, row_number):
-        pass
+        EffectsScheduler.shared().schedule(self, format_cell)
 
-    def _execute_row_format(self, row_number, color, column_name=None):
-        pass
+    def apply_row_format(self, row: ft.DataRow, formats: dict, previous: dict = None):
+        """Sets the colors of format_row on a DataRow, formats being the row_formats of its record. The colors of
+        previous, the formats of the record a recycled row displayed before, are cleared"""
+        for column_idx in (previous or {}).keys() - formats.keys():
+            if column_idx is None:
+                row.color = None
+            else:
+                self.get_cell(row, column_idx).content.color = None
+        for column_idx, color in formats.items():
+            if column_idx is None:
+                row.color = ft.colors.with_opacity(0.3, color)
+            else:
+                self.get_cell(row, column_idx).content.color = color
+
+    def highlight_row(self, row_number):
+        """Highlights the row of the record at the given position of the dataset (see get_row_by_number) for a short
+        amount of time. The animation runs on the shared EffectsScheduler, concurrently with the other highlights, and
+        the call doesn't block"""
+        row = self.get_row_by_number(row_number)
+        if row is None:
+            return
+        EffectsScheduler.shared().highlight(self, row, self.HIGHLIGHT_FRAMES, self.HIGHLIGHT_DURATION)
 
     def remove_row(self, row: ft.DataRow):
-        pass
+        self.remove_rows_by_uuid([self.get_row_id(row)])
 
-    def watch_expiration(self, column_to_check: str, column_to_update: str, callback: any = None):
-        """A function to update the expiration time of all rows, once the expiration time is reached, the row is removed.
+    def watch_expiration(self, column_to_check: str, column_to_update: str, callback: any = None, now: float = None):
+        """A function to update the expiration time of the displayed rows, the rows whose expiration time is reached are expired.
+        It is run every second by the shared ExpirationScheduler once update_row_expiration is called, calling it directly forces a refresh.
 
         column_to_check: column containing datetime values
         column_to_update: column containing integer values that must be updated
         callback: function that will be called on expiration. It must accept a DataRow as argument
+        now: epoch the expirations and the time left are computed at. Defaults to the current time
         """
-        pass
\ No newline at end of file
+        if (not self.expiration_watcher_started
+                or self.expiration_watcher_column_to_check != column_to_check
+                or self.expiration_watcher_column_to_update != column_to_update
+                or self.expiration_callback != callback):
+            self.update_row_expiration(column_to_check, column_to_update, callback)
+
+        now = now or time.time()
+        self.expire_rows([(row_id, deadline) for row_id, deadline in list(self.expiration_deadlines.items()) if deadline <= now])
+        self.render_countdowns(now)
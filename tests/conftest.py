@@ -0,0 +1,23 @@
+import os
+import sys
+import time
+
+import pytest
+
+# the headless page of the benchmarks is shared with the tests
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+@pytest.fixture
+def fast_switching():
+    # threads switch as often as possible, so that they interleave within the methods of the tables
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+@pytest.fixture
+def frozen_time(monkeypatch) -> float:
+    # countdowns are rendered at the same second whatever the time the test takes, the frozen epoch is returned
+    now = 1_700_000_000.0
+    monkeypatch.setattr(time, 'time', lambda: now)
+    return now
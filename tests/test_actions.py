@@ -0,0 +1,34 @@
+import pytest
+
+from ..components._DataTable import ColumnSpec, CustomAction
+from ..components.PaginatedDatatable import PaginatedDataTable
+from ..components.VirtualDataTable import VirtualDataTable
+
+def make_table(table_class, records: list[dict], **kwargs):
+    close = CustomAction("Close", lambda e: None, disabled_callback=lambda record: record['status'] == 'closed')
+    columns = [
+        ColumnSpec("ID", "id"),
+        ColumnSpec("STATUS", "status", visible=False),
+        ColumnSpec("ACTIONS", custom_actions=[close]),
+    ]
+    return table_class(columns, records, **kwargs)
+
+def close_disabled(table) -> list[bool]:
+    return [table.get_cell(row, 2).content.controls[0].disabled for row in table.get_visible_rows()]
+
+@pytest.mark.parametrize("table_class, kwargs", [
+    (PaginatedDataTable, {'rows_per_page': 10}),
+    (PaginatedDataTable, {'rows_per_page': 10, 'visible_rows_only': True}),
+    (VirtualDataTable, {}),
+])
+def test_keyed_redraw_of_records_changed_in_place(table_class, kwargs):
+    records = [{'id': n, 'status': 'open'} for n in range(3)]
+    table = make_table(table_class, records, **kwargs)
+    assert close_disabled(table) == [False, False, False]
+
+    # the predicate reads a hidden field, no displayed cell changes
+    records[1]['status'] = 'closed'
+    stats = table.redraw(records, key='id')
+
+    assert stats['cells_updated'] == 0
+    assert close_disabled(table) == [False, True, False]
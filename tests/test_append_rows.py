@@ -0,0 +1,150 @@
+import logging
+import threading
+import time
+
+import pytest
+
+from ..components._DataTable import ColumnSpec, ToggleFilterSpec
+from ..components.BasicDataTable import BasicDataTable
+from ..components.PaginatedDatatable import PaginatedDataTable
+from ..components.VirtualDataTable import VirtualDataTable
+from ..utils.EffectsScheduler import EffectsScheduler
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("VALUE", "value")]
+MAX_ROWS = 3000
+
+def make_records(start: int, count: int) -> list[dict]:
+    return [{'id': n, 'value': n % 97} for n in range(start, start + count)]
+
+def run_with_producer(table, navigate, seconds: float = 1.0) -> list[Exception]:
+    """Appends rows from another thread while navigate runs in a loop, returns the errors raised by navigate"""
+    table.APPEND_FLUSH_INTERVAL = 0
+    stop = threading.Event()
+
+    def produce():
+        n = MAX_ROWS
+        while not stop.is_set():
+            table.append_rows(make_records(n, 50))
+            n += 50
+            time.sleep(0.001)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    errors = []
+    end = time.monotonic() + seconds
+    try:
+        while time.monotonic() < end:
+            try:
+                navigate()
+            except Exception as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        producer.join()
+    wait_for_flush(table)
+    return errors
+
+def wait_for_flush(table, timeout: float = 10):
+    """Waits until the rows appended so far are in the table"""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        with table.expiration_lock:
+            if not table.append_flush_pending:
+                return
+        time.sleep(0.01)
+    raise TimeoutError("appended rows were not flushed")
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_navigation_during_appends(visible_rows_only, fast_switching, caplog):
+    table = PaginatedDataTable(COLUMNS, make_records(0, MAX_ROWS), rows_per_page=50, visible_rows_only=visible_rows_only, max_rows=MAX_ROWS)
+    table.sort_by([(1, False)])
+
+    def navigate():
+        table.goto_last_page(None)
+        table.prev_page(None)
+        table.set_page(page=3)
+        table.next_page(None)
+
+    with caplog.at_level(logging.ERROR):
+        errors = run_with_producer(table, navigate)
+
+    assert errors == []
+    assert [r.getMessage() for r in caplog.records] == []
+    assert len(table.dataset) == MAX_ROWS
+    assert table.dataset[0]['id'] > 0
+    table.refresh_data(update=False)
+    assert all(table.get_record_by_uuid(table.get_row_id(row)) is not None for row in table.get_visible_rows())
+
+def test_scrolling_during_appends(fast_switching, caplog):
+    table = VirtualDataTable(COLUMNS, make_records(0, MAX_ROWS), max_rows=MAX_ROWS)
+
+    def navigate():
+        table.scroll_by(400)
+        table.scroll_by(-300)
+
+    with caplog.at_level(logging.ERROR):
+        errors = run_with_producer(table, navigate)
+
+    assert errors == []
+    assert [r.getMessage() for r in caplog.records] == []
+    assert len(table.dataset) == MAX_ROWS
+
+def make_sortable_records(start: int, count: int) -> list[dict]:
+    # values with ties and missing ones
+    return [{'id': n, 'value': None if n % 13 == 0 else n % 97} for n in range(start, start + count)]
+
+def sorted_ids(records: list[dict], sort_spec: list[tuple[int, bool]]) -> list[int]:
+    fields = {0: 'id', 1: 'value'}
+    records = list(records)
+    for column_idx, ascending in reversed(sort_spec):
+        field = fields[column_idx]
+        present = sorted((r for r in records if r[field] is not None), key=lambda r: r[field], reverse=not ascending)
+        records = present + [r for r in records if r[field] is None]
+    return [r['id'] for r in records]
+
+@pytest.mark.parametrize("table_class, kwargs", [
+    (BasicDataTable, {}),
+    (PaginatedDataTable, {'rows_per_page': 50}),
+    (PaginatedDataTable, {'rows_per_page': 50, 'visible_rows_only': True}),
+])
+@pytest.mark.parametrize("sort_spec", [[(1, True)], [(1, False)], [(1, False), (0, False)]])
+def test_evictions_keep_the_table_consistent(table_class, kwargs, sort_spec):
+    # appends and evictions of an eighth of the rows are merged into the sorted order
+    max_rows = 800
+    filters = [ToggleFilterSpec("even", lambda record: record['id'] % 2 == 0, active=True)]
+    table = table_class(COLUMNS, make_sortable_records(0, max_rows), max_rows=max_rows, filters=filters, **kwargs)
+    table.sort_by(sort_spec)
+    # enough batches for the evicted rows to be released several times
+    for n in range(max_rows, 4 * max_rows, 100):
+        table.append_rows(make_sortable_records(n, 100))
+        # flushed right away rather than at the next frame of the scheduler, after the flush it may be running
+        with table.expiration_lock:
+            table.flush_appended_rows()
+
+    expected = make_sortable_records(3 * max_rows, max_rows)
+    assert list(table.dataset) == expected
+    assert len(table.row_ids) == max_rows
+    assert [table.dataset[pos]['id'] for pos in table.get_view()] == [n for n in sorted_ids(expected, sort_spec) if n % 2 == 0]
+    table.set_filter("even", False)
+    assert [table.dataset[pos]['id'] for pos in table.get_view()] == sorted_ids(expected, sort_spec)
+
+    row = table.get_built_row(10)
+    assert table.get_record_by_uuid(table.get_row_id(row)) == expected[10]
+    table.remove_row_by_uuid(table.get_row_id(row))
+    assert len(table.dataset) == max_rows - 1
+    assert table.get_record_by_uuid(table.get_row_id(table.get_built_row(10))) == expected[11]
+    assert [table.dataset[pos]['id'] for pos in table.get_view()] == sorted_ids(expected[:10] + expected[11:], sort_spec)
+
+def test_long_frames_do_not_block_the_callers():
+    scheduler = EffectsScheduler()
+    started = threading.Event()
+
+    def long_frame():
+        started.set()
+        time.sleep(0.5)
+
+    scheduler.schedule(None, long_frame)
+    assert started.wait(5)
+    start = time.monotonic()
+    scheduler.schedule(None, lambda: None)
+    assert time.monotonic() - start < 0.25
@@ -0,0 +1,63 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ..utils.ColumnarDataset import ColumnarDataset
+
+def test_appends_with_evictions_reuse_the_buffers():
+    data = np.arange(10)
+    dataset = ColumnarDataset({'id': data, 'value': data * 1.5})
+
+    dataset.extend([{'id': 10, 'value': 15.0}])
+    buffer = dataset.buffers['id']
+    page = dataset[0:5]
+    for n in range(11, 500):
+        dataset.extend([{'id': n, 'value': n * 1.5}])
+        del dataset[:1]
+
+    assert dataset.buffers['id'] is buffer
+    assert dataset.column_values('id') == list(range(489, 500))
+    assert dataset[-1] == {'id': 499, 'value': 748.5}
+    # the appends never write over the records handed out, nor over the arrays given to the dataset
+    assert page.column_values('id') == list(range(5))
+    assert data.tolist() == list(range(10))
+
+def test_appended_records_widen_the_columns():
+    dataset = ColumnarDataset({'id': np.arange(3), 'name': np.array(["a", "b", "c"])})
+
+    dataset.extend([{'id': 3.5, 'name': "a longer name"}])
+
+    assert dataset.column_values('id') == [0, 1, 2, 3.5]
+    assert dataset.column_values('name')[-1] == "a longer name"
+
+def test_slices_are_views_and_records_python_values():
+    data = np.zeros(5, dtype=[('id', 'i8'), ('price', 'f8')])
+    data['id'] = np.arange(5)
+    data['price'] = [1.5, np.nan, 0.5, 2.5, np.nan]
+    dataset = ColumnarDataset(data)
+
+    page = dataset[1:3]
+    assert np.shares_memory(page.columns['id'], data)
+    assert page.to_records()[1] == {'id': 2, 'price': 0.5}
+    assert type(dataset[0]['id']) is int and type(dataset[0]['price']) is float
+    assert dataset.take([0, 3]).column_values('id') == [0, 3]
+    assert dataset.take(range(2, 4)).column_values('id') == [2, 3]
+
+    # NaN last in both directions, ties in the dataset order
+    assert dataset.argsort([('price', True)]) == [2, 0, 3, 1, 4]
+    assert dataset.argsort([('price', False)]) == [3, 0, 2, 1, 4]
+
+def test_columnar_tables_build_the_displayed_records_only():
+    from ..components._DataTable import ColumnSpec
+    from ..components.PaginatedDatatable import PaginatedDataTable
+
+    data = {'id': np.arange(1000), 'price': np.arange(1000) * 0.5}
+    table = PaginatedDataTable([ColumnSpec("ID", "id"), ColumnSpec("PRICE", "price")], data, rows_per_page=10)
+    assert table.visible_rows_only
+    assert isinstance(table.dataset, ColumnarDataset)
+
+    table.sort_by([(1, False)])
+    assert [table.get_cell_value(row, "ID") for row in table.get_visible_rows()] == list(range(999, 989, -1))
+    table.remove_row(table.get_visible_rows()[0])
+    assert len(table.dataset) == 999
+    assert table.get_cell_value(table.get_visible_rows()[0], "ID") == 998
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("EXPIRES", "expires"), ColumnSpec("TIME LEFT", "time_left")]
+
+def countdowns(table) -> list:
+    return [row.cells[2].content.value for row in table.get_visible_rows()]
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_row_expired_off_page_shows_its_expiration(visible_rows_only, frozen_time):
+    # row 25, on the third page, expires after a second, the others in an hour
+    records = [
+        {'id': n, 'expires': datetime.fromtimestamp(frozen_time + (1 if n == 25 else 3600)).isoformat(), 'time_left': 'raw'}
+        for n in range(30)
+    ]
+    table = PaginatedDataTable(COLUMNS, records, rows_per_page=10, visible_rows_only=visible_rows_only)
+    table.update_row_expiration("EXPIRES", "TIME LEFT")
+
+    table.watch_expiration("EXPIRES", "TIME LEFT", now=frozen_time + 2)
+    table.set_page(page=3)
+
+    assert countdowns(table) == ['01:00:00'] * 5 + ['00:00:00'] + ['01:00:00'] * 4
+    table.stop_row_expiration()
@@ -0,0 +1,74 @@
+import pytest
+
+from ..components._DataTable import ColumnSpec, ToggleFilterSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("SIDE", "side")]
+
+def make_records(count: int) -> list[dict]:
+    return [{'id': n, 'side': "BUY" if n % 2 else "SELL"} for n in range(count)]
+
+def displayed_ids(table) -> list[int]:
+    return [table.get_record_by_uuid(table.get_row_id(row))['id'] for row in table.get_visible_rows()]
+
+class CountingPredicate():
+    """Filter predicate counting its calls"""
+
+    def __init__(self, predicate) -> None:
+        self.predicate = predicate
+        self.calls = 0
+
+    def __call__(self, record) -> bool:
+        self.calls += 1
+        return self.predicate(record)
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_filter_modes(visible_rows_only):
+    buy = ToggleFilterSpec("buy", lambda record: record['side'] == "BUY", active=True)
+    small = ToggleFilterSpec("small", lambda record: record['id'] < 5)
+    table = PaginatedDataTable(COLUMNS, make_records(12), rows_per_page=20, filters=[buy, small], visible_rows_only=visible_rows_only)
+    assert displayed_ids(table) == [1, 3, 5, 7, 9, 11]
+
+    table.set_filter("small", True)
+    assert displayed_ids(table) == [1, 3]
+
+    table.set_filter_mode('OR')
+    assert displayed_ids(table) == [0, 1, 2, 3, 4, 5, 7, 9, 11]
+
+    table.set_filter("buy", False)
+    table.set_filter("small", False)
+    assert displayed_ids(table) == list(range(12))
+
+    with pytest.raises(ValueError):
+        table.set_filter_mode('XOR')
+
+def test_predicates_run_once_per_record():
+    buy = CountingPredicate(lambda record: record['side'] == "BUY")
+    small = CountingPredicate(lambda record: record['id'] < 5)
+    table = PaginatedDataTable(COLUMNS, make_records(10), rows_per_page=5, filters=[ToggleFilterSpec("buy", buy), ToggleFilterSpec("small", small)])
+
+    # toggling and paging only combine the cached masks
+    for _ in range(3):
+        table.set_filter("buy", True)
+        table.set_filter("small", True)
+        table.set_filter("buy", False)
+    table.next_page(None)
+    assert (buy.calls, small.calls) == (10, 10)
+
+    # appended records are evaluated, the others are not again
+    table.append_rows(make_records(12)[10:])
+    with table.expiration_lock:
+        table.flush_appended_rows()
+    table.set_filter("buy", True)
+    assert displayed_ids(table) == [1, 3]
+    assert (buy.calls, small.calls) == (12, 12)
+
+def test_removed_records_leave_the_masks():
+    buy = ToggleFilterSpec("buy", lambda record: record['side'] == "BUY", active=True)
+    table = PaginatedDataTable(COLUMNS, make_records(10), rows_per_page=20, filters=[buy])
+
+    table.remove_row(table.get_visible_rows()[1])
+
+    assert displayed_ids(table) == [1, 5, 7, 9]
+    table.set_filter("buy", False)
+    assert displayed_ids(table) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
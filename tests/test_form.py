@@ -0,0 +1,68 @@
+from ..components.Form import Form, ItemSpec, ValueSpec
+
+def make_form() -> Form:
+    return Form([
+        ItemSpec("ID", 1),
+        ItemSpec("SYMBOL", "AAPL"),
+        ItemSpec("QUANTITY", ValueSpec(100, width=120)),
+        ItemSpec("NOTE", ValueSpec(None)),
+        # a key may be shown by several items
+        ItemSpec("SYMBOL", "AAPL", visible=False),
+    ])
+
+def test_update_values_changes_only_what_differs():
+    form = make_form()
+    assert form.get_values() == {'ID': "1", 'SYMBOL': "AAPL", 'QUANTITY': 100, 'NOTE': ""}
+
+    assert form.update_values({'ID': 1, 'SYMBOL': "AAPL", 'QUANTITY': 100}) == 0
+    assert form.update_values({'SYMBOL': "MSFT", 'QUANTITY': 250, 'UNKNOWN': 0}) == 3
+
+    assert form.get_values() == {'ID': "1", 'SYMBOL': "MSFT", 'QUANTITY': "250", 'NOTE': ""}
+    assert form.get_value_control(4).value == "MSFT"
+
+def test_update_values_of_text_fields():
+    form = make_form()
+    field = form.get_value_control(2)
+
+    assert form.update_values({'QUANTITY': ValueSpec(5, disabled=True), 'NOTE': "urgent"}) == 2
+    assert (field.value, field.disabled, field.width) == ("5", True, Form.DEFAULT_FIELD_WIDTH)
+
+    # None empties a TextField, the kind of an item never changes
+    assert form.update_values({'NOTE': None, 'ID': ValueSpec(2)}) == 2
+    assert form.get_value_by_key('NOTE') == ""
+    assert form.get_value_by_key('ID') == "2"
+
+def test_update_value_by_key_sets_texts_only():
+    form = make_form()
+
+    form.update_value_by_key('SYMBOL', "GOOGL")
+    form.update_value_by_key('QUANTITY', 1)
+
+    assert form.get_value_by_key('SYMBOL') == "GOOGL"
+    assert form.get_value_control(4).value == "GOOGL"
+    assert form.get_value_by_key('QUANTITY') == 100
+
+class Trade():
+    def __init__(self, symbol: str, quantity: int) -> None:
+        self.SYMBOL = symbol
+        self.QUANTITY = quantity
+
+def test_bind_reuses_the_controls():
+    form = make_form()
+    controls = [form.get_value_control(idx) for idx in range(len(form.items))]
+
+    # a dict, keys missing from it keep their value
+    assert form.bind({'ID': 2, 'SYMBOL': "MSFT"}) == 3
+    assert form.get_values() == {'ID': "2", 'SYMBOL': "MSFT", 'QUANTITY': 100, 'NOTE': ""}
+
+    # an object with an attribute per key
+    assert form.bind(Trade("GOOGL", 100)) == 2
+    assert form.get_values()['SYMBOL'] == "GOOGL"
+
+    # a list of ItemSpec, with the visibility and the disabled flag of the items
+    assert form.bind([ItemSpec("ID", 3, visible=False), ItemSpec("QUANTITY", ValueSpec(7, disabled=True))]) == 3
+    assert form.form_entries.controls[0].controls[0].visible is False
+    assert form.get_value_control(2).disabled is True
+
+    assert form.bind(Trade("GOOGL", 7)) == 0
+    assert all(form.get_value_control(idx) is control for idx, control in enumerate(controls))
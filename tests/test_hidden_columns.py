@@ -0,0 +1,37 @@
+import logging
+
+import flet as ft
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+
+def make_table(columns: list[ColumnSpec]):
+    records = [{'id': n, 'name': f"name {n}", 'note': f"note {n}"} for n in range(3)]
+    return PaginatedDataTable(columns, records, rows_per_page=10)
+
+@pytest.mark.parametrize("hidden_first, warned", [(True, True), (False, False)])
+def test_positional_callbacks_are_warned_of_hidden_columns(hidden_first, warned, caplog):
+    hidden = ColumnSpec("NOTE", "note", visible=False)
+    visible = [ColumnSpec("ID", "id"), ColumnSpec("NAME", "name")]
+    table = make_table([hidden] + visible if hidden_first else visible + [hidden])
+
+    with caplog.at_level(logging.WARNING):
+        table.format_column("NAME", None, callback=lambda row: row.cells[0])
+        table.update_row_expiration("ID", "NAME", callback=lambda row: None)
+        table.stop_row_expiration()
+
+    messages = [r.getMessage() for r in caplog.records if "get_cell" in r.getMessage()]
+    assert len(messages) == (2 if warned else 0)
+
+def test_callbacks_read_cells_by_column_index_or_name():
+    table = make_table([ColumnSpec("NOTE", "note", visible=False), ColumnSpec("ID", "id"), ColumnSpec("NAME", "name")])
+
+    table.format_column("NAME", None, callback=lambda row: ft.DataCell(ft.Text(f"{table.get_cell_value(row, 0)} / {table.get_cell_value(row, 'ID')}")))
+
+    assert [table.get_cell(row, 2).content.value for row in table.get_visible_rows()] == [f"note {n} / {n}" for n in range(3)]
+    row = table.get_visible_rows()[1]
+    assert table.get_cell(row, "NAME") is table.get_cell(row, 2)
+    assert table.get_cell(row, "NOTE") is None and table.get_cell_value(row, "NOTE") == "note 1"
+    assert table.get_cell_value(row, "UNKNOWN") is None
+    assert table.get_record_by_uuid(table.get_row_id(row))['id'] == 1
@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import threading
+import time
+from itertools import count
+
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.LazyPaginatedDatatable import LazyPaginatedDataTable
+
+COLUMNS = [ColumnSpec("ID", "id")]
+ROWS_PER_PAGE = 10
+
+class Source():
+    """Data source whose calls for a page can be held after the page has been read"""
+
+    def __init__(self, size: int) -> None:
+        self.records = [{'id': n} for n in range(size)]
+        self.held_skip = None
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def hold(self, skip: int):
+        self.held_skip = skip
+
+    def fetch(self, skip: int, limit: int):
+        page = self.records[skip:skip + limit]
+        if skip == self.held_skip:
+            self.held_skip = None
+            self.reading.set()
+            self.release.wait(5)
+        return page
+
+def make_table(source: Source, **kwargs) -> LazyPaginatedDataTable:
+    return LazyPaginatedDataTable(
+        COLUMNS, source.fetch(0, ROWS_PER_PAGE), lazy_callback=source.fetch, rows_per_page=ROWS_PER_PAGE,
+        count=len(source.records), **kwargs
+    )
+
+def page_ids(table: LazyPaginatedDataTable) -> list:
+    return [record['id'] for record in table.dataset]
+
+def test_invalidation_drops_running_prefetch():
+    source = Source(100)
+    table = make_table(source, page_cache_size=10, prefetch_pages=1)
+
+    # the prefetch of page 3 reads the records, then the data source changes before it returns
+    source.hold(2 * ROWS_PER_PAGE)
+    table.next_page(None)
+    assert source.reading.wait(5)
+    stale = table.prefetch_futures[table.get_page_key(3)]
+
+    del source.records[:ROWS_PER_PAGE]
+    table.redraw(source.fetch(0, ROWS_PER_PAGE), count=len(source.records))
+    assert table.prefetch_futures == {}
+    source.release.set()
+    stale.result(5)
+
+    assert table.get_page_key(3) not in table.page_cache
+    table.goto_page(3)
+    assert page_ids(table) == list(range(30, 40))
+
+def test_pages_cached_before_invalidation_are_fetched_again():
+    source = Source(100)
+    table = make_table(source, page_cache_size=10)
+    table.next_page(None)
+    assert page_ids(table) == list(range(10, 20))
+
+    del source.records[:5]
+    table.invalidate_cache()
+    table.prev_page(None)
+    table.next_page(None)
+    assert page_ids(table) == list(range(15, 25))
+
+class CursorSource(Source):
+    """Keyset pagination over the ids of the records"""
+
+    def fetch_after(self, cursor, limit: int, direction: str):
+        ids = [record['id'] for record in self.records]
+        if direction == 'next':
+            start = 0 if cursor is None else next((idx for idx, n in enumerate(ids) if n > cursor), len(ids))
+        else:
+            end = len(ids) if cursor is None else next((idx for idx, n in enumerate(ids) if n >= cursor), len(ids))
+            start = max(0, end - limit)
+        page = self.fetch(start, limit)
+        prev_cursor = page[0]['id'] if page and start > 0 else None
+        next_cursor = page[-1]['id'] if page and start + limit < len(ids) else None
+        return page, prev_cursor, next_cursor
+
+def test_stale_prefetch_keeps_no_cursor_checkpoint():
+    source = CursorSource(100)
+    table = LazyPaginatedDataTable(
+        COLUMNS, source.fetch(0, ROWS_PER_PAGE), lazy_callback=source.fetch_after, rows_per_page=ROWS_PER_PAGE,
+        count=len(source.records), page_cache_size=10, prefetch_pages=1, pagination='cursor'
+    )
+    table.goto_page(1)
+
+    source.hold(2 * ROWS_PER_PAGE)
+    table.next_page(None)
+    assert source.reading.wait(5)
+    stale = table.prefetch_futures[table.get_page_key(3)]
+
+    # only the checkpoint of the current page survives the invalidation
+    table.invalidate_cache()
+    source.release.set()
+    stale.result(5)
+    assert [page for _, page in table.cursor_checkpoints] == [2]
+
+    table.next_page(None)
+    assert page_ids(table) == list(range(20, 30))
+
+def test_query_change_keeps_no_cursor_checkpoint():
+    source = CursorSource(100)
+    table = LazyPaginatedDataTable(
+        COLUMNS, source.fetch(0, ROWS_PER_PAGE), lazy_callback=source.fetch_after, rows_per_page=ROWS_PER_PAGE,
+        count=len(source.records), prefetch_pages=0, pagination='cursor'
+    )
+    table.next_page(None)
+    table.next_page(None)
+
+    # a plain invalidation keeps the cursors of the page displayed, a new query keeps none of the previous one
+    table.invalidate_cache()
+    assert list(table.cursor_checkpoints) == [(table.get_query_state(), 3)]
+    table.set_sort(0, False)
+    assert list(table.cursor_checkpoints) == [(table.get_query_state(), 1)]
+    table.next_page(None)
+    assert page_ids(table) == list(range(10, 20))
+
+def test_cursors_written_during_invalidations(fast_switching):
+    source = CursorSource(100)
+    table = LazyPaginatedDataTable(
+        COLUMNS, source.fetch(0, ROWS_PER_PAGE), lazy_callback=source.fetch_after, rows_per_page=ROWS_PER_PAGE,
+        count=len(source.records), pagination='cursor'
+    )
+    stop = threading.Event()
+
+    def write_cursors():
+        # as the prefetch threads do, with the pages of the current generation
+        pages = count(1)
+        while not stop.is_set():
+            table.unpack_result(([], None, None, 100), (next(pages) * ROWS_PER_PAGE, ROWS_PER_PAGE, table.get_query_state()), (None, ROWS_PER_PAGE, 'next'))
+
+    writer = threading.Thread(target=write_cursors)
+    writer.start()
+    try:
+        for _ in range(150):
+            # the writer adds some hundred cursors between two invalidations
+            time.sleep(0.01)
+            table.invalidate_cache()
+    finally:
+        stop.set()
+        writer.join()
+
+def test_append_rows_is_not_supported():
+    source = Source(20)
+    table = make_table(source)
+
+    with pytest.raises(TypeError, match="data source"):
+        table.append_rows([{'id': 20}])
+    assert page_ids(table) == list(range(ROWS_PER_PAGE))
+
+def test_async_page_load_of_a_table_not_on_a_page(monkeypatch, caplog):
+    source = Source(100)
+
+    async def fetch_async(skip: int, limit: int):
+        return source.fetch(skip, limit)
+
+    async def navigate():
+        table = LazyPaginatedDataTable(
+            COLUMNS, source.fetch(0, ROWS_PER_PAGE), lazy_callback=fetch_async, rows_per_page=ROWS_PER_PAGE,
+            count=len(source.records), page_cache_size=10, prefetch_pages=1
+        )
+        table.goto_page(2)
+        await table.page_load_task
+        # the updates of the table, not added to a page, are skipped and the neighbours are still prefetched
+        assert page_ids(table) == list(range(10, 20))
+        assert table.get_page_key(3) in table.page_cache or table.get_page_key(3) in table.prefetch_futures
+        while table.tasks or table.prefetch_futures:
+            await asyncio.sleep(0.01)
+
+    monkeypatch.setattr(LazyPaginatedDataTable, 'DEBOUNCE_SECONDS', 0)
+    with caplog.at_level(logging.ERROR):
+        asyncio.run(navigate())
+    assert [r.getMessage() for r in caplog.records] == []
+
+def test_cursor_navigation():
+    source = CursorSource(95)
+    calls = []
+
+    def fetch_after(cursor, limit: int, direction: str):
+        calls.append((cursor, limit, direction))
+        return source.fetch_after(cursor, limit, direction)
+
+    table = LazyPaginatedDataTable(
+        COLUMNS, source.fetch(0, ROWS_PER_PAGE), lazy_callback=fetch_after, rows_per_page=ROWS_PER_PAGE,
+        count=len(source.records), page_cache_size=10, prefetch_pages=0, pagination='cursor'
+    )
+
+    # no cursor leads to page 4 yet, the pages before it are walked from the first one
+    table.goto_page(4)
+    assert page_ids(table) == list(range(30, 40))
+    assert calls == [(None, 10, 'next'), (9, 10, 'next'), (19, 10, 'next'), (29, 10, 'next')]
+
+    # the last page, holding the remainder, is read from the end, and the one before it from its cursor
+    calls.clear()
+    table.goto_page(10)
+    assert page_ids(table) == list(range(90, 95))
+    table.prev_page(None)
+    assert page_ids(table) == list(range(80, 90))
+    assert calls == [(None, 5, 'prev'), (90, 10, 'prev')]
+
+    # cached pages are not fetched again
+    calls.clear()
+    table.goto_page(3)
+    assert page_ids(table) == list(range(20, 30))
+    assert calls == []
@@ -0,0 +1,78 @@
+from fake_page import FakePage
+
+from ..components._DataTable import ColumnSpec
+from ..components.LazyPaginatedDatatable import LazyPaginatedDataTable
+from ..components.PaginatedDatatable import PaginatedDataTable
+from ..utils.TableMetrics import Histogram, PrometheusTextSink, TableMetrics
+from ..utils.UpdateScheduler import UpdateScheduler
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("QUANTITY", "quantity")]
+
+def make_records(count: int) -> list[dict]:
+    return [{'id': n, 'quantity': n * 1000} for n in range(count)]
+
+class ListSink():
+    def __init__(self) -> None:
+        self.snapshots = []
+
+    def emit(self, snapshot: dict):
+        self.snapshots.append(snapshot)
+
+def test_table_metrics_count_the_hot_paths():
+    page = FakePage()
+    table = PaginatedDataTable(COLUMNS, make_records(30), rows_per_page=10, visible_rows_only=True)
+    page.add(table)
+    sink = ListSink()
+    metrics = table.enable_metrics([sink])
+
+    table.next_page(None)
+    table.format_column("QUANTITY", "COMMAS")
+    UpdateScheduler.shared().flush_now()
+
+    snapshot = metrics.publish()
+    assert sink.snapshots == [snapshot]
+    assert snapshot['table'] == table.table_uuid
+    assert snapshot['counters']['rows_built'] == 10
+    assert snapshot['counters']['controls_built'] == 10 * (1 + 2 * 2)
+    assert snapshot['timings']['format']['count'] == 1
+    assert snapshot['counters']['updates'] >= 1 and snapshot['timings']['update']['count'] == snapshot['counters']['updates']
+    assert snapshot['gauges'] == {'effects_queue_depth': 0}
+
+    table.disable_metrics()
+    table.next_page(None)
+    assert metrics.snapshot()['counters']['rows_built'] == 10
+
+def test_lazy_callback_latencies_are_histograms():
+    records = make_records(30)
+    table = LazyPaginatedDataTable(
+        COLUMNS, records[:10], lazy_callback=lambda skip, limit: records[skip:skip + limit], rows_per_page=10,
+        count=len(records), prefetch_pages=0
+    )
+    metrics = table.enable_metrics()
+
+    table.next_page(None)
+    table.next_page(None)
+
+    histogram = metrics.snapshot()['histograms']['lazy_callback']
+    assert histogram['count'] == 2
+    assert histogram['buckets']['+Inf'] == 2
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1, float('inf')))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+
+    assert histogram.snapshot() == {'count': 4, 'sum': 2.65, 'max': 2, 'buckets': {'0.1': 2, '1': 3, '+Inf': 4}}
+
+def test_prometheus_sink_writes_every_table(tmp_path):
+    path = tmp_path / "tables.prom"
+    sink = PrometheusTextSink(str(path))
+    for name in ("a", "b"):
+        metrics = TableMetrics(name, [sink])
+        metrics.count('rows_built', 3)
+        metrics.publish()
+
+    text = path.read_text()
+    assert text.count("# TYPE flet_table_rows_built_total counter") == 1
+    assert 'flet_table_rows_built_total{table="a"} 3' in text
+    assert 'flet_table_rows_built_total{table="b"} 3' in text
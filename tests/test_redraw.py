@@ -0,0 +1,39 @@
+from datetime import datetime
+
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("EXPIRES", "expires"), ColumnSpec("TIME LEFT", "time_left")]
+
+def make_records(count: int, now: float) -> list[dict]:
+    return [{'id': n, 'expires': datetime.fromtimestamp(now + 3600).isoformat(), 'time_left': 'raw'} for n in range(count)]
+
+def countdowns(table) -> list:
+    return [row.cells[2].content.value for row in table.get_visible_rows()]
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_identical_redraw_with_countdowns_updates_nothing(visible_rows_only, frozen_time):
+    table = PaginatedDataTable(COLUMNS, make_records(5, frozen_time), rows_per_page=10, visible_rows_only=visible_rows_only)
+    table.update_row_expiration("EXPIRES", "TIME LEFT")
+    assert countdowns(table) == ['01:00:00'] * 5
+
+    stats = table.redraw(make_records(5, frozen_time), key='id')
+
+    assert stats == {'rows_inserted': 0, 'rows_removed': 0, 'rows_updated': 0, 'cells_updated': 0}
+    assert countdowns(table) == ['01:00:00'] * 5
+    table.stop_row_expiration()
+
+def test_identical_redraw_of_columnar_nan_updates_nothing():
+    np = pytest.importorskip("numpy")
+    columns = [ColumnSpec("ID", "id"), ColumnSpec("PRICE", "price")]
+    data = {'id': np.arange(4), 'price': np.array([1.5, np.nan, np.nan, 2.0])}
+    table = PaginatedDataTable(columns, data, rows_per_page=10)
+
+    stats = table.redraw({name: column.copy() for name, column in data.items()}, key='id')
+    assert stats == {'rows_inserted': 0, 'rows_removed': 0, 'rows_updated': 0, 'cells_updated': 0}
+
+    data['price'][1] = 3.0
+    stats = table.redraw(data, key='id')
+    assert stats['rows_updated'] == 1 and stats['cells_updated'] == 1
@@ -0,0 +1,31 @@
+from array import array
+
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("NAME", "name")]
+
+def make_records(count: int) -> list[dict]:
+    return [{'id': n, 'name': f"name {n}"} for n in range(count)]
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_row_ids_are_numbers_formatted_for_built_rows(visible_rows_only):
+    table = PaginatedDataTable(COLUMNS, make_records(100), rows_per_page=10, visible_rows_only=visible_rows_only)
+    assert isinstance(table.row_ids, array)
+
+    rows = table.get_visible_rows()
+    assert all(isinstance(row.data, str) and row.data.startswith(table.table_uuid) for row in rows)
+    assert [table.get_record_by_uuid(row.data)['id'] for row in rows] == list(range(10))
+
+    table.remove_row(rows[0])
+    assert table.get_record_by_uuid(rows[0].data) is None
+    assert table.get_record_by_uuid(rows[5].data)['id'] == 5
+
+def test_ids_of_other_tables_are_not_found():
+    table = PaginatedDataTable(COLUMNS, make_records(10), rows_per_page=10)
+    other = PaginatedDataTable(COLUMNS, make_records(10), rows_per_page=10)
+
+    assert table.get_record_by_uuid(other.get_visible_rows()[0].data) is None
+    assert table.get_record_by_uuid("not a row id") is None
@@ -0,0 +1,62 @@
+import time
+
+import flet as ft
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+from ..components.VirtualDataTable import VirtualDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("NAME", "name")]
+
+def make_records(count: int) -> list[dict]:
+    return [{'id': n, 'name': f"name {n}"} for n in range(count)]
+
+def record_id(table, row: ft.DataRow) -> int:
+    return table.get_record_by_uuid(table.get_row_id(row))['id']
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    """Waits for the frames of the EffectsScheduler to apply"""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_rows_are_numbered_by_dataset_position(visible_rows_only):
+    table = PaginatedDataTable(COLUMNS, make_records(30), rows_per_page=10, visible_rows_only=visible_rows_only)
+
+    assert record_id(table, table.get_row_by_number(25)) == 25
+    assert record_id(table, table.get_row_by_number(-1)) == 29
+    assert table.get_row_by_number(30) is None
+    table.set_page(page=2)
+    assert record_id(table, table.get_row_by_number(3)) == 3
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_format_of_a_row_off_the_page(visible_rows_only):
+    table = PaginatedDataTable(COLUMNS, make_records(30), rows_per_page=10, visible_rows_only=visible_rows_only)
+
+    table.format_row(25, "red")
+    table.format_row(25, "blue", "NAME")
+    table.set_page(page=3)
+
+    row = table.get_visible_rows()[5]
+    assert record_id(table, row) == 25
+    assert wait_for(lambda: row.color == ft.colors.with_opacity(0.3, "red") and table.get_cell(row, 1).content.color == "blue")
+    assert [r.color for r in table.get_visible_rows()].count(None) == 9
+
+def test_format_follows_the_records_of_recycled_rows():
+    table = VirtualDataTable(COLUMNS, make_records(100), viewport_rows=10, overscan=0)
+
+    table.format_row(50, "red")
+    table.scroll_to(45)
+    assert wait_for(lambda: table.get_visible_rows()[5].color == ft.colors.with_opacity(0.3, "red"))
+    assert record_id(table, table.get_visible_rows()[5]) == 50
+
+    # the rows are recycled for the first records
+    table.scroll_to(0)
+    assert [r.color for r in table.get_visible_rows()] == [None] * 10
+    table.scroll_to(45)
+    assert table.get_visible_rows()[5].color == ft.colors.with_opacity(0.3, "red")
@@ -0,0 +1,72 @@
+import pytest
+
+from ..components._DataTable import ColumnSpec, ToggleFilterSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+from ..utils.SearchIndex import SearchIndex
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("SYMBOL", "symbol"), ColumnSpec("TRADER", "trader", visible=False)]
+SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "META"]
+
+def make_records(start: int, count: int) -> list[dict]:
+    return [{'id': n, 'symbol': SYMBOLS[n % 5], 'trader': "alice"} for n in range(start, start + count)]
+
+def displayed_ids(table) -> list[int]:
+    return [table.get_record_by_uuid(table.get_row_id(row))['id'] for row in table.get_visible_rows()]
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+def test_search_by_substring_and_prefix(visible_rows_only):
+    table = PaginatedDataTable(COLUMNS, make_records(0, 10), rows_per_page=20, searchable=True, visible_rows_only=visible_rows_only)
+
+    stats = table.search("oog")
+    assert displayed_ids(table) == [2, 7]
+    assert stats['query'] == "oog" and stats['matches'] == 2
+
+    table.search("oog", prefix=True)
+    assert displayed_ids(table) == []
+    table.search("goo", prefix=True)
+    assert displayed_ids(table) == [2, 7]
+
+    # hidden columns are not searched, an empty query displays all the rows
+    table.search("alice")
+    assert displayed_ids(table) == []
+    table.search("  ")
+    assert displayed_ids(table) == list(range(10))
+
+def test_search_follows_the_changes_of_the_dataset():
+    table = PaginatedDataTable(COLUMNS, make_records(0, 10), rows_per_page=20, searchable=True)
+    table.search("msft")
+    assert displayed_ids(table) == [1, 6]
+
+    table.append_rows(make_records(10, 2))
+    with table.expiration_lock:
+        table.flush_appended_rows()
+    table.remove_row(table.get_visible_rows()[0])
+    table.search("msft")
+    assert displayed_ids(table) == [6, 11]
+
+    # the search looks into the formatted values
+    table.format_column("ID", "COMMAS")
+    table.search("1")
+    assert displayed_ids(table) == [10, 11]
+
+def test_search_and_filters_combine():
+    even = ToggleFilterSpec("even", lambda record: record['id'] % 2 == 0, active=True)
+    table = PaginatedDataTable(COLUMNS, make_records(0, 20), rows_per_page=20, searchable=True, filters=[even])
+
+    table.search("a")
+    assert displayed_ids(table) == [0, 4, 8, 10, 14, 18]
+    table.sort_by([(0, False)])
+    assert displayed_ids(table) == [18, 14, 10, 8, 4, 0]
+
+def test_index_replaces_and_removes_rows():
+    index = SearchIndex()
+    index.add(1, "Apple Inc")
+    index.add(2, "Pineapple Co")
+    assert index.search("apple") == {1, 2}
+    assert index.search("app", prefix=True) == {1}
+
+    index.add(1, "Alphabet Inc")
+    index.remove(2)
+    assert index.search("apple") == set()
+    assert index.search("inc") == {1}
+    assert len(index) == 1
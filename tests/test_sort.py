@@ -0,0 +1,55 @@
+import pytest
+
+from ..components._DataTable import ColumnSpec
+from ..components.PaginatedDatatable import PaginatedDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("DESK", "desk"), ColumnSpec("PRICE", "price")]
+RECORDS = [
+    {'id': 0, 'desk': "b", 'price': 2.5},
+    {'id': 1, 'desk': "a", 'price': None},
+    {'id': 2, 'desk': "b", 'price': 1.0},
+    {'id': 3, 'desk': "a", 'price': 2.5},
+    {'id': 4, 'desk': None, 'price': 3.0},
+    {'id': 5, 'desk': "a", 'price': 1.0},
+]
+
+def displayed_ids(table) -> list[int]:
+    return [table.get_record_by_uuid(table.get_row_id(row))['id'] for row in table.get_visible_rows()]
+
+@pytest.mark.parametrize("visible_rows_only", [False, True])
+@pytest.mark.parametrize("sort_spec, expected", [
+    ([(2, True)], [2, 5, 0, 3, 4, 1]),
+    # missing values stay last in both directions
+    ([(2, False)], [4, 0, 3, 2, 5, 1]),
+    # ties of the first column are ordered by the next one, then by the dataset order
+    ([(1, True), (2, False)], [3, 5, 1, 0, 2, 4]),
+    ([(1, False), (0, True)], [0, 2, 1, 3, 5, 4]),
+])
+def test_multi_column_sort(visible_rows_only, sort_spec, expected):
+    table = PaginatedDataTable(COLUMNS, RECORDS, rows_per_page=10, visible_rows_only=visible_rows_only)
+
+    table.sort_by(sort_spec)
+    assert displayed_ids(table) == expected
+
+    table.sort_by([])
+    assert displayed_ids(table) == list(range(6))
+
+def test_columns_sorted_before_break_the_ties():
+    table = PaginatedDataTable(COLUMNS, RECORDS, rows_per_page=10)
+
+    table.sort_by_column(2, True)
+    table.sort_by_column(1, True)
+
+    assert table.sort_spec == ((1, True), (2, True))
+    assert displayed_ids(table) == [5, 3, 1, 2, 0, 4]
+
+def test_sorting_reorders_the_built_rows():
+    table = PaginatedDataTable(COLUMNS, RECORDS, rows_per_page=3)
+    rows = {table.get_row_id(row): row for row in table.get_rows()}
+
+    table.sort_by([(0, False)])
+
+    assert displayed_ids(table) == [5, 4, 3]
+    assert all(rows[table.get_row_id(row)] is row for row in table.get_visible_rows())
+    table.next_page(None)
+    assert displayed_ids(table) == [2, 1, 0]
@@ -0,0 +1,82 @@
+import logging
+import threading
+
+from fake_page import FakePage
+
+from ..components._DataTable import ColumnSpec
+from ..components.BasicDataTable import BasicDataTable
+from ..utils.UpdateScheduler import UpdateScheduler
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("NAME", "name")]
+
+def make_records(start: int, count: int) -> list[dict]:
+    return [{'id': n, 'name': f"name {n}"} for n in range(start, start + count)]
+
+class ManualUpdateScheduler(UpdateScheduler):
+    """Update scheduler without a thread, flushed only by flush_now"""
+
+    def _queue(self, dirty: dict):
+        with self.state:
+            self.dirty.update(dirty)
+            self.marked += len(dirty)
+
+def test_tables_changed_by_another_thread_are_sent_at_the_next_frame():
+    page = FakePage()
+    table = BasicDataTable(COLUMNS, make_records(0, 10))
+    page.add(table)
+    page.connection.reset()
+    scheduler = ManualUpdateScheduler()
+    scheduler.mark_dirty(table)
+
+    changing, done = threading.Event(), threading.Event()
+
+    def change_rows():
+        with table.update_lock:
+            changing.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=change_rows)
+    thread.start()
+    assert changing.wait(5)
+    scheduler.flush_now()
+    assert page.connection.updates == 0
+    assert scheduler.stats()['pending'] == 1
+
+    done.set()
+    thread.join()
+    scheduler.flush_now()
+    assert page.connection.updates == 1
+    assert scheduler.stats()['pending'] == 0
+
+def test_appends_while_updates_are_sent(fast_switching, caplog):
+    page = FakePage()
+    table = BasicDataTable(COLUMNS, make_records(0, 100), max_rows=300)
+    page.add(table)
+    scheduler = ManualUpdateScheduler()
+    stop = threading.Event()
+
+    def flush_updates():
+        while not stop.is_set():
+            scheduler.mark_dirty(table)
+            scheduler.flush_now()
+
+    flusher = threading.Thread(target=flush_updates)
+    flusher.start()
+    try:
+        with caplog.at_level(logging.ERROR):
+            for n in range(100, 2000, 50):
+                table.append_rows(make_records(n, 50))
+                with table.expiration_lock:
+                    table.flush_appended_rows()
+    finally:
+        stop.set()
+        flusher.join()
+
+    assert [r.getMessage() for r in caplog.records] == []
+    scheduler.mark_dirty(table)
+    # the flush scheduled by append_rows may still hold the table
+    while scheduler.stats()['pending']:
+        scheduler.flush_now()
+    # every row the client knows of is one the table displays
+    assert [row.uid is not None for row in table.get_rows()] == [True] * 300
+    assert [table.get_record_by_uuid(table.get_row_id(row))['id'] for row in table.get_rows()] == list(range(1700, 2000))
@@ -0,0 +1,72 @@
+from ..components._DataTable import ColumnSpec
+from ..components.VirtualDataTable import VirtualDataTable
+
+COLUMNS = [ColumnSpec("ID", "id"), ColumnSpec("NAME", "name")]
+
+def make_records(start: int, count: int, version: int = 0) -> list[dict]:
+    return [{'id': n, 'name': f"name {n} v{version}"} for n in range(start, start + count)]
+
+def displayed_ids(table) -> list[int]:
+    return [table.get_cell_value(row, "ID") for row in table.get_visible_rows()]
+
+def flush(table):
+    with table.expiration_lock:
+        table.flush_appended_rows()
+
+def test_scrolling_moves_the_viewport_by_whole_rows():
+    table = VirtualDataTable(COLUMNS, make_records(0, 1000), row_height=40, viewport_rows=10, overscan=5)
+    assert displayed_ids(table) == list(range(10))
+
+    table.scroll_by(39)
+    assert displayed_ids(table) == list(range(10))
+    table.scroll_by(1)
+    assert displayed_ids(table) == list(range(1, 11))
+
+    table.scroll_to(500)
+    assert displayed_ids(table) == list(range(500, 510))
+    assert table.v_count.value == "Rows 501-510 of 1000"
+
+    # the viewport stops at both ends of the dataset
+    table.scroll_by(10_000_000)
+    assert displayed_ids(table) == list(range(990, 1000))
+    table.scroll_by(-10_000_000)
+    assert displayed_ids(table) == list(range(10))
+
+def test_rows_are_recycled_within_the_overscan_window():
+    table = VirtualDataTable(COLUMNS, make_records(0, 100_000), viewport_rows=10, overscan=5)
+    metrics = table.enable_metrics()
+
+    for row in (3, 50_000, 50_004, 99_990, 0):
+        table.scroll_to(row)
+        assert len(table.window) <= 10 + 2 * 5
+
+    # DataRows are only built while the window grows to the viewport and the overscan on both sides, then reused
+    assert metrics.snapshot()['counters']['rows_built'] == 5
+    assert len(table.window) + len(table.free_rows) == 10 + 2 * 5
+
+def test_auto_follow_keeps_the_newest_rows_in_view():
+    table = VirtualDataTable(COLUMNS, make_records(0, 50), viewport_rows=10, overscan=2, max_rows=100, auto_follow=True)
+
+    table.scroll_to(40)
+    table.append_rows(make_records(50, 80))
+    flush(table)
+    assert displayed_ids(table) == list(range(120, 130))
+
+    # away from the last rows, the viewport keeps showing the same records while the oldest are evicted
+    table.scroll_to(50)
+    assert displayed_ids(table) == list(range(80, 90))
+    table.append_rows(make_records(130, 20))
+    flush(table)
+    assert displayed_ids(table) == list(range(80, 90))
+    assert table.num_rows == 100
+
+def test_keyed_redraw_keeps_the_position():
+    table = VirtualDataTable(COLUMNS, make_records(0, 100), viewport_rows=10, overscan=2)
+    table.scroll_to(40)
+
+    stats = table.redraw(make_records(0, 100, version=1), key='id')
+
+    # only the rows of the window are built, and patched
+    assert stats['rows_updated'] == len(table.window) == 10 + 2 * 2
+    assert displayed_ids(table) == list(range(40, 50))
+    assert table.get_cell_value(table.get_visible_rows()[0], "NAME") == "name 40 v1"
@@ -0,0 +1,193 @@
+import sys
+from collections.abc import Mapping
+from typing import Optional
+
+# numpy is only needed by columnar datasets, it is imported by the first one created
+np = None
+
+def import_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("numpy is required for columnar datasets")
+        np = numpy
+    return np
+
+class ColumnarDataset():
+    """
+    Sequence of records over columnar data: a NumPy structured array or a dict of column arrays.
+
+    The columns are kept as they are. Slicing returns views of them, and taking positions copies only the
+    positions taken, so a page costs the size of the page. Records are dicts built on access, only for the rows
+    that are actually read. Tables read whole columns with column_values instead of going through records.
+
+    The columns are views over buffers with room for more records, as a list over-allocates: appended records are
+    written after the last one and dropping the oldest records moves the start of the views, so appends with
+    evictions cost the records appended. The buffers are reallocated, twice as large as the records kept, only
+    once they are full.
+    """
+
+    # records the buffers have room for at least once they are reallocated
+    MIN_CAPACITY = 1024
+
+    def __init__(self, data) -> None:
+        """
+        :param data: a structured array, a dict of column name -> array (or list), or another ColumnarDataset
+        :raise ValueError: if the columns don't have the same length
+        """
+        import_numpy()
+        if isinstance(data, ColumnarDataset):
+            columns = dict(data.columns)
+        elif getattr(getattr(data, 'dtype', None), 'names', None):
+            # the fields of a structured array are views, nothing is copied
+            columns = {name: data[name] for name in data.dtype.names}
+        else:
+            columns = {name: np.asarray(values) for name, values in data.items()}
+
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns must have the same length, got {sorted(lengths)}")
+        self.set_columns(columns)
+
+    def set_columns(self, columns: dict):
+        """Sets columns of the same length, used as they are: they are the buffers until records are appended"""
+        self.columns = columns
+        self.buffers = columns
+        self.start = 0
+        self.length = len(next(iter(columns.values()))) if columns else 0
+
+    def capacity(self) -> int:
+        """Returns the number of records the buffers have room for after start"""
+        return len(next(iter(self.buffers.values()))) - self.start if self.buffers else 0
+
+    @staticmethod
+    def accepts(data) -> bool:
+        """Returns whether data is columnar: a ColumnarDataset, a structured array or a dict of arrays"""
+        if isinstance(data, ColumnarDataset):
+            return True
+        # arrays can only exist once numpy has been imported, checking doesn't import it
+        numpy = sys.modules.get('numpy')
+        if numpy is None:
+            return False
+        if isinstance(data, numpy.ndarray):
+            return data.dtype.names is not None
+        return isinstance(data, Mapping) and len(data) > 0 and all(isinstance(values, numpy.ndarray) for values in data.values())
+
+    @classmethod
+    def wrap(cls, data):
+        """Returns data as a ColumnarDataset if it is columnar, unchanged otherwise"""
+        if isinstance(data, cls) or not cls.accepts(data):
+            return data
+        return cls(data)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ColumnarDataset({name: column[key] for name, column in self.columns.items()})
+        if isinstance(key, (int, np.integer)):
+            return self.record(int(key))
+        return self.take(key)
+
+    def __iter__(self):
+        # records are converted in chunks, each column with a single tolist call
+        for start in range(0, self.length, 1024):
+            yield from self[start:start + 1024].to_records()
+
+    def record(self, pos: int) -> dict:
+        if pos < 0:
+            pos += self.length
+        if not 0 <= pos < self.length:
+            raise IndexError("ColumnarDataset index out of range")
+        record = {}
+        for name, column in self.columns.items():
+            value = column[pos]
+            # numpy scalars become the equivalent Python values, as with tolist
+            record[name] = value.item() if isinstance(value, np.generic) else value
+        return record
+
+    def take(self, positions) -> "ColumnarDataset":
+        """Returns the records at the given positions, contiguous positions as views"""
+        if isinstance(positions, range) and positions.step == 1:
+            return self[positions.start:positions.stop]
+        positions = np.asarray(positions, dtype=np.intp)
+        if len(positions) and positions[-1] - positions[0] == len(positions) - 1 and (len(positions) == 1 or (np.diff(positions) == 1).all()):
+            return self[int(positions[0]):int(positions[-1]) + 1]
+        return ColumnarDataset({name: column[positions] for name, column in self.columns.items()})
+
+    def column_values(self, name: str) -> list:
+        """Returns the values of a column as Python objects, None if there is no such column"""
+        column = self.columns.get(name)
+        return column.tolist() if column is not None else None
+
+    def argsort(self, sort_spec: list[tuple[str, bool]]) -> Optional[list[int]]:
+        """
+        Returns the positions ordered by the (column name, ascending) pairs with a stable sort, NaN last in both
+        directions. Returns None when a column is missing or not numeric, to be sorted with the typed sort keys.
+        """
+        keys = []
+        # lexsort sorts by its last key first
+        for name, ascending in reversed(sort_spec):
+            column = self.columns.get(name)
+            if column is None or column.ndim != 1 or column.dtype.kind not in 'biuf':
+                return None
+            if column.dtype.kind == 'f':
+                keys.append(column if ascending else -column)
+                keys.append(np.isnan(column))
+            else:
+                # ~ reverses integers without the overflow of negating the smallest one
+                keys.append(column if ascending else ~column)
+        return np.lexsort(keys).tolist() if keys else list(range(self.length))
+
+    def to_records(self) -> list[dict]:
+        names = list(self.columns)
+        return [dict(zip(names, values)) for values in zip(*(column.tolist() for column in self.columns.values()))]
+
+    def __delitem__(self, key):
+        if isinstance(key, slice) and key.start in (None, 0) and key.step in (None, 1) and key.stop is not None and key.stop >= 0:
+            # dropping the oldest records keeps a view of the others
+            count = min(key.stop, self.length)
+            self.start += count
+            self.length -= count
+            self.columns = {name: column[count:] for name, column in self.columns.items()}
+        else:
+            self.set_columns({name: np.delete(column, key) for name, column in self.columns.items()})
+
+    def compress(self, selectors: list[bool]):
+        """Keeps the records whose selector is true, in place"""
+        selectors = np.asarray(selectors, dtype=bool)
+        self.set_columns({name: column[selectors] for name, column in self.columns.items()})
+
+    def extend(self, records):
+        """Appends records (dicts, objects or columnar data), written into the room left in the buffers"""
+        records = ColumnarDataset.wrap(records)
+        count = len(records)
+        if count == 0:
+            return
+        if isinstance(records, ColumnarDataset):
+            new = {name: records.columns[name] for name in self.columns}
+        else:
+            new = {
+                name: np.asarray([record.get(name) if isinstance(record, Mapping) else getattr(record, name, None) for record in records])
+                for name in self.columns
+            }
+        # the columns take the type of the records appended when it is wider, as with np.concatenate
+        dtypes = {name: np.result_type(column, new[name]) for name, column in self.columns.items()}
+        if self.length + count > self.capacity() or any(dtypes[name] != column.dtype for name, column in self.columns.items()):
+            # the views handed out keep the previous buffers, which are never written again
+            capacity = max(2 * (self.length + count), self.MIN_CAPACITY)
+            buffers = {}
+            for name, column in self.columns.items():
+                buffers[name] = np.empty((capacity,) + column.shape[1:], dtype=dtypes[name])
+                buffers[name][:self.length] = column
+            self.buffers = buffers
+            self.start = 0
+
+        end = self.start + self.length
+        for name, buffer in self.buffers.items():
+            buffer[end:end + count] = new[name]
+        self.length += count
+        self.columns = {name: buffer[self.start:self.start + self.length] for name, buffer in self.buffers.items()}
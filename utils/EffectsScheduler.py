@@ -0,0 +1,128 @@
+import heapq
+import logging
+import math
+import time
+from itertools import count
+from threading import Thread, Condition, Lock
+
+from .UpdateScheduler import UpdateScheduler
+
+logger = logging.getLogger(__name__)
+
+class EffectsScheduler():
+    """
+    Process-wide scheduler of the visual effects on the rows of all the tables (highlights and formats).
+
+    Effects are queued as timed frames and the callers never wait for them. A single thread applies the frames
+    that are due, so highlights on different rows animate concurrently, and marks the tables touched by those
+    frames dirty in the UpdateScheduler, which sends them with the other pending updates of their page. Frames run
+    without holding the queue lock, so a long frame (e.g. flushing appended rows) doesn't block the callers.
+    """
+
+    FRAME_INTERVAL = 1 / 30
+
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def shared(cls) -> "EffectsScheduler":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        # (due, seq, table, function)
+        self.frames = []
+        self.seq = count()
+        self.state = Condition()
+        # id(row) -> (row, color the row had before its highlight, generation of the running highlight)
+        self.highlighted = {}
+        self.last_flush = 0
+        self.thread = None
+
+    def queue_depth(self, table=None) -> int:
+        """Returns the number of frames waiting to be applied, only those of table if given"""
+        if table is None:
+            return len(self.frames)
+        with self.state:
+            return sum(1 for _, _, frame_table, _ in self.frames if frame_table is table)
+
+    def schedule(self, table, function, delay: float = 0):
+        """Runs function (which changes controls of table) after delay seconds, then updates table"""
+        with self.state:
+            self._push(time.monotonic() + delay, table, function)
+            self.state.notify()
+
+    def highlight(self, table, row, frames: list[tuple[float, str]], duration: float):
+        """Animates the color of a row through frames, a list of (delay, color), restoring its color after duration.
+        Highlighting a row again restarts its animation"""
+        with self.state:
+            key = id(row)
+            generation = next(self.seq)
+            original = self.highlighted[key][1] if key in self.highlighted else row.color
+            self.highlighted[key] = (row, original, generation)
+
+            def set_color(color):
+                def frame():
+                    with self.state:
+                        if self.highlighted.get(key, (None, None, None))[2] == generation:
+                            row.color = color
+                return frame
+
+            def restore():
+                with self.state:
+                    if self.highlighted.get(key, (None, None, None))[2] == generation:
+                        row.color = self.highlighted.pop(key)[1]
+
+            start = time.monotonic()
+            for delay, color in frames:
+                self._push(start + delay, table, set_color(color))
+            self._push(start + duration, table, restore)
+            self.state.notify()
+
+    def set_row_color(self, table, row, color):
+        """Changes the color of a row; if the row is being highlighted the color is applied when the highlight ends"""
+        def frame():
+            key = id(row)
+            with self.state:
+                if key in self.highlighted:
+                    _row, _original, generation = self.highlighted[key]
+                    self.highlighted[key] = (row, color, generation)
+                else:
+                    row.color = color
+
+        self.schedule(table, frame)
+
+    def _push(self, due, table, function):
+        heapq.heappush(self.frames, (due, next(self.seq), table, function))
+        if self.thread is None:
+            self.thread = Thread(target=self.run, name="effects_scheduler", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            with self.state:
+                now = time.monotonic()
+                next_frame = self.frames[0][0] if self.frames else math.inf
+                # frames due before the next allowed flush are applied together
+                timeout = max(next_frame, self.last_flush + self.FRAME_INTERVAL) - now
+                if timeout > 0:
+                    self.state.wait(None if timeout == math.inf else timeout)
+                    continue
+
+                due = []
+                while self.frames and self.frames[0][0] <= now:
+                    _, _, table, function = heapq.heappop(self.frames)
+                    due.append((table, function))
+                self.last_flush = now
+
+            tables = {}
+            for table, function in due:
+                try:
+                    function()
+                except Exception as e:
+                    logger.error("Error in effects scheduler: %s", e)
+                tables[id(table)] = table
+
+            UpdateScheduler.shared().mark_dirty(*tables.values())
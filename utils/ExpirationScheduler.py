@@ -0,0 +1,119 @@
+import heapq
+import logging
+import math
+import time
+import weakref
+from itertools import count
+from threading import Thread, Condition, Lock
+
+logger = logging.getLogger(__name__)
+
+class ExpirationScheduler():
+    """
+    Process-wide scheduler of the row expirations of all the tables.
+
+    Each table parses its expiration values once into epoch deadlines and schedules them here. Deadlines are kept
+    in a single min-heap, so the thread sleeps until the next one is due instead of polling the tables. Once per
+    RENDER_INTERVAL the watched tables re-render the countdowns of the rows they are displaying.
+    """
+
+    RENDER_INTERVAL = 1
+
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def shared(cls) -> "ExpirationScheduler":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        # (deadline, seq, table_uuid, row_id); entries of rows removed or rescheduled are discarded by the tables
+        self.heap = []
+        self.seq = count()
+        self.tables = weakref.WeakValueDictionary()
+        self.state = Condition()
+        self.next_render = 0
+        self.thread = None
+
+    def watch(self, table):
+        """Registers a table, whose expire_rows and render_countdowns methods will be called from the scheduler thread"""
+        with self.state:
+            self.tables[table.table_uuid] = table
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name="expiration_scheduler", daemon=True)
+                self.thread.start()
+            self.state.notify()
+
+    def unwatch(self, table):
+        with self.state:
+            self.tables.pop(table.table_uuid, None)
+
+    def schedule(self, table, deadlines: list[tuple[str, float]]):
+        """Schedules the (row_id, deadline) pairs of a table"""
+        if not deadlines:
+            return
+        with self.state:
+            earliest = self.heap[0][0] if self.heap else math.inf
+            for row_id, deadline in deadlines:
+                heapq.heappush(self.heap, (deadline, next(self.seq), table.table_uuid, row_id))
+
+            live = sum(len(t.expiration_deadlines) for t in list(self.tables.values()))
+            if len(self.heap) > 2 * live + 1024:
+                self._compact()
+
+            if self.heap and self.heap[0][0] < earliest:
+                self.state.notify()
+
+    def _compact(self):
+        """Rebuilds the heap from the deadlines the tables still hold, dropping the stale entries"""
+        self.heap = [
+            (deadline, next(self.seq), table_uuid, row_id)
+            for table_uuid, table in list(self.tables.items())
+            for row_id, deadline in list(table.expiration_deadlines.items())
+        ]
+        heapq.heapify(self.heap)
+
+    def run(self):
+        while True:
+            with self.state:
+                if not self.tables:
+                    self.state.wait()
+                    continue
+
+                now = time.time()
+                next_deadline = self.heap[0][0] if self.heap else math.inf
+                timeout = min(self.next_render, next_deadline) - now
+                if timeout > 0:
+                    self.state.wait(timeout)
+                    continue
+
+                due = {}
+                while self.heap and self.heap[0][0] <= now:
+                    deadline, _, table_uuid, row_id = heapq.heappop(self.heap)
+                    due.setdefault(table_uuid, []).append((row_id, deadline))
+
+                render = now >= self.next_render
+                if render:
+                    # countdowns change on whole seconds
+                    self.next_render = math.floor(now) + self.RENDER_INTERVAL
+
+                tables = dict(self.tables)
+
+            # tables are called outside the lock, since their callbacks may schedule new expirations
+            for table_uuid, entries in due.items():
+                table = tables.get(table_uuid)
+                if table is not None:
+                    self._call(table.expire_rows, entries)
+
+            if render:
+                for table in tables.values():
+                    self._call(table.render_countdowns, now)
+
+    def _call(self, function, *args):
+        try:
+            function(*args)
+        except Exception as e:
+            logger.error("Error in expiration scheduler: %s", e)
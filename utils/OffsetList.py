@@ -0,0 +1,84 @@
+from itertools import islice
+
+class OffsetList():
+    """
+    List whose oldest items are dropped in amortized O(1), for the tables evicting their oldest rows (max_rows).
+
+    Deleting a prefix only moves the logical start index over the underlying list (or array); the dropped items
+    are released at once when they make up half of it, so each eviction doesn't shift all the rows kept. Other
+    changes than appends and prefix deletions release them first and apply to the underlying list.
+    """
+
+    # dropped items kept at most before they are released, whatever the size of the list
+    MIN_COMPACTION = 1024
+
+    def __init__(self, items=None) -> None:
+        self.items = items if items is not None else []
+        self.start = 0
+
+    @classmethod
+    def wrap(cls, items):
+        """Returns items as an OffsetList, without copying them"""
+        return items if isinstance(items, cls) else cls(items)
+
+    def __len__(self) -> int:
+        return len(self.items) - self.start
+
+    def __iter__(self):
+        return iter(self.items) if not self.start else islice(self.items, self.start, None)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return self.items[self.start + start:self.start + max(start, stop)]
+            return [self.items[self.start + pos] for pos in range(start, stop, step)]
+        return self.items[self.position(key)]
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            # the values may be computed from this list, e.g. compress(self, keep)
+            value = list(value)
+            self.compact()
+            self.items[key] = value
+        else:
+            self.items[self.position(key)] = value
+
+    def __delitem__(self, key):
+        if isinstance(key, slice) and key.start in (None, 0) and key.step in (None, 1):
+            self.start += key.indices(len(self))[1]
+            if self.start >= max(self.MIN_COMPACTION, len(self.items) // 2):
+                self.compact()
+        elif isinstance(key, slice):
+            self.compact()
+            del self.items[key]
+        else:
+            del self.items[self.position(key)]
+
+    def position(self, pos: int) -> int:
+        """Returns the index in the underlying list of a position"""
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError("OffsetList index out of range")
+        return self.start + pos
+
+    def append(self, item):
+        self.items.append(item)
+
+    def extend(self, items):
+        self.items.extend(items)
+
+    def compact(self):
+        """Releases the dropped items"""
+        if self.start:
+            del self.items[:self.start]
+            self.start = 0
+
+    def as_list(self):
+        """Returns the underlying list (or array) holding only the items kept"""
+        self.compact()
+        return self.items
+
+    def __repr__(self) -> str:
+        return f"OffsetList({list(self)!r})"
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+class PageCache():
+    """
+    Thread-safe LRU cache of the pages fetched by a lazy table, with an optional time to live.
+
+    Keys are (skip, limit, query state) tuples. Hits, misses and evictions are counted so that the size and the
+    time to live can be tuned.
+    """
+
+    def __init__(self, max_pages: int, ttl: float = None) -> None:
+        """
+        :param max_pages: number of pages kept, 0 disables the cache
+        :param ttl: seconds after which a page is fetched again, None to keep pages until they are evicted
+        """
+        self.max_pages = max_pages
+        self.ttl = ttl
+        self.pages = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+
+    def get(self, key):
+        """Returns the cached page for key, None on a miss"""
+        with self.lock:
+            entry = self.pages.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self.pages[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.pages.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def __contains__(self, key) -> bool:
+        with self.lock:
+            entry = self.pages.get(key)
+            return entry is not None and (self.ttl is None or time.monotonic() - entry[0] <= self.ttl)
+
+    def put(self, key, page: list, prefetched: bool = False):
+        if self.max_pages <= 0:
+            return
+        with self.lock:
+            self.pages[key] = (time.monotonic(), page)
+            self.pages.move_to_end(key)
+            if prefetched:
+                self.prefetched += 1
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Drops all the pages, or only those whose key satisfies predicate"""
+        with self.lock:
+            if predicate is None:
+                self.pages.clear()
+            else:
+                for key in [key for key in self.pages if predicate(key)]:
+                    del self.pages[key]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                'size': len(self.pages),
+                'max_pages': self.max_pages,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'prefetched': self.prefetched,
+            }
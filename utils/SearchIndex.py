@@ -0,0 +1,101 @@
+class SearchIndex():
+    """
+    Inverted index from the words of the text of each row to the ids of the rows containing them, with a trigram
+    index over the distinct words.
+
+    A query word is looked up in the trigram index to find the words containing it (or starting with it), whose
+    rows are then merged, so substring queries don't scan the text of every row. Rows are added, replaced and
+    removed one by one, so the index follows the changes of the dataset without being rebuilt.
+    """
+
+    NGRAM = 3
+
+    def __init__(self) -> None:
+        # row id -> casefolded text of the row
+        self.texts = {}
+        # word -> ids of the rows containing it
+        self.words = {}
+        # trigram -> words containing it
+        self.ngrams = {}
+
+    @classmethod
+    def get_ngrams(cls, word: str) -> set[str]:
+        return {word[i:i + cls.NGRAM] for i in range(len(word) - cls.NGRAM + 1)}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, row_id: int, text: str):
+        """Indexes the text of a row, replacing the text it had"""
+        text = text.casefold()
+        previous = self.texts.get(row_id)
+        if previous == text:
+            return
+        if previous is not None:
+            self.remove(row_id)
+        self.texts[row_id] = text
+        for word in set(text.split()):
+            rows = self.words.get(word)
+            if rows is None:
+                self.words[word] = {row_id}
+                for ngram in self.get_ngrams(word):
+                    self.ngrams.setdefault(ngram, set()).add(word)
+            else:
+                rows.add(row_id)
+
+    def remove(self, row_id: int):
+        text = self.texts.pop(row_id, None)
+        if text is None:
+            return
+        for word in set(text.split()):
+            rows = self.words.get(word)
+            if rows is None:
+                continue
+            rows.discard(row_id)
+            if not rows:
+                del self.words[word]
+                for ngram in self.get_ngrams(word):
+                    words = self.ngrams.get(ngram)
+                    if words is not None:
+                        words.discard(word)
+                        if not words:
+                            del self.ngrams[ngram]
+
+    def match_words(self, token: str, prefix: bool = False) -> list[str]:
+        """Returns the indexed words containing token, or starting with it when prefix is set"""
+        ngrams = self.get_ngrams(token)
+        if ngrams:
+            candidates = sorted((self.ngrams.get(ngram, set()) for ngram in ngrams), key=len)
+            candidates = candidates[0].intersection(*candidates[1:])
+        else:
+            # tokens shorter than a trigram are checked against every word
+            candidates = self.words.keys()
+        if prefix:
+            return [word for word in candidates if word.startswith(token)]
+        return [word for word in candidates if token in word]
+
+    def search(self, query: str, prefix: bool = False) -> set[str]:
+        """
+        Returns the ids of the rows whose text contains query, or has words starting with each of its words when
+        prefix is set.
+        """
+        query = query.casefold()
+        tokens = query.split()
+        if not tokens:
+            return set()
+
+        rows = None
+        # the longest tokens match the fewest rows
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matched = set()
+            for word in self.match_words(token, prefix):
+                matched |= self.words[word]
+            rows = matched if rows is None else rows & matched
+            if not rows:
+                return set()
+
+        if not prefix and len(tokens) > 1:
+            # the words must also be next to each other, as written in the query
+            query = ' '.join(query.split())
+            rows = {row_id for row_id in rows if query in ' '.join(self.texts[row_id].split())}
+        return rows
@@ -0,0 +1,184 @@
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# upper bounds in seconds of the buckets of the latency histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+class Histogram():
+    """Counts of the observed values by bucket, with their sum and max"""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        # the first bucket whose upper bound is >= value
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        """Cumulative counts by upper bound, as in the Prometheus histograms"""
+        buckets = {}
+        total = 0
+        for bound, n in zip(self.buckets, self.counts):
+            total += n
+            buckets['+Inf' if bound == math.inf else repr(bound)] = total
+        return {'count': self.count, 'sum': self.sum, 'max': self.max, 'buckets': buckets}
+
+class TableMetrics():
+    """
+    Counters and timings of a table, collected only while enabled with enable_metrics.
+
+    Timings are kept as count, sum and max of their durations in seconds, lazy_callback latencies as a histogram.
+    Gauges are functions read when a snapshot is taken. publish sends the snapshot to the sinks, objects with
+    an emit(snapshot) method such as LoggingSink and PrometheusTextSink.
+    """
+
+    COUNTERS = ('rows_built', 'controls_built', 'updates')
+    TIMINGS = ('update', 'format', 'expiration_tick')
+    HISTOGRAMS = ('lazy_callback',)
+
+    def __init__(self, table_uuid: str, sinks: list = None) -> None:
+        self.table_uuid = table_uuid
+        self.sinks = list(sinks or [])
+        self.lock = Lock()
+        self.counters = dict.fromkeys(self.COUNTERS, 0)
+        # name -> [count, sum, max]
+        self.timings = {name: [0, 0.0, 0.0] for name in self.TIMINGS}
+        self.histograms = {name: Histogram() for name in self.HISTOGRAMS}
+        # name -> function returning the current value
+        self.gauges = {}
+        self.started = time.time()
+
+    def count(self, name: str, n: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float):
+        """Records a duration, in the histogram of that name if there is one"""
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is not None:
+                histogram.observe(seconds)
+                return
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += seconds
+            timing[2] = max(timing[2], seconds)
+
+    def record_update(self, seconds: float):
+        self.count('updates')
+        self.observe('update', seconds)
+
+    def add_gauge(self, name: str, function):
+        self.gauges[name] = function
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            snapshot = {
+                'table': self.table_uuid,
+                'time': time.time(),
+                'uptime': time.time() - self.started,
+                'counters': dict(self.counters),
+                'timings': {name: {'count': n, 'sum': total, 'max': longest} for name, (n, total, longest) in self.timings.items()},
+                'histograms': {name: histogram.snapshot() for name, histogram in self.histograms.items()},
+            }
+        gauges = {}
+        for name, function in self.gauges.items():
+            try:
+                gauges[name] = function()
+            except Exception as e:
+                logger.error("Error reading gauge %s of table %s: %s", name, self.table_uuid, e)
+        snapshot['gauges'] = gauges
+        return snapshot
+
+    def reset(self):
+        with self.lock:
+            self.counters = dict.fromkeys(self.counters, 0)
+            self.timings = {name: [0, 0.0, 0.0] for name in self.timings}
+            self.histograms = {name: Histogram(histogram.buckets) for name, histogram in self.histograms.items()}
+            self.started = time.time()
+
+    def publish(self) -> dict:
+        """Sends a snapshot to the sinks and returns it"""
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            try:
+                sink.emit(snapshot)
+            except Exception as e:
+                logger.error("Error publishing the metrics of table %s to %s: %s", self.table_uuid, sink, e)
+        return snapshot
+
+class LoggingSink():
+    """Logs each snapshot as a line of JSON"""
+
+    def __init__(self, logger: logging.Logger = None, level: int = logging.INFO) -> None:
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def emit(self, snapshot: dict):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "table metrics %s", json.dumps(snapshot))
+
+class PrometheusTextSink():
+    """
+    Writes the last snapshot of each table to a file in the Prometheus text format, e.g. for the textfile collector
+    of node_exporter. The file is replaced atomically, so scrapers never read half of it.
+    """
+
+    def __init__(self, path: str, prefix: str = 'flet_table') -> None:
+        self.path = path
+        self.prefix = prefix
+        # table uuid -> last snapshot
+        self.snapshots = {}
+        self.lock = Lock()
+
+    def emit(self, snapshot: dict):
+        with self.lock:
+            self.snapshots[snapshot['table']] = snapshot
+            text = self.render(list(self.snapshots.values()))
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+    def render(self, snapshots: list[dict]) -> str:
+        # metric family -> (type, [(sample suffix, labels, value)]), the samples of a family are written together
+        families = {}
+
+        def add(name, kind, suffix, labels, value):
+            families.setdefault(f"{self.prefix}_{name}", (kind, []))[1].append((suffix, labels, value))
+
+        for s in snapshots:
+            table = f'table="{s["table"]}"'
+            for name, value in s['counters'].items():
+                add(f"{name}_total", 'counter', '', table, value)
+            for name, timing in s['timings'].items():
+                add(f"{name}_seconds", 'summary', '_sum', table, timing['sum'])
+                add(f"{name}_seconds", 'summary', '_count', table, timing['count'])
+                add(f"{name}_seconds_max", 'gauge', '', table, timing['max'])
+            for name, histogram in s['histograms'].items():
+                for bound, n in histogram['buckets'].items():
+                    add(f"{name}_seconds", 'histogram', '_bucket', f'{table},le="{bound}"', n)
+                add(f"{name}_seconds", 'histogram', '_sum', table, histogram['sum'])
+                add(f"{name}_seconds", 'histogram', '_count', table, histogram['count'])
+            for name, value in s['gauges'].items():
+                add(name, 'gauge', '', table, value)
+
+        lines = []
+        for name, (kind, samples) in families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{suffix}{{{labels}}} {value}" for suffix, labels, value in samples)
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import time
+import weakref
+from contextlib import contextmanager
+from threading import Thread, Condition, Lock, local
+
+logger = logging.getLogger(__name__)
+
+class UpdateScheduler():
+    """
+    Process-wide batching of the updates of the controls of all the pages.
+
+    Controls are marked dirty instead of being updated right away. A single thread sends at most one update per
+    page every FRAME_INTERVAL, with all the controls of that page marked since the previous flush, so the many
+    small changes of a table (or of several tables) reach the UI in one message.
+
+    Within a transaction the controls marked by the calling thread are held back, and are marked dirty together
+    when the outermost transaction exits.
+
+    Controls changed from other threads (e.g. tables appending rows on the EffectsScheduler) have an update_lock,
+    held while their page is sent so that they are not changed while they are serialized. When another thread holds
+    it, the controls of that page are sent at the next frame instead of waiting for it.
+    """
+
+    FRAME_INTERVAL = 1 / 30
+
+    _instance = None
+    _instance_lock = Lock()
+
+    @classmethod
+    def shared(cls) -> "UpdateScheduler":
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        # id(control) -> (control, event loop of the session in asyncio mode, None otherwise)
+        self.dirty = {}
+        # page -> event loop of its session, for the controls marked from other threads in asyncio mode
+        self.loops = weakref.WeakKeyDictionary()
+        self.state = Condition()
+        # controls held by the open transactions of each thread
+        self.local = local()
+        self.last_flush = 0
+        self.thread = None
+        self.marked = 0
+        self.flushes = 0
+        self.updates = 0
+
+    def mark_dirty(self, *controls):
+        """Queues controls for the next flush. Controls marked several times before it are sent once"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        held = getattr(self.local, 'held', None)
+        if held is not None:
+            for control in controls:
+                held[id(control)] = (control, loop)
+            return
+
+        self._queue({id(control): (control, loop) for control in controls})
+
+    def _queue(self, dirty: dict):
+        with self.state:
+            self.dirty.update(dirty)
+            self.marked += len(dirty)
+            if self.thread is None:
+                self.thread = Thread(target=self.run, name="update_scheduler", daemon=True)
+                self.thread.start()
+            self.state.notify()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Holds the controls marked dirty by the current thread until the outermost transaction exits, e.g.
+
+            with UpdateScheduler.shared().transaction():
+                table_a.redraw(...)
+                table_b.redraw(...)
+        """
+        outermost = getattr(self.local, 'held', None) is None
+        if outermost:
+            self.local.held = {}
+        try:
+            yield
+        finally:
+            if outermost:
+                held, self.local.held = self.local.held, None
+                if held:
+                    self._queue(held)
+
+    def run(self):
+        while True:
+            with self.state:
+                if not self.dirty:
+                    self.state.wait()
+                    continue
+                timeout = self.last_flush + self.FRAME_INTERVAL - time.monotonic()
+                if timeout > 0:
+                    self.state.wait(timeout)
+                    continue
+                dirty, self.dirty = list(self.dirty.values()), {}
+                self.last_flush = time.monotonic()
+
+            self.flush(dirty)
+
+    def flush_now(self):
+        """Sends the pending updates right away from the calling thread instead of waiting for the next frame"""
+        with self.state:
+            dirty, self.dirty = list(self.dirty.values()), {}
+            self.last_flush = time.monotonic()
+        if dirty:
+            self.flush(dirty)
+
+    def flush(self, dirty: list[tuple]):
+        """Sends a single update per page for all the given (control, loop) pairs"""
+        pages = {}
+        for control, loop in dirty:
+            page = getattr(control, 'page', None)
+            if page:
+                if loop is not None:
+                    self.loops[page] = loop
+                pages.setdefault(id(page), (page, loop, []))[2].append(control)
+
+        self.flushes += 1
+        for page, loop, controls in pages.values():
+            loop = loop or self.loops.get(page)
+            try:
+                if loop is not None:
+                    # pages of asyncio apps are updated on their event loop
+                    asyncio.run_coroutine_threadsafe(self.update_page_async(page, controls, loop), loop)
+                else:
+                    self.update_page(page, controls, loop)
+            except Exception as e:
+                logger.error("Error in update scheduler: %s", e)
+
+    def update_page(self, page, controls: list, loop):
+        with self.locked(controls) as locked:
+            if not locked:
+                self._queue({id(control): (control, loop) for control in controls})
+                return
+            self.updates += 1
+            start = time.perf_counter()
+            page.update(*controls)
+        self.record_update(self.get_metrics(controls), start)
+
+    async def update_page_async(self, page, controls: list, loop):
+        try:
+            with self.locked(controls) as locked:
+                if not locked:
+                    self._queue({id(control): (control, loop) for control in controls})
+                    return
+                self.updates += 1
+                start = time.perf_counter()
+                await page.update_async(*controls)
+            self.record_update(self.get_metrics(controls), start)
+        except Exception as e:
+            logger.error("Error in update scheduler: %s", e)
+
+    @contextmanager
+    def locked(self, controls: list):
+        """Holds the update_lock of the controls, yields False without holding any when one is held by another thread"""
+        locks = {id(lock): lock for lock in (getattr(control, 'update_lock', None) for control in controls) if lock is not None}
+        acquired = []
+        try:
+            for lock in locks.values():
+                if not lock.acquire(blocking=False):
+                    break
+                acquired.append(lock)
+            yield len(acquired) == len(locks)
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    @staticmethod
+    def get_metrics(controls: list) -> list:
+        # tables collecting metrics get the duration of the update they were sent with
+        return [control.metrics for control in controls if getattr(control, 'metrics', None)]
+
+    @staticmethod
+    def record_update(metrics: list, start: float):
+        duration = time.perf_counter() - start
+        for m in metrics:
+            m.record_update(duration)
+
+    def stats(self) -> dict:
+        with self.state:
+            return {
+                'pending': len(self.dirty),
+                'marked': self.marked,
+                'flushes': self.flushes,
+                'updates': self.updates,
+            }
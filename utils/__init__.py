@@ -1,5 +1,8 @@
+import logging
 from threading import Thread, Condition
 
+logger = logging.getLogger(__name__)
+
 class PauseableThread(Thread):
     def __init__(self, name, callback, *args, **kwargs):
         super().__init__()
@@ -21,17 +24,16 @@ class PauseableThread(Thread):
                 if self.callback:
                     self.callback(*self.args, **self.kwargs)
         except Exception as e:
-            print(e)
-            print(f"thread {self.name} paused")
+            logger.error("thread %s paused after an error: %s", self.name, e)
             self.paused = True
 
     def pause(self):
         with self.state:
             self.paused = True  # block
-            print(f"thread {self.name} paused")
+            logger.debug("thread %s paused", self.name)
 
     def resume(self):
         with self.state:
             self.paused = False
-            print(f"thread {self.name} resumed")
+            logger.debug("thread %s resumed", self.name)
             self.state.notify()  # unblock if waiting
\ No newline at end of file